@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive periodic measurement rate of HDC3020 sensors.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import time
+from hdc3020_i2c_filter import TEMPERATURE_COUNTS, HUMIDITY_COUNTS
+from hdc3020_i2c_library import PERIODIC_MEASUREMENT_RATES
+
+# (measurement_per_seconds, mode) from fastest to slowest:
+# 10 mps low noise, 1 mps, 0.5 mps lowest power
+DEFAULT_LEVELS = ((4, 0), (1, 1), (0, 3))
+
+
+class AdaptiveRateController():
+    """Polls a sensor in periodic measurement mode and adapts rate and mode to the signal.
+
+    The rate of change of temperature and humidity is estimated from the raw
+    values over the last slope_window seconds. When it exceeds fast_slope
+    (°C/s, %RH/s) the sensor is switched to the fastest level at once. Only
+    when it stayed below slow_slope, and the exponentially smoothed rate of
+    failed reads below max_error_rate, for hold_time seconds the controller
+    steps down one level, so it does not oscillate between levels. A switch
+    ends the periodic measurement before starting the new one and waits a
+    full period for the first measurement. A switch that failed half way is
+    completed at the next step.
+
+    callback(timestamp, raw_temperature, raw_humidity, level) is called for
+    every sample.
+    """
+
+    def __init__(self, sensor, levels=DEFAULT_LEVELS, fast_slope=(0.05, 0.5),
+                 slow_slope=(0.01, 0.1), hold_time=30.0, slope_window=5.0, error_smoothing=0.3,
+                 max_error_rate=0.05,
+                 callback=None, clock=time.monotonic, sleep=time.sleep):
+        self.sensor = sensor
+        self.levels = levels
+        self.periods = [1.0 / PERIODIC_MEASUREMENT_RATES[rate] for rate, _ in levels]
+        self.fast_slope = (fast_slope[0] * TEMPERATURE_COUNTS, fast_slope[1] * HUMIDITY_COUNTS)
+        self.slow_slope = (slow_slope[0] * TEMPERATURE_COUNTS, slow_slope[1] * HUMIDITY_COUNTS)
+        self.hold_time = hold_time
+        self.slope_window = slope_window
+        self.error_smoothing = error_smoothing
+        self.max_error_rate = max_error_rate
+        self.callback = callback
+        self.clock = clock
+        self.sleep = sleep
+        self.level = len(levels) - 1
+        self.running = False
+        self._active_level = None
+        self.reads = 0
+        self.errors = 0
+        self.switches = 0
+        self.error_rate = 0.0
+        # estimated rate of change in raw counts per second
+        self.temperature_slope = 0.0
+        self.humidity_slope = 0.0
+        self._history = collections.deque()
+        self._calm_since = None
+        self._deadline = None
+
+    def start(self, level=None):
+        """start the periodic measurement, at the slowest level by default"""
+        if level is not None:
+            self.level = level
+        self._apply()
+
+    def stop(self):
+        """end the periodic measurement"""
+        if self.running:
+            self.sensor.end_periodic_measurement()
+            self.running = False
+        self._active_level = None
+
+    def run_for(self, seconds):
+        """start, poll for seconds and stop"""
+        end = self.clock() + seconds
+        self.start()
+        try:
+            while self.clock() < end:
+                self.step()
+        finally:
+            self.stop()
+
+    def _apply(self):
+        """(re)start the periodic measurement at the current level
+
+        The first measurement is ready one period after the start.
+        """
+        if self.running:
+            self.sensor.end_periodic_measurement()
+            self.running = False
+            self._active_level = None
+        self.sensor.start_periodic_measurement(*self.levels[self.level])
+        self.running = True
+        self._active_level = self.level
+        self._deadline = self.clock() + self.periods[self.level]
+
+    def switch(self, level):
+        """end the periodic measurement and start it again at level"""
+        self.level = level
+        self.switches += 1
+        self._calm_since = None
+        try:
+            self._apply()
+        except (Warning, OSError):
+            # completed by the next step
+            self._account_error()
+
+    def step(self):
+        """wait for the next measurement, read and account it, adapt the level
+
+        Returns (timestamp, raw temperature, raw humidity) or None if the read
+        failed.
+        """
+        if self._active_level != self.level:
+            try:
+                self._apply()
+            except (Warning, OSError):
+                self._account_error()
+                self.sleep(self.periods[self.level])
+                return None
+        delay = self._deadline - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        self._deadline += self.periods[self.level]
+        self.reads += 1
+        try:
+            raw_temperature, raw_humidity = self.sensor.get_periodic_measurement_raw()
+        except (Warning, OSError):
+            self._account_error()
+            return None
+        self.error_rate -= self.error_smoothing * self.error_rate
+        timestamp = self.clock()
+        level = self.level
+        self._adapt(timestamp, raw_temperature, raw_humidity)
+        if self.callback is not None:
+            self.callback(timestamp, raw_temperature, raw_humidity, level)
+        return timestamp, raw_temperature, raw_humidity
+
+    def _account_error(self):
+        """count a failed transfer, errors hold off stepping down"""
+        self.errors += 1
+        self.error_rate += self.error_smoothing * (1.0 - self.error_rate)
+        self._calm_since = None
+
+    def _adapt(self, timestamp, raw_temperature, raw_humidity):
+        """update the slope estimates and switch the level if needed"""
+        history = self._history
+        history.append((timestamp, raw_temperature, raw_humidity))
+        # keep the newest sample at least slope_window seconds old as reference
+        while len(history) > 2 and timestamp - history[1][0] >= self.slope_window:
+            history.popleft()
+        oldest = history[0]
+        if timestamp <= oldest[0]:
+            return
+        elapsed = timestamp - oldest[0]
+        self.temperature_slope = abs(raw_temperature - oldest[1]) / elapsed
+        self.humidity_slope = abs(raw_humidity - oldest[2]) / elapsed
+        if self.temperature_slope > self.fast_slope[0] or self.humidity_slope > self.fast_slope[1]:
+            self._calm_since = None
+            if self.level != 0:
+                self.switch(0)
+        elif (self.temperature_slope < self.slow_slope[0] and
+              self.humidity_slope < self.slow_slope[1] and
+              self.error_rate <= self.max_error_rate):
+            if self._calm_since is None:
+                self._calm_since = timestamp
+            elif (timestamp - self._calm_since >= self.hold_time and
+                  self.level < len(self.levels) - 1):
+                self.switch(self.level + 1)
+        else:
+            self._calm_since = None
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling statistics of HDC3020 measurements over time windows.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import math
+import threading
+from hdc3020_i2c_conversion import raw_to_temperature, raw_to_humidity
+from hdc3020_i2c_library import PERIODIC_MEASUREMENT_RATES
+
+WindowStatistics = collections.namedtuple(
+    "WindowStatistics", ["count", "mean", "stddev", "minimum", "maximum"])
+
+# default windows in seconds: 1 min, 5 min, 1 h
+DEFAULT_WINDOWS = (60, 300, 3600)
+# samples per second the default sample limit of a window is sized for
+MAX_SAMPLE_RATE = max(PERIODIC_MEASUREMENT_RATES)
+
+
+def default_max_samples(duration, max_rate=MAX_SAMPLE_RATE):
+    """samples of duration seconds at max_rate samples per second, one more for the boundary"""
+    return int(math.ceil(duration * max_rate)) + 1
+
+
+class SampleRing():
+    """The last capacity samples, addressed by their sequence number.
+
+    Nested windows of an aggregator share one ring, so each sample is stored
+    once however many windows hold it.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self.next = 0
+
+    def append(self, sample):
+        """store sample under the next sequence number, overwriting the oldest one"""
+        self._items[self.next % self.capacity] = sample
+        self.next += 1
+
+    def __getitem__(self, sequence):
+        return self._items[sequence % self.capacity]
+
+
+class RollingWindow():
+    """Mean, standard deviation, minimum and maximum of the samples of a sliding window.
+
+    The window holds the samples of the last duration seconds, but never more
+    than max_samples. Without max_samples the limit is duration seconds at
+    MAX_SAMPLE_RATE, faster samples shorten the window. Mean and variance are
+    updated with Welford's method when a sample enters or leaves the window,
+    minimum and maximum are the heads of monotonic deques, so every sample
+    costs amortized O(1) independent of the window length.
+
+    With ring the samples are kept in a SampleRing shared with other
+    windows: the owner appends (timestamp, ...) tuples to the ring and then
+    calls add() of every window, which reads its value at index field of the
+    tuple. The ring needs room for max_samples and the new sample.
+    """
+
+    def __init__(self, duration=None, max_samples=None, ring=None, field=1):
+        if max_samples is None:
+            if duration is None:
+                raise ValueError("duration or max_samples is required")
+            max_samples = default_max_samples(duration)
+        if ring is not None and ring.capacity <= max_samples:
+            raise ValueError("ring must hold more than max_samples")
+        self.duration = duration
+        self.max_samples = max_samples
+        self._owns_ring = ring is None
+        self._ring = SampleRing(max_samples) if ring is None else ring
+        self._field = field
+        self._minimum = collections.deque()
+        self._maximum = collections.deque()
+        self._first = 0
+        self._next = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return self._next - self._first
+
+    def add(self, timestamp, value):
+        """add a sample and drop the samples that left the window"""
+        self.expire(timestamp)
+        if self._next - self._first >= self.max_samples:
+            self._remove_oldest()
+        if self._owns_ring:
+            self._ring.append((timestamp, value))
+        delta = value - self._mean
+        self._mean += delta / (self._next + 1 - self._first)
+        self._m2 += delta * (value - self._mean)
+        minimum = self._minimum
+        while minimum and minimum[-1][1] >= value:
+            minimum.pop()
+        minimum.append((self._next, value))
+        maximum = self._maximum
+        while maximum and maximum[-1][1] <= value:
+            maximum.pop()
+        maximum.append((self._next, value))
+        self._next += 1
+
+    def expire(self, timestamp):
+        """drop the samples older than duration seconds before timestamp"""
+        if self.duration is None:
+            return
+        oldest = timestamp - self.duration
+        ring = self._ring
+        while self._first < self._next and ring[self._first][0] <= oldest:
+            self._remove_oldest()
+
+    def _remove_oldest(self):
+        """remove the first sample from the running sums and the deques"""
+        value = self._ring[self._first][self._field]
+        count = self._next - self._first - 1
+        if count == 0:
+            self._mean = self._m2 = 0.0
+        else:
+            delta = value - self._mean
+            self._mean -= delta / count
+            self._m2 -= delta * (value - self._mean)
+        if self._minimum[0][0] == self._first:
+            self._minimum.popleft()
+        if self._maximum[0][0] == self._first:
+            self._maximum.popleft()
+        self._first += 1
+
+    @property
+    def mean(self):
+        """mean of the samples in the window, None if empty"""
+        return self._mean if self._next > self._first else None
+
+    @property
+    def variance(self):
+        """sample variance of the window, None with less than two samples"""
+        count = self._next - self._first
+        if count < 2:
+            return None
+        return max(self._m2, 0.0) / (count - 1)
+
+    @property
+    def stddev(self):
+        """sample standard deviation of the window, None with less than two samples"""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    @property
+    def minimum(self):
+        """smallest sample in the window, None if empty"""
+        return self._minimum[0][1] if self._minimum else None
+
+    @property
+    def maximum(self):
+        """largest sample in the window, None if empty"""
+        return self._maximum[0][1] if self._maximum else None
+
+
+def _convert(window, convert, scale):
+    """WindowStatistics of a window of raw values, converted with convert and scale"""
+    if not window:
+        return WindowStatistics(0, None, None, None, None)
+    stddev = window.stddev
+    return WindowStatistics(len(window), convert(window.mean),
+                            None if stddev is None else stddev * scale,
+                            convert(window.minimum), convert(window.maximum))
+
+
+class SensorAggregator():
+    """Rolling statistics of temperature and humidity of one sensor over several windows.
+
+    Samples are added as raw 16 bit values, the windows keep raw values and
+    statistics() converts the results only. windows are durations in
+    seconds, max_samples bounds the samples of each window, by default
+    each window holds its duration at MAX_SAMPLE_RATE. All windows share
+    one SampleRing sized for the largest of them. Samples may be added from
+    an acquisition thread while statistics() is called from another one.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, max_samples=None):
+        limits = {duration: default_max_samples(duration) if max_samples is None else max_samples
+                  for duration in windows}
+        self._ring = SampleRing(max(limits.values()) + 1)
+        self.windows = {duration: (RollingWindow(duration, limit, self._ring, 1),
+                                   RollingWindow(duration, limit, self._ring, 2))
+                        for duration, limit in limits.items()}
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, raw_temperature, raw_humidity):
+        """add one raw sample to all windows"""
+        with self._lock:
+            self.samples += 1
+            self._ring.append((timestamp, raw_temperature, raw_humidity))
+            for temperature, humidity in self.windows.values():
+                temperature.add(timestamp, raw_temperature)
+                humidity.add(timestamp, raw_humidity)
+
+    def statistics(self, timestamp=None):
+        """return a dict duration: (temperature, humidity) WindowStatistics in °C and %RH
+
+        With timestamp, samples older than the windows at that time are
+        dropped first, so idle sensors age out.
+        """
+        results = {}
+        with self._lock:
+            for duration, (temperature, humidity) in self.windows.items():
+                if timestamp is not None:
+                    temperature.expire(timestamp)
+                    humidity.expire(timestamp)
+                results[duration] = (_convert(temperature, raw_to_temperature, 175 / 65535),
+                                     _convert(humidity, raw_to_humidity, 100 / 65535))
+        return results
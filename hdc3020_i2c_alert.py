@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Alert driven acquisition of the HDC3020 using its ALERT output.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import threading
+import time
+from hdc3020_i2c_conversion import (temperature_to_raw, humidity_to_raw, raw_to_temperature,
+                                    raw_to_humidity)
+from hdc3020_i2c_library import STATUS_ALERT
+
+AlertEvent = collections.namedtuple(
+    "AlertEvent", ["timestamp", "status", "temperature", "humidity"])
+# longest wait for an edge in seconds before the watcher thread checks for stop()
+STOP_POLL_INTERVAL = 0.1
+
+
+def encode_alert_threshold(temperature, humidity):
+    """encode a threshold in °C and %RH as the two bytes taken by the change_*_alert methods
+
+    The sensor compares the 7 most significant bits of the humidity (bits
+    15 - 9 of the threshold) and the 9 most significant bits of the
+    temperature (bits 8 - 0), so thresholds are truncated to that resolution.
+    """
+    threshold = (humidity_to_raw(humidity) & 0xFE00) | (temperature_to_raw(temperature) >> 7)
+    return threshold >> 8, threshold & 0xFF
+
+
+def decode_alert_threshold(send_bytes1, send_bytes2):
+    """return temperature in °C and humidity in %RH of two threshold bytes"""
+    threshold = (send_bytes1 << 8) | send_bytes2
+    return raw_to_temperature((threshold & 0x1FF) << 7), raw_to_humidity(threshold & 0xFE00)
+
+
+def write_alert_thresholds(sensor, set_low, clear_low, set_high, clear_high):
+    """write all four alert thresholds, each given as (temperature, humidity)"""
+    sensor.change_set_low_alert(*encode_alert_threshold(*set_low))
+    sensor.change_clear_low_alert(*encode_alert_threshold(*clear_low))
+    sensor.change_set_high_alert(*encode_alert_threshold(*set_high))
+    sensor.change_clear_high_alert(*encode_alert_threshold(*clear_high))
+
+
+class FakeEdgeSource():
+    """Edge source for tests and simulations, edges are produced by trigger()."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = 0
+        self.edges = 0
+
+    def trigger(self):
+        """signal one edge of the ALERT line"""
+        with self._condition:
+            self._pending += 1
+            self.edges += 1
+            self._condition.notify_all()
+
+    def wait_for_edge(self, timeout=None):
+        """wait until an edge occurred, return False on timeout"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending, timeout):
+                return False
+            self._pending = 0
+            return True
+
+    def close(self):
+        """nothing to release"""
+
+
+class GPIOEdgeSource(FakeEdgeSource):
+    """Rising edges of the ALERT line on a Raspberry Pi GPIO pin (BCM numbering).
+
+    RPi.GPIO is only imported when this class is used.
+    """
+
+    def __init__(self, pin, bouncetime=None):
+        super().__init__()
+        # pylint: disable=E0401,C0415
+        import RPi.GPIO as GPIO
+        # pylint: enable=E0401,C0415
+        self._gpio = GPIO
+        self.pin = pin
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.IN)
+        options = {} if bouncetime is None else {"bouncetime": bouncetime}
+        GPIO.add_event_detect(pin, GPIO.RISING, callback=lambda channel: self.trigger(),
+                              **options)
+
+    def is_active(self):
+        """current level of the ALERT line"""
+        return bool(self._gpio.input(self.pin))
+
+    def close(self):
+        """stop the edge detection on the pin"""
+        self._gpio.remove_event_detect(self.pin)
+
+
+class AlertWatcher():
+    """Reads a sensor only when its ALERT output signals a threshold crossing.
+
+    The sensor evaluates the alert thresholds itself in periodic measurement
+    mode; the watcher waits for an edge of edge_source, then reads the status
+    register and the latest measurement, clears the status register and calls
+    callback(AlertEvent). Without edges the bus stays idle, apart from an
+    optional heartbeat read every heartbeat seconds and one status read at
+    the start, which reports an alert that was already active before.
+
+    An edge source only needs wait_for_edge(timeout), the thread waits at
+    most STOP_POLL_INTERVAL at a time to notice stop().
+    """
+
+    def __init__(self, sensor, edge_source, callback, heartbeat=None, clock=time.monotonic):
+        self.sensor = sensor
+        self.edge_source = edge_source
+        self.callback = callback
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.events = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, measurement_per_seconds=None, mode=0):
+        """start watching, optionally starting the periodic measurement first"""
+        if self._thread is not None:
+            raise RuntimeError("watcher is already running")
+        if measurement_per_seconds is not None:
+            self.sensor.start_periodic_measurement(measurement_per_seconds, mode)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hdc3020-alert", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop watching"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self, timeout=0):
+        """wait up to timeout for an edge and handle it, return the AlertEvent or None"""
+        if self.edge_source.wait_for_edge(timeout):
+            return self.handle_alert()
+        return None
+
+    def check(self):
+        """read the status register and handle an active alert, return the AlertEvent or None"""
+        try:
+            status = self.sensor.read_status_register()
+        except (Warning, OSError):
+            self.errors += 1
+            return None
+        if status & STATUS_ALERT:
+            return self.handle_alert()
+        return None
+
+    def handle_alert(self):
+        """read status and measurement, clear the status and report the event"""
+        try:
+            status = self.sensor.read_status_register()
+            temperature, humidity = self.sensor.get_periodic_measurement_temp_hum()
+            self.sensor.clear_statusregister()
+        except (Warning, OSError):
+            self.errors += 1
+            return None
+        event = AlertEvent(self.clock(), status, temperature, humidity)
+        self.events += 1
+        self.callback(event)
+        return event
+
+    def _run(self):
+        """watcher thread"""
+        # an alert active before the start gives no edge
+        self.check()
+        heartbeat = None if self.heartbeat is None else self.clock() + self.heartbeat
+        while not self._stop.is_set():
+            timeout = STOP_POLL_INTERVAL
+            if heartbeat is not None:
+                timeout = min(timeout, max(heartbeat - self.clock(), 0))
+            if not self.edge_source.wait_for_edge(timeout) and (
+                    heartbeat is None or self.clock() < heartbeat):
+                continue
+            self.handle_alert()
+            if heartbeat is not None:
+                heartbeat = self.clock() + self.heartbeat
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Alignment of the sample streams of several HDC3020 sensors to common ticks.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import math
+import threading
+
+ALIGN_NEAREST = "nearest"
+ALIGN_LINEAR = "linear"
+
+# values holds one tuple of sample values or None per source, in the order of
+# StreamAligner.sources
+Frame = collections.namedtuple("Frame", ["timestamp", "values"])
+
+
+class _Source():
+    """recent samples of one stream, oldest first"""
+
+    def __init__(self, max_samples):
+        self.samples = collections.deque(maxlen=max_samples)
+        self.latest = -math.inf
+
+
+class StreamAligner():
+    """Resamples the streams of many sensors to one frame per tick.
+
+    add(source, timestamp, *values) takes the samples of each source in time
+    order, e.g. the SampleTime.wall of get_periodic_measurement_timestamped
+    or the callback of a PollingScheduler. The ticks are multiples of tick
+    seconds. A frame is emitted as soon as every source has a sample at or
+    after its tick, or when the newest sample of any source is max_delay
+    seconds past it, so a stalled sensor delays the frames by max_delay at
+    most. When the samples jump ahead by more than max_delay, e.g. after a
+    clock step, the ticks without any samples are skipped and counted in
+    skipped instead of emitting a frame for each of them. With ALIGN_LINEAR the values are interpolated between the samples
+    before and after the tick if both are within tolerance seconds of it,
+    otherwise, and with ALIGN_NEAREST, the nearest sample within tolerance
+    is used; sources without such a sample get None. Samples older than the
+    previous one of a source are counted as late and dropped. Every source
+    keeps at most max_samples samples.
+
+    Completed frames are returned by add() and flush() and passed to
+    callback(frame). add() may be called from several threads.
+    """
+
+    def __init__(self, tick, tolerance=None, method=ALIGN_LINEAR, max_delay=None,
+                 sources=(), max_samples=256, callback=None):
+        if tick <= 0:
+            raise ValueError("tick must be positive")
+        if method not in (ALIGN_NEAREST, ALIGN_LINEAR):
+            raise ValueError("method must be %r or %r" % (ALIGN_NEAREST, ALIGN_LINEAR))
+        self.tick = tick
+        self.tolerance = tick if tolerance is None else tolerance
+        self.method = method
+        self.max_delay = 5 * tick if max_delay is None else max_delay
+        self.max_samples = max_samples
+        self.callback = callback
+        self.sources = []
+        self.frames = 0
+        self.skipped = 0
+        self.late = 0
+        self._index = {}
+        self._states = []
+        self._next_tick = None
+        self._newest = -math.inf
+        # number of sources without a sample at or after the next tick
+        self._pending = 0
+        self._lock = threading.Lock()
+        for source in sources:
+            self._add_source(source)
+
+    def _add_source(self, source):
+        """register a new source, which gets None in the frames before its first sample"""
+        self._index[source] = len(self.sources)
+        self.sources.append(source)
+        self._states.append(_Source(self.max_samples))
+        self._pending += 1
+        return self._states[-1]
+
+    def add(self, source, timestamp, *values):
+        """add a sample of source, return the frames completed by it"""
+        with self._lock:
+            index = self._index.get(source)
+            state = self._states[index] if index is not None else self._add_source(source)
+            if timestamp < state.latest:
+                self.late += 1
+                return ()
+            if self._next_tick is None:
+                self._next_tick = math.ceil(timestamp / self.tick) * self.tick
+            if state.latest < self._next_tick <= timestamp:
+                self._pending -= 1
+            state.latest = timestamp
+            state.samples.append((timestamp, values))
+            previous = self._newest
+            if timestamp > self._newest:
+                self._newest = timestamp
+            frames = []
+            while self._pending == 0 or self._newest - self.max_delay >= self._next_tick:
+                first = math.ceil((self._newest - self.max_delay) / self.tick) * self.tick
+                if self._next_tick > previous and first > self._next_tick:
+                    # no samples up to the new one, don't emit a frame per tick of the gap
+                    self.skipped += round((first - self._next_tick) / self.tick)
+                    self._advance(first)
+                    continue
+                frames.append(self._emit())
+        if self.callback is not None:
+            for frame in frames:
+                self.callback(frame)
+        return frames
+
+    def flush(self):
+        """emit the frames of all ticks up to the newest sample"""
+        with self._lock:
+            frames = []
+            while self._next_tick is not None and self._next_tick <= self._newest:
+                frames.append(self._emit())
+        if self.callback is not None:
+            for frame in frames:
+                self.callback(frame)
+        return frames
+
+    def _emit(self):
+        """build the frame of the next tick and advance to the following one"""
+        tick = self._next_tick
+        frame = Frame(tick, [self._value(state.samples, tick) for state in self._states])
+        self.frames += 1
+        self._advance(tick + self.tick)
+        return frame
+
+    def _advance(self, tick):
+        """make tick the next one, dropping the samples no longer needed"""
+        # keep the last sample before the tick as base of its value
+        self._pending = 0
+        for state in self._states:
+            samples = state.samples
+            while len(samples) > 1 and samples[1][0] <= tick:
+                samples.popleft()
+            if state.latest < tick:
+                self._pending += 1
+        self._next_tick = tick
+
+    def _value(self, samples, tick):
+        """value of one source at tick, None without a sample within tolerance"""
+        before = after = None
+        for sample in samples:
+            if sample[0] <= tick:
+                before = sample
+            else:
+                after = sample
+                break
+        if before is not None and before[0] == tick:
+            return before[1]
+        tolerance = self.tolerance
+        if (self.method == ALIGN_LINEAR and before is not None and after is not None and
+                tick - before[0] <= tolerance and after[0] - tick <= tolerance):
+            weight = (tick - before[0]) / (after[0] - before[0])
+            return tuple(low + (high - low) * weight for low, high in zip(before[1], after[1]))
+        best = None
+        distance = tolerance
+        if before is not None and tick - before[0] <= distance:
+            best = before
+            distance = tick - before[0]
+        if after is not None and after[0] - tick <= distance:
+            best = after
+        return None if best is None else best[1]
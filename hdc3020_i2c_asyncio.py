@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio interface for the HDC3020 Sensor via I2c interface.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import asyncio
+import errno
+import weakref
+from hdc3020_i2c_library import (HDC3020, HDC3020NackError, SINGLE_SHOT_CONVERSION_TIMES,
+                                 get_status_string)
+from hdc3020_i2c_pipeline import SINGLE_SHOT_RETRY_INTERVAL
+
+_BUS_LOCKS = weakref.WeakKeyDictionary()
+
+
+def get_bus_lock(bus_key):
+    """return the asyncio lock of a bus (HDC3020.bus_key) for the running event loop"""
+    locks = _BUS_LOCKS.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(bus_key)
+    if lock is None:
+        lock = locks[bus_key] = asyncio.Lock()
+    return lock
+
+
+class AsyncHDC3020():
+    """Awaitable reads of one HDC3020.
+
+    The bus transactions themselves are short and run directly on the event
+    loop, so no executor thread is involved. Coroutines of sensors on the same
+    bus (the same bus_key) take turns through a per bus asyncio lock, waiting
+    for a single shot conversion does not hold the lock.
+
+    The transactions still take the threading lock of the bus. While a thread
+    outside of the event loop (e.g. a PollingScheduler worker) uses the same
+    bus, the event loop thread blocks on that lock for the duration of the
+    other transaction, about a millisecond at 100 kHz.
+    """
+
+    def __init__(self, sensor, bus=None, bus_number=1):
+        if not isinstance(sensor, HDC3020):
+            sensor = HDC3020(sensor, bus=bus, bus_number=bus_number)
+        self.sensor = sensor
+
+    async def __aenter__(self):
+        self.sensor.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.sensor.close()
+
+    async def get_single_shot_temp_hum(self, mode, timeout=0.1):
+        """trigger a measurement, wait for the conversion and return temperature and humidity"""
+        lock = get_bus_lock(self.sensor.bus_key)
+        async with lock:
+            self.sensor.trigger_single_shot(mode)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await asyncio.sleep(SINGLE_SHOT_CONVERSION_TIMES[mode])
+        while True:
+            async with lock:
+                result = self.sensor.collect_single_shot()
+            if result is not None:
+                return result
+            if loop.time() > deadline:
+                raise HDC3020NackError(errno.EREMOTEIO, get_status_string(1))
+            await asyncio.sleep(SINGLE_SHOT_RETRY_INTERVAL)
+
+    async def get_periodic_measurement_temp_hum(self):
+        """get the last measurement from the periodic measurement for temperature and humidity"""
+        async with get_bus_lock(self.sensor.bus_key):
+            return self.sensor.get_periodic_measurement_temp_hum()
+
+    async def start_periodic_measurement(self, measurement_per_seconds, mode):
+        """starts the periodic measurement"""
+        async with get_bus_lock(self.sensor.bus_key):
+            self.sensor.start_periodic_measurement(measurement_per_seconds, mode)
+
+    async def end_periodic_measurement(self):
+        """ends the periodic measurement"""
+        async with get_bus_lock(self.sensor.bus_key):
+            self.sensor.end_periodic_measurement()
+
+    async def read_identification(self):
+        """reads the identification number"""
+        async with get_bus_lock(self.sensor.bus_key):
+            return self.sensor.read_identification()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Selectable I2C bus backends of the HDC3020 library, imported on first use.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import ctypes
+import errno
+import os
+
+BACKENDS = ("smbus2", "ioctl", "simulator")
+# read flag of an i2c message and the combined transfer ioctl, as in linux/i2c.h
+# and linux/i2c-dev.h
+I2C_M_RD = 0x0001
+I2C_RDWR = 0x0707
+
+Backend = collections.namedtuple("Backend", ["name", "bus_class", "i2c_msg"])
+
+_BACKEND = None
+
+
+class i2c_msg(ctypes.Structure):  # pylint: disable=C0103
+    """struct i2c_msg of linux/i2c.h, with the interface of smbus2.i2c_msg"""
+    _fields_ = [("addr", ctypes.c_uint16), ("flags", ctypes.c_uint16),
+                ("len", ctypes.c_uint16), ("buf", ctypes.POINTER(ctypes.c_char))]
+
+    def __iter__(self):
+        return iter(ctypes.string_at(self.buf, self.len))
+
+    def __len__(self):
+        return self.len
+
+    def __bytes__(self):
+        return ctypes.string_at(self.buf, self.len)
+
+    @staticmethod
+    def read(address, length):
+        """message reading length bytes from address"""
+        return i2c_msg(addr=address, flags=I2C_M_RD, len=length,
+                       buf=ctypes.create_string_buffer(length))
+
+    @staticmethod
+    def write(address, buf):
+        """message writing the bytes of buf to address"""
+        buf = bytes(buf)
+        return i2c_msg(addr=address, flags=0, len=len(buf),
+                       buf=ctypes.create_string_buffer(buf, len(buf)))
+
+
+class _I2CRdwrIoctlData(ctypes.Structure):
+    """struct i2c_rdwr_ioctl_data of linux/i2c-dev.h"""
+    _fields_ = [("msgs", ctypes.POINTER(i2c_msg)), ("nmsgs", ctypes.c_uint32)]
+
+
+class I2CBus():
+    """Bus object on /dev/i2c-<bus> doing combined transfers with the I2C_RDWR ioctl.
+
+    Covers what the library needs from smbus2.SMBus (i2c_rdwr and close)
+    without any dependency, the messages have to be i2c_msg of this module.
+    """
+
+    def __init__(self, bus=1):
+        self.bus = bus
+        self.fd = os.open("/dev/i2c-%d" % bus, os.O_RDWR)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """execute the messages as one combined transfer"""
+        if self.fd is None:
+            raise OSError(errno.EBADF, "bus is closed")
+        # pylint: disable=C0415
+        import fcntl
+        # pylint: enable=C0415
+        messages = (i2c_msg * len(i2c_msgs))(*i2c_msgs)
+        fcntl.ioctl(self.fd, I2C_RDWR, _I2CRdwrIoctlData(messages, len(i2c_msgs)))
+
+    def close(self):
+        """close the device file"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _import_backend(name):
+    """import the modules of a backend"""
+    # pylint: disable=C0415,E0401
+    if name == "smbus2":
+        import smbus2
+        return Backend(name, smbus2.SMBus, smbus2.i2c_msg)
+    if name == "ioctl":
+        return Backend(name, I2CBus, i2c_msg)
+    if name == "simulator":
+        from hdc3020_i2c_simulator import SimulatedSMBus
+        return Backend(name, SimulatedSMBus, i2c_msg)
+    # pylint: enable=C0415,E0401
+    raise ValueError("unknown backend %r, one of %s" % (name, ", ".join(BACKENDS)))
+
+
+def select_backend(name):
+    """use a backend of BACKENDS for all pooled buses and messages created from now on
+
+    Select it before the first transaction, messages already built by a
+    sensor stay of the previous backend.
+    """
+    global _BACKEND  # pylint: disable=W0603
+    _BACKEND = _import_backend(name)
+    return _BACKEND
+
+
+def load_backend():
+    """return the selected backend, on first use the one named by HDC3020_BACKEND
+
+    Without the environment variable smbus2 is used if it is installed,
+    the ioctl backend otherwise.
+    """
+    if _BACKEND is None:
+        name = os.environ.get("HDC3020_BACKEND")
+        if name:
+            return select_backend(name)
+        try:
+            return select_backend("smbus2")
+        except ImportError:
+            return select_backend("ioctl")
+    return _BACKEND
@@ -0,0 +1,986 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the HDC3020 library, run against a simulated I2C bus.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import argparse
+import asyncio
+import bisect
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from hdc3020_i2c_library import (HDC3020, SMBusPool, SINGLE_SHOT_CONVERSION_TIMES, i2c_msg,
+                                 calc_crc8, find_crc8_errors, CRC8_ONEWIRE_POLY,
+                                 CRC8_ONEWIRE_START,
+                                 decode_temp_hum, decode_raw_temp_hum, fill_read_message,
+                                 I2C_M_RD, HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT,
+                                 HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0,
+                                 HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0)
+from hdc3020_i2c_adaptive import AdaptiveRateController
+from hdc3020_i2c_aggregation import RollingWindow, SensorAggregator
+from hdc3020_i2c_alert import AlertWatcher, FakeEdgeSource, write_alert_thresholds
+from hdc3020_i2c_align import ALIGN_LINEAR, ALIGN_NEAREST, StreamAligner
+from hdc3020_i2c_asyncio import AsyncHDC3020
+from hdc3020_i2c_capture import (CaptureWriter, CapturingBus, ReplayBus,
+                                 load_measurement_frames)
+from hdc3020_i2c_conversion import (convert_frames, calc_dewpoint, raw_to_temperature,
+                                    raw_to_humidity, numpy)
+from hdc3020_i2c_daemon import (BusWorker, SampleReader, SensorFarm, SharedSampleRing,
+                                run_bus_worker)
+from hdc3020_i2c_discovery import discover
+from hdc3020_i2c_export import CsvSink
+from hdc3020_i2c_filter import ChangeFilter
+from hdc3020_i2c_heater import HeaterManager
+from hdc3020_i2c_instrumentation import HistogramSink, instrument, uninstrument
+from hdc3020_i2c_pipeline import read_single_shot_pipelined
+from hdc3020_i2c_prometheus import MetricsExporter, MetricsServer
+from hdc3020_i2c_recovery import ResilientHDC3020, RetryPolicy
+from hdc3020_i2c_scheduler import PollingScheduler
+from hdc3020_i2c_simulator import HDC3020_ADDRESSES, SimulatedHDC3020, SimulatedSMBus
+from hdc3020_i2c_stream import SampleRingBuffer, StreamCursor
+
+# Definition
+I2C_ADDRESS = 0x44
+
+
+def periodic_devices():
+    """simulated devices on all HDC3020 addresses, in periodic measurement mode at 1 mps"""
+    devices = {address: SimulatedHDC3020() for address in HDC3020_ADDRESSES}
+    for device in devices.values():
+        device.write(bytes([HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0 >> 8,
+                            HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0 & 0xFF]))
+    return devices
+
+
+def legacy_wire_write_read(i2c_address, buf, receiving_bytes, devices):
+    """transaction as done before the bus pool: open and close the bus every time"""
+    write_command = i2c_msg.write(i2c_address, buf)
+    read_command = i2c_msg.read(i2c_address, receiving_bytes)
+    with SimulatedSMBus(1, devices=devices) as hdc3020_communication:
+        hdc3020_communication.i2c_rdwr(write_command, read_command)
+    return list(read_command)
+
+
+def transactions_per_second(function, transactions):
+    """call function transactions times and return the achieved rate"""
+    start = time.perf_counter()
+    for _ in range(transactions):
+        function()
+    return transactions / (time.perf_counter() - start)
+
+
+def benchmark_bus_pool(args):
+    """compare open/close per transaction with pooled and injected buses"""
+    transactions = args.iterations
+    command = [0xE0, 0x00]
+    devices = periodic_devices()
+    results = {}
+    results["open_close_per_transaction_per_s"] = transactions_per_second(
+        lambda: legacy_wire_write_read(I2C_ADDRESS, command, 6, devices), transactions)
+
+    pool = SMBusPool(bus_factory=lambda bus_number: SimulatedSMBus(bus_number, devices=devices))
+    with HDC3020(I2C_ADDRESS, pool=pool) as hdc3020:
+        results["pooled_bus_per_s"] = transactions_per_second(
+            lambda: hdc3020.wire_write_read(command, 6), transactions)
+
+    with SimulatedSMBus(1, devices=devices) as bus:
+        hdc3020 = HDC3020(I2C_ADDRESS, bus=bus)
+        results["injected_bus_per_s"] = transactions_per_second(
+            lambda: hdc3020.wire_write_read(command, 6), transactions)
+    return results
+
+
+def calc_crc8_bitwise(buf, start, end):
+    """crc8 computed bit by bit, as the library did before the lookup table"""
+    crc_val = CRC8_ONEWIRE_START
+    for j in range(start, end):
+        cur_val = buf[j]
+        for _ in range(8):
+            if ((crc_val ^ cur_val) & 0x80) != 0:
+                crc_val = (crc_val << 1) ^ CRC8_ONEWIRE_POLY
+            else:
+                crc_val = crc_val << 1
+            cur_val = cur_val << 1
+    crc_val &= 0xFF
+    return crc_val
+
+
+def benchmark_crc8(args):
+    """crc8 of one 6 byte frame per call, bitwise, table driven and as batch"""
+    transactions = args.iterations
+    frame = [0x66, 0x66, 0, 0x80, 0x00, 0]
+    frame[2] = calc_crc8(frame, 0, 2)
+    frame[5] = calc_crc8(frame, 3, 5)
+    results = {}
+    results["bitwise_per_s"] = transactions_per_second(
+        lambda: (calc_crc8_bitwise(frame, 0, 2), calc_crc8_bitwise(frame, 3, 5)), transactions)
+    results["table_per_s"] = transactions_per_second(
+        lambda: (calc_crc8(frame, 0, 2), calc_crc8(frame, 3, 5)), transactions)
+    frames = bytes(frame) * transactions
+    start = time.perf_counter()
+    if find_crc8_errors(frames):
+        raise AssertionError("crc8 batch reported an error for a valid frame")
+    results["batch_per_s"] = transactions / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_scheduler(args):
+    """4 buses with 4 sensors each at 10 mps, 2 ms simulated latency per transaction"""
+    pool = SMBusPool(bus_factory=lambda bus_number: SimulatedSMBus(bus_number, latency=0.002))
+    scheduler = PollingScheduler()
+    sensors = [HDC3020(address, bus_number=bus_number, pool=pool)
+               for bus_number in range(1, 5) for address in range(0x44, 0x48)]
+    for sensor in sensors:
+        scheduler.add_sensor(sensor, 4)
+    scheduler.run_for(args.duration)
+    statistics = list(scheduler.statistics().values())
+    for sensor in sensors:
+        sensor.close()
+    return {
+        "sensors": len(statistics),
+        "requested_rate_per_sensor": statistics[0].rate,
+        "min_achieved_rate_per_sensor": min(stat.achieved_rate for stat in statistics),
+        "samples": sum(stat.samples for stat in statistics),
+        "missed_deadlines": sum(stat.missed_deadlines for stat in statistics),
+        "mean_jitter_ms": 1000 * sum(stat.mean_jitter for stat in statistics) / len(statistics),
+        "max_jitter_ms": 1000 * max(stat.jitter_max for stat in statistics),
+    }
+
+
+async def _asyncio_benchmark(sensors, rounds):
+    """periodic reads through run_in_executor and AsyncHDC3020, single shot cycle time"""
+    loop = asyncio.get_running_loop()
+    async_sensors = [AsyncHDC3020(sensor) for sensor in sensors]
+    results = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(loop.run_in_executor(None, sensor.get_periodic_measurement_temp_hum)
+                               for sensor in sensors))
+    results["executor_reads_per_s"] = rounds * len(sensors) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(sensor.get_periodic_measurement_temp_hum()
+                               for sensor in async_sensors))
+    results["async_reads_per_s"] = rounds * len(sensors) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    await asyncio.gather(*(sensor.get_single_shot_temp_hum(0) for sensor in async_sensors))
+    results["async_single_shot_cycle_ms"] = 1000 * (time.perf_counter() - start)
+    return results
+
+
+def benchmark_asyncio(args):
+    """200 sensors on 50 simulated buses sharing one event loop"""
+    pool = SMBusPool(bus_factory=SimulatedSMBus)
+    sensors = [HDC3020(HDC3020_ADDRESSES[index % 4], bus_number=1 + index // 4, pool=pool)
+               for index in range(200)]
+    for sensor in sensors:
+        sensor.start_periodic_measurement(1, 0)
+    results = asyncio.run(_asyncio_benchmark(sensors, max(args.iterations // 2000, 1)))
+    for sensor in sensors:
+        sensor.close()
+    return results
+
+
+def benchmark_pipeline(args):
+    """single shot cycle of 16 sensors, one after the other and pipelined"""
+    pool = SMBusPool(bus_factory=SimulatedSMBus)
+    sensors = [HDC3020(address, bus_number=bus_number, pool=pool)
+               for bus_number in range(1, 5) for address in range(0x44, 0x48)]
+    rounds = max(args.iterations // 2000, 1)
+    results = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sensor in sensors:
+            sensor.trigger_single_shot(0)
+            time.sleep(SINGLE_SHOT_CONVERSION_TIMES[0])
+            sensor.collect_single_shot()
+    results["sequential_cycle_ms"] = 1000 * (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        read_single_shot_pipelined(sensors, 0)
+    results["pipelined_cycle_ms"] = 1000 * (time.perf_counter() - start) / rounds
+    for sensor in sensors:
+        sensor.close()
+    return results
+
+
+def benchmark_stream(args):
+    """ring buffer appends, cursor reads and latest views"""
+    ring_buffer = SampleRingBuffer(4096)
+    cursor = StreamCursor(ring_buffer)
+    results = {}
+    results["append_per_s"] = transactions_per_second(
+        lambda: ring_buffer.append(1.0, 0x6666, 0x8000), args.iterations)
+    cursor.read()
+    results["overruns_of_idle_consumer"] = cursor.overruns
+    start = time.perf_counter()
+    for _ in range(args.iterations // 1000):
+        for _ in range(1000):
+            ring_buffer.append(1.0, 0x6666, 0x8000)
+        cursor.read()
+    results["append_read_per_s"] = (args.iterations // 1000 * 1000) / (time.perf_counter() - start)
+    results["latest_1000_per_s"] = transactions_per_second(
+        lambda: ring_buffer.latest(1000), args.iterations)
+    return results
+
+
+def benchmark_conversion(args):
+    """temperature, humidity and dewpoint of stored raw frames, per sample and batched"""
+    frames = bytearray()
+    for index in range(args.iterations):
+        frame = [(index * 7) & 0xFF, 0x60, 0, (index * 13) & 0xFF, 0x80, 0]
+        frame[2] = calc_crc8(frame, 0, 2)
+        frame[5] = calc_crc8(frame, 3, 5)
+        frames += bytes(frame)
+    results = {}
+    start = time.perf_counter()
+    for offset in range(0, len(frames), 6):
+        temperature, humidity = decode_temp_hum(frames[offset:offset + 6])
+        calc_dewpoint(temperature, humidity)
+    results["scalar_per_s"] = args.iterations / (time.perf_counter() - start)
+    convert_frames(frames[:6], use_numpy=False)
+    start = time.perf_counter()
+    convert_frames(frames, use_numpy=False)
+    results["batch_array_per_s"] = args.iterations / (time.perf_counter() - start)
+    if numpy is not None:
+        start = time.perf_counter()
+        convert_frames(frames, use_numpy=True)
+        results["batch_numpy_per_s"] = args.iterations / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_capture(args):
+    """record periodic reads, replay them through HDC3020 and batch convert the file"""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.cap")
+        with CaptureWriter(path) as writer, SimulatedSMBus(1) as bus:
+            hdc3020 = HDC3020(I2C_ADDRESS, bus=CapturingBus(bus, writer))
+            hdc3020.start_periodic_measurement(1, 0)
+            results["capture_per_s"] = transactions_per_second(
+                hdc3020.get_periodic_measurement_temp_hum, args.iterations)
+        with ReplayBus(path) as bus:
+            hdc3020 = HDC3020(I2C_ADDRESS, bus=bus)
+            hdc3020.start_periodic_measurement(1, 0)
+            results["replay_decode_per_s"] = transactions_per_second(
+                hdc3020.get_periodic_measurement_temp_hum, args.iterations)
+        start = time.perf_counter()
+        frames = load_measurement_frames(path)[2]
+        convert_frames(frames)
+        results["batch_reprocess_per_s"] = args.iterations / (time.perf_counter() - start)
+    return results
+
+
+def percentile(sorted_values, fraction):
+    """nearest rank percentile of an already sorted list"""
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure_reads(function, iterations):
+    """reads/s, p50/p99 latency and allocations of one library read function
+
+    alloc_bytes_per_read is the traced memory peak during a read above the
+    memory in use before it, retained_blocks_per_read the growth of allocated
+    memory blocks over all reads (0 unless a read leaks).
+    """
+    function()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        function()
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(iterations):
+        function()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+    alloc_samples = min(iterations, 1000)
+    peak_sum = 0
+    tracemalloc.start()
+    for _ in range(alloc_samples):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        peak_sum += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return {
+        "reads_per_s": iterations / (sum(latencies) / 1e9),
+        "p50_us": percentile(latencies, 0.50) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+        "alloc_bytes_per_read": peak_sum / alloc_samples,
+        "retained_blocks_per_read": retained_blocks / iterations,
+    }
+
+
+def benchmark_reads(args):
+    """library read paths against one simulated HDC3020 in periodic mode"""
+    results = {}
+    with SimulatedSMBus(1, latency=args.latency, devices=periodic_devices()) as bus:
+        hdc3020 = HDC3020(I2C_ADDRESS, bus=bus)
+
+        def min_max():
+            hdc3020.get_periodic_measurement_min_temp()
+            hdc3020.get_periodic_measurement_max_temp()
+            hdc3020.get_periodic_measurement_min_hum()
+            hdc3020.get_periodic_measurement_max_hum()
+
+        def identification_uncached():
+            hdc3020.invalidate_cache()
+            return hdc3020.read_identification()
+
+        paths = {
+            "single_shot": lambda: hdc3020.get_single_shot_temp_hum(0),
+            "periodic": hdc3020.get_periodic_measurement_temp_hum,
+            "min_max": min_max,
+            "identification_uncached": identification_uncached,
+            "identification_cached": hdc3020.read_identification,
+        }
+        for name, function in paths.items():
+            for key, value in measure_reads(function, args.iterations // 10).items():
+                results[name + "." + key] = value
+    return results
+
+
+def benchmark_snapshot(args):
+    """health frame from six separate reads and from read_snapshot"""
+    results = {}
+    with SimulatedSMBus(1, latency=args.latency, devices=periodic_devices()) as bus:
+        hdc3020 = HDC3020(I2C_ADDRESS, bus=bus)
+
+        def separate_reads():
+            hdc3020.get_periodic_measurement_temp_hum()
+            hdc3020.get_periodic_measurement_min_temp()
+            hdc3020.get_periodic_measurement_max_temp()
+            hdc3020.get_periodic_measurement_min_hum()
+            hdc3020.get_periodic_measurement_max_hum()
+            hdc3020.constant_heater_on_off()
+
+        frames = max(args.iterations // 10, 1)
+        for name, function in (("separate", separate_reads), ("snapshot", hdc3020.read_snapshot)):
+            transactions = bus.transactions
+            results[name + "_frames_per_s"] = transactions_per_second(function, frames)
+            results[name + "_transactions_per_frame"] = (bus.transactions - transactions) / frames
+    return results
+
+
+def benchmark_config_cache(args):
+    """health check of identification and configuration registers, uncached and cached"""
+    results = {}
+    with SimulatedSMBus(1, latency=args.latency, devices=periodic_devices()) as bus:
+        for name, config_ttl in (("uncached", 0), ("cached", None)):
+            hdc3020 = HDC3020(I2C_ADDRESS, bus=bus, config_ttl=config_ttl)
+
+            def health_check():
+                if config_ttl == 0:
+                    hdc3020.invalidate_cache()
+                hdc3020.read_identification()
+                hdc3020.read_offset_value()
+                hdc3020.read_heater_current()
+                hdc3020.read_set_low_alert()
+                hdc3020.read_clear_low_alert()
+                hdc3020.read_set_high_alert()
+                hdc3020.read_clear_high_alert()
+
+            checks = max(args.iterations // 10, 1)
+            health_check()
+            transactions = bus.transactions
+            results[name + "_checks_per_s"] = transactions_per_second(health_check, checks)
+            results[name + "_transactions_per_check"] = (bus.transactions - transactions) / checks
+    return results
+
+
+class NullBus():
+    """bus doing nothing, isolates the library cost of building a transaction"""
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """ignore the messages"""
+
+    def close(self):
+        """nothing to close"""
+
+
+class FrameBus(NullBus):
+    """bus answering every read with the same valid measurement frame"""
+
+    frame = bytes((0x66, 0x66, 0x93, 0x80, 0x00, 0xA2))
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """fill the read messages"""
+        for msg in i2c_msgs:
+            if msg.flags & I2C_M_RD:
+                fill_read_message(msg, self.frame)
+
+
+def benchmark_daemon(args):
+    """samples/s of 1, 2 and 4 buses with 4 sensors each, as threads of one process and as daemon"""
+    results = {"cores": os.cpu_count()}
+    prefix = "hdc3020-benchmark-%d" % os.getpid()
+    for buses in (1, 2, 4):
+        workers = [BusWorker(bus_number, HDC3020_ADDRESSES, interval=0)
+                   for bus_number in range(1, buses + 1)]
+        rings = [SharedSampleRing("%s-bus%d" % (prefix, worker.bus_number), 4096)
+                 for worker in workers]
+        readers = [SampleReader(ring.name) for ring in rings]
+        stop = threading.Event()
+        threads = [threading.Thread(target=run_bus_worker, args=(worker, ring.name, stop, True))
+                   for worker, ring in zip(workers, rings)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        results["threads_%d_buses_samples_per_s" % buses] = sum(
+            reader.write_count for reader in readers) / args.duration
+        for reader, ring in zip(readers, rings):
+            reader.close()
+            ring.close()
+            ring.unlink()
+        with SensorFarm(workers, prefix, capacity=4096, simulate=True) as farm:
+            readers = [SampleReader(farm.ring_name(worker.bus_number)) for worker in workers]
+            # leave the start up of the processes out of the measurement
+            time.sleep(0.2)
+            start = [reader.write_count for reader in readers]
+            time.sleep(args.duration)
+            samples = sum(reader.write_count - count for reader, count in zip(readers, start))
+            for reader in readers:
+                reader.close()
+        results["processes_%d_buses_samples_per_s" % buses] = samples / args.duration
+    return results
+
+
+def benchmark_commands(args):
+    """cost per call of encoding commands with fresh messages and with prebuilt ones"""
+    hdc3020 = HDC3020(I2C_ADDRESS, bus=FrameBus())
+    command = HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT
+    paths = {
+        "fresh_start_periodic": lambda: hdc3020.wire_write(
+            [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0 >> 8),
+             (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0 & 0xFF)]),
+        "prebuilt_start_periodic": lambda: hdc3020.start_periodic_measurement(4, 0),
+        "fresh_read": lambda: decode_raw_temp_hum(
+            hdc3020.wire_write_read([(command >> 8), (command & 0xFF)], 6)),
+        "prebuilt_read": hdc3020.get_periodic_measurement_raw,
+    }
+    results = {}
+    for name, function in paths.items():
+        measured = measure_reads(function, args.iterations)
+        results[name + "_per_s"] = measured["reads_per_s"]
+        results[name + "_alloc_bytes"] = measured["alloc_bytes_per_read"]
+    return results
+
+
+def benchmark_aggregation(args):
+    """cost per sample of rolling windows from 10 to 100000 samples, and of a 3 window sensor"""
+    trace = [sample[1] for sample in filter_trace(args.iterations + 100000)]
+    results = {}
+    for length in (10, 100, 1000, 10000, 100000):
+        window = RollingWindow(max_samples=length)
+        for index in range(length):
+            window.add(index, trace[index])
+        add = window.add
+        start = time.perf_counter()
+        for index in range(length, length + args.iterations):
+            add(index, trace[index])
+        results["window_%d_ns_per_sample" % length] = (
+            1e9 * (time.perf_counter() - start) / args.iterations)
+    # one sample per second for one hour prefilled, windows of 1 min, 5 min and 1 h
+    aggregator = SensorAggregator()
+    for index in range(3600):
+        aggregator.add(float(index), trace[index], 0x8000)
+    start = time.perf_counter()
+    for index in range(3600, 3600 + args.iterations):
+        aggregator.add(float(index), trace[index], 0x8000)
+    results["sensor_3_windows_ns_per_sample"] = (
+        1e9 * (time.perf_counter() - start) / args.iterations)
+    results["statistics_per_s"] = transactions_per_second(aggregator.statistics, 10000)
+    return results
+
+
+def benchmark_align(args):
+    """samples/s aligned from 100 drifting sensors at 10 mps, with 1 % lost samples"""
+    sensors = 100
+    seconds = max(args.iterations // 1000, 10)
+    generator = random.Random(25)
+    samples = []
+    for sensor in range(sensors):
+        # ±200 ppm clock drift, random phase, 1 ms jitter of the read
+        period = 0.1 * (1 + generator.uniform(-200e-6, 200e-6))
+        timestamp = generator.uniform(0, 0.1)
+        while timestamp < seconds:
+            if generator.random() >= 0.01:
+                samples.append((timestamp + generator.uniform(0, 0.001), sensor,
+                                20.0 + sensor / 100, 50.0))
+            timestamp += period
+    samples.sort()
+    results = {}
+    for method in (ALIGN_NEAREST, ALIGN_LINEAR):
+        aligner = StreamAligner(0.1, tolerance=0.1, method=method, sources=range(sensors))
+        add = aligner.add
+        missing = 0
+        start = time.perf_counter()
+        for timestamp, sensor, temperature, humidity in samples:
+            for frame in add(sensor, timestamp, temperature, humidity):
+                missing += frame.values.count(None)
+        elapsed = time.perf_counter() - start
+        results[method + "_samples_per_s"] = len(samples) / elapsed
+        results[method + "_frames"] = aligner.frames
+        results[method + "_missing_values"] = missing / max(aligner.frames * sensors, 1)
+    return results
+
+
+def benchmark_alert(args):
+    """bus transactions of polling every sample vs alert driven reads on a mostly stable trace"""
+    samples = args.iterations
+    # stable at 23 °C with an excursion above the 30 °C alert threshold every 1000 samples
+    trace = [31.0 if index % 1000 >= 990 else 23.0 + 0.01 * (index % 7) for index in range(samples)]
+    with SimulatedSMBus(1, devices={I2C_ADDRESS: SimulatedHDC3020()}) as bus:
+        hdc3020 = HDC3020(I2C_ADDRESS, bus=bus)
+        device = bus.devices[I2C_ADDRESS]
+        hdc3020.start_periodic_measurement(4, 0)
+        start_transactions = bus.transactions
+        for temperature in trace:
+            device.set_measurement(temperature, 50.0)
+            hdc3020.get_periodic_measurement_temp_hum()
+        polling_transactions = bus.transactions - start_transactions
+
+        edges = FakeEdgeSource()
+        device.on_alert_change = lambda active: active and edges.trigger()
+        write_alert_thresholds(hdc3020, (-40, 0), (-39, 1), (30, 100), (29, 100))
+        watcher = AlertWatcher(hdc3020, edges, lambda event: None)
+        start_transactions = bus.transactions
+        for temperature in trace:
+            device.set_measurement(temperature, 50.0)
+            watcher.run_once()
+        alert_transactions = bus.transactions - start_transactions
+    return {
+        "samples": samples,
+        "polling_transactions": polling_transactions,
+        "alert_transactions": alert_transactions,
+        "alert_events": watcher.events,
+        "transaction_reduction": polling_transactions / max(alert_transactions, 1),
+    }
+
+
+def benchmark_discovery(args):
+    """startup time of finding 16 sensors on 4 simulated buses, 0.5 ms per transaction"""
+    buses = {bus_number: SimulatedSMBus(bus_number, latency=0.0005) for bus_number in range(1, 5)}
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "discovery.json")
+        for name, max_workers, path in (("sequential", 1, None), ("parallel", None, None),
+                                        ("cache_miss", None, cache_path),
+                                        ("cache_hit", None, cache_path)):
+            start = time.perf_counter()
+            sensors = discover(list(buses), cache_path=path, board="benchmark",
+                               bus_factory=buses.get, max_workers=max_workers)
+            results[name + "_ms"] = (time.perf_counter() - start) * 1000
+            results[name + "_sensors"] = len(sensors)
+    return results
+
+
+def benchmark_export(args):
+    """rows/s of the print per sample loop of the examples and of CsvSink, to a line buffered file"""
+    trace = filter_trace(args.iterations)
+    results = {}
+    with open(os.devnull, "w", encoding="utf-8", buffering=1) as output:
+        start = time.perf_counter()
+        for _, raw_temperature, raw_humidity in trace:
+            temperature = raw_to_temperature(raw_temperature)
+            humidity = raw_to_humidity(raw_humidity)
+            dewpoint = calc_dewpoint(temperature, humidity)
+            print('%0.2f °C' % temperature, ",", '%0.2f %%RH' % humidity, ",",
+                  '%0.2f °C' % dewpoint, file=output)
+        results["print_rows_per_s"] = len(trace) / (time.perf_counter() - start)
+        for flush_size in (100, 1000):
+            start = time.perf_counter()
+            with CsvSink(output, flush_size=flush_size) as sink:
+                for timestamp, raw_temperature, raw_humidity in trace:
+                    sink.append(timestamp, I2C_ADDRESS, raw_temperature, raw_humidity)
+            results["csv_sink_%d_rows_per_s" % flush_size] = (
+                len(trace) / (time.perf_counter() - start))
+    return results
+
+
+def benchmark_recovery(args):
+    """periodic reads with 1 % NACKs, 0.5 % crc errors and a brown out every 5000 reads"""
+    results = {}
+    for name in ("plain", "resilient"):
+        device = SimulatedHDC3020(nack_rate=0.01, crc_error_rate=0.005, seed=1)
+        with SimulatedSMBus(1, devices={I2C_ADDRESS: device}) as bus:
+            sensor = HDC3020(I2C_ADDRESS, bus=bus)
+            if name == "resilient":
+                sensor = ResilientHDC3020(sensor, RetryPolicy(seed=1), sleep=lambda delay: None)
+            sensor.start_periodic_measurement(4, 0)
+            failed = 0
+            latencies = []
+            for index in range(args.iterations):
+                if index % 5000 == 4999:
+                    device.brown_out()
+                start = time.perf_counter()
+                try:
+                    sensor.get_periodic_measurement_raw()
+                except Warning:
+                    failed += 1
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        results[name + "_failed_reads"] = failed
+        results[name + "_p99_us"] = 1e6 * percentile(latencies, 0.99)
+        if name == "resilient":
+            for counter, value in sensor.errors.as_dict().items():
+                results["resilient_" + counter] = value
+    # cost of the wrapper on the success path
+    with SimulatedSMBus(1, devices=periodic_devices()) as bus:
+        sensor = HDC3020(I2C_ADDRESS, bus=bus)
+        resilient = ResilientHDC3020(HDC3020(I2C_ADDRESS, bus=bus))
+        results["plain_reads_per_s"] = transactions_per_second(
+            sensor.get_periodic_measurement_raw, args.iterations)
+        results["resilient_reads_per_s"] = transactions_per_second(
+            resilient.get_periodic_measurement_raw, args.iterations)
+    return results
+
+
+class VirtualClock():
+    """clock and sleep of simulated time"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """advance the time"""
+        self.now += max(seconds, 0.0)
+
+
+def room_trace(duration, events=(600, 1800, 3000)):
+    """10 Hz trace of a room: slow drift with noise, a window opened at each event time"""
+    noise = random.Random(1)
+    trace = []
+    for index in range(int(duration * 10)):
+        now = index / 10
+        temperature = 22.0 + 0.5 * math.sin(now / 900) + noise.gauss(0, 0.01)
+        humidity = 45.0 + 2 * math.sin(now / 1300) + noise.gauss(0, 0.05)
+        for event in events:
+            if event <= now < event + 600:
+                # 3 °C colder and 10 %RH more humid within ~20 s, recovering within minutes
+                shape = (1 - math.exp(-(now - event) / 20)) * math.exp(-(now - event) / 120)
+                temperature -= 3.0 * shape
+                humidity += 10.0 * shape
+        trace.append((now, temperature, humidity))
+    return trace
+
+
+def benchmark_adaptive(args):
+    """bus transactions and sample and hold error of fixed and adaptive rates on a 1 h room trace"""
+    duration = 3600
+    trace = room_trace(duration)
+    controllers = {
+        "fixed_10_mps": lambda sensor, clock: AdaptiveRateController(
+            sensor, levels=((4, 0),), clock=clock, sleep=clock.sleep),
+        "fixed_0_5_mps": lambda sensor, clock: AdaptiveRateController(
+            sensor, levels=((0, 3),), clock=clock, sleep=clock.sleep),
+        "adaptive": lambda sensor, clock: AdaptiveRateController(
+            sensor, clock=clock, sleep=clock.sleep),
+    }
+    results = {}
+    for name, factory in controllers.items():
+        clock = VirtualClock()
+        device = SimulatedHDC3020(clock=clock)
+        device.replay(trace)
+        samples = []
+        with SimulatedSMBus(1, devices={I2C_ADDRESS: device}) as bus:
+            controller = factory(HDC3020(I2C_ADDRESS, bus=bus), clock)
+            controller.callback = lambda timestamp, temperature, humidity, level: samples.append(
+                (timestamp, raw_to_temperature(temperature)))
+            controller.run_for(duration)
+            results[name + "_transactions"] = bus.transactions
+        # error of the latest sample seen at every trace sample
+        sample_times = [sample[0] for sample in samples]
+        squares = 0.0
+        worst = 0.0
+        counted = 0
+        for now, temperature, _ in trace:
+            index = bisect.bisect_right(sample_times, now) - 1
+            if index < 0:
+                continue
+            error = abs(samples[index][1] - temperature)
+            squares += error * error
+            worst = max(worst, error)
+            counted += 1
+        results[name + "_rms_error"] = math.sqrt(squares / counted)
+        results[name + "_max_error"] = worst
+        results[name + "_switches"] = controller.switches
+    results["adaptive_transactions_saved"] = 1 - (results["adaptive_transactions"] /
+                                                  results["fixed_10_mps_transactions"])
+    return results
+
+
+def benchmark_prometheus(args):
+    """scrape latency of 32 concurrent keep-alive clients, 4 sensors sampled at 10 Hz"""
+    clients = 32
+    with SimulatedSMBus(1, latency=0.0005) as bus:
+        sensors = [HDC3020(address, bus=bus) for address in HDC3020_ADDRESSES]
+        exporter = MetricsExporter(sensors, interval=0.1)
+        latencies = [[] for _ in range(clients)]
+        stop = threading.Event()
+
+        def scrape(client_latencies):
+            connection = http.client.HTTPConnection("127.0.0.1", server.port)
+            while not stop.is_set():
+                start = time.perf_counter()
+                connection.request("GET", "/metrics")
+                connection.getresponse().read()
+                client_latencies.append(time.perf_counter() - start)
+            connection.close()
+
+        with MetricsServer(exporter, "127.0.0.1", 0) as server:
+            start_transactions = bus.transactions
+            start = time.perf_counter()
+            threads = [threading.Thread(target=scrape, args=(client_latencies,))
+                       for client_latencies in latencies]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            transactions = bus.transactions - start_transactions
+            elapsed = time.perf_counter() - start
+    all_latencies = sorted(latency for client_latencies in latencies
+                           for latency in client_latencies)
+    return {
+        "clients": clients,
+        "scrapes_per_s": len(all_latencies) / elapsed,
+        "scrape_p50_ms": 1000 * percentile(all_latencies, 0.5),
+        "scrape_p99_ms": 1000 * percentile(all_latencies, 0.99),
+        "bus_transactions_per_s": transactions / elapsed,
+    }
+
+
+def benchmark_heater(args):
+    """reads/s of 4 sensors at 10 mps in condensing air, heating in the loop vs HeaterManager"""
+    heat_time = args.duration / 8
+    results = {}
+    with SimulatedSMBus(1) as bus:
+        bus.set_measurement(20.0, 97.0)
+        sensors = [HDC3020(address, bus=bus) for address in HDC3020_ADDRESSES]
+        for sensor in sensors:
+            sensor.start_periodic_measurement(4, 0)
+        # heater on, wait and off in the acquisition loop, as done before
+        samples = 0
+        heated = set()
+        end = time.monotonic() + args.duration
+        deadline = time.monotonic()
+        while time.monotonic() < end:
+            deadline += 0.1
+            time.sleep(max(deadline - time.monotonic(), 0))
+            for sensor in sensors:
+                temperature, humidity = sensor.get_periodic_measurement_temp_hum()
+                samples += 1
+                if humidity >= 95.0 and sensor not in heated:
+                    heated.add(sensor)
+                    sensor.heater_on()
+                    time.sleep(heat_time)
+                    sensor.heater_off()
+                    deadline = time.monotonic()
+        results["blocking_reads_per_s"] = samples / args.duration
+        for sensor in sensors:
+            sensor.end_periodic_measurement()
+        heater = HeaterManager(heat_time=heat_time, recovery_time=heat_time,
+                               cooldown=args.duration)
+        scheduler = PollingScheduler(heater=heater)
+        statistics = [scheduler.add_sensor(sensor, 4) for sensor in sensors]
+        scheduler.run_for(args.duration)
+        results["managed_reads_per_s"] = sum(entry.samples for entry in statistics) / args.duration
+        results["managed_masked_samples"] = sum(entry.masked for entry in statistics)
+        results["managed_heat_cycles"] = heater.cycles
+        results["managed_max_concurrent_heaters"] = heater.max_active
+    return results
+
+
+IMPORT_CASES = {
+    "conversion": "import hdc3020_i2c_conversion",
+    "library": "import hdc3020_i2c_library",
+    "library_smbus2": "import hdc3020_i2c_library, hdc3020_i2c_backend\n"
+                      "hdc3020_i2c_backend.select_backend('smbus2')",
+    "library_ioctl": "import hdc3020_i2c_library, hdc3020_i2c_backend\n"
+                     "hdc3020_i2c_backend.select_backend('ioctl')",
+    "library_simulator": "import hdc3020_i2c_library, hdc3020_i2c_backend\n"
+                         "hdc3020_i2c_backend.select_backend('simulator')",
+    # what loading the library cost when it imported smbus2 and numpy at once
+    "library_smbus2_numpy": "import hdc3020_i2c_library, hdc3020_i2c_backend, numpy\n"
+                            "hdc3020_i2c_backend.select_backend('smbus2')",
+}
+
+
+def benchmark_imports(args):
+    """import time in fresh interpreters of the library and its backends, median of 7 runs"""
+    results = {}
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name, code in IMPORT_CASES.items():
+        script = ("import time\nstart = time.perf_counter()\n%s\n"
+                  "print(time.perf_counter() - start)" % code)
+        times = []
+        for _ in range(7):
+            process = subprocess.run([sys.executable, "-c", script], cwd=directory,
+                                     capture_output=True, text=True, check=False)
+            if process.returncode:
+                break
+            times.append(float(process.stdout))
+        if times:
+            results[name + "_ms"] = sorted(times)[len(times) // 2] * 1000
+    return results
+
+
+def benchmark_instrumentation(args):
+    """periodic read cost without, with disabled and with enabled instrumentation"""
+    with SimulatedSMBus(1, devices=periodic_devices()) as bus:
+        sensor = HDC3020(I2C_ADDRESS, bus=bus)
+        read = sensor.get_periodic_measurement_raw
+
+        def best_of_5():
+            return max(transactions_per_second(read, args.iterations) for _ in range(5))
+        results = {"plain_reads_per_s": best_of_5()}
+        instrument(sensor, HistogramSink())
+        uninstrument(sensor)
+        results["disabled_reads_per_s"] = best_of_5()
+        instrument(sensor, lambda event: None)
+        results["enabled_callback_reads_per_s"] = best_of_5()
+        uninstrument(sensor)
+        instrument(sensor, HistogramSink())
+        results["enabled_histogram_reads_per_s"] = best_of_5()
+        uninstrument(sensor)
+    results["disabled_overhead_percent"] = 100 * (
+        results["plain_reads_per_s"] / results["disabled_reads_per_s"] - 1)
+    return results
+
+
+def filter_trace(samples):
+    """raw samples at 1 Hz: ±2 count noise, a step every 500 samples and slow humidity ramps"""
+    random_state = 12345
+    trace = []
+    for index in range(samples):
+        random_state = (1103515245 * random_state + 12345) & 0x7FFFFFFF
+        noise = random_state >> 16
+        trace.append((float(index), 0x6666 + 40 * (index // 500 % 4) + noise % 5 - 2,
+                      0x8000 + (index % 700) // 3 + (noise >> 4) % 7 - 3))
+    return trace
+
+
+def benchmark_filter(args):
+    """compression ratio and cost per sample of the change filters on a noisy, mostly flat trace"""
+    trace = filter_trace(args.iterations)
+    filters = {
+        "deadband": lambda: ChangeFilter(0.05, 0.05),
+        "heartbeat": lambda: ChangeFilter(0.05, 0.05, max_silence=60),
+        "relative": lambda: ChangeFilter(relative_deadband=0.005),
+        "swinging_door": lambda: ChangeFilter(0.05, 0.05, swinging_door=True),
+    }
+    results = {}
+    for name, factory in filters.items():
+        change_filter = factory()
+        process = change_filter.process
+        start = time.perf_counter()
+        for sample in trace:
+            process(*sample)
+        change_filter.flush()
+        results[name + "_per_s"] = len(trace) / (time.perf_counter() - start)
+        results[name + "_compression_ratio"] = change_filter.compression_ratio
+    return results
+
+
+BENCHMARKS = {
+    "adaptive": benchmark_adaptive,
+    "aggregation": benchmark_aggregation,
+    "alert": benchmark_alert,
+    "align": benchmark_align,
+    "asyncio": benchmark_asyncio,
+    "bus_pool": benchmark_bus_pool,
+    "capture": benchmark_capture,
+    "commands": benchmark_commands,
+    "config_cache": benchmark_config_cache,
+    "conversion": benchmark_conversion,
+    "crc8": benchmark_crc8,
+    "daemon": benchmark_daemon,
+    "discovery": benchmark_discovery,
+    "export": benchmark_export,
+    "filter": benchmark_filter,
+    "heater": benchmark_heater,
+    "imports": benchmark_imports,
+    "instrumentation": benchmark_instrumentation,
+    "pipeline": benchmark_pipeline,
+    "prometheus": benchmark_prometheus,
+    "reads": benchmark_reads,
+    "recovery": benchmark_recovery,
+    "snapshot": benchmark_snapshot,
+    "scheduler": benchmark_scheduler,
+    "stream": benchmark_stream,
+}
+
+
+def main():
+    """run the selected benchmarks and print the results"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*",
+                        help="benchmarks to run, all if omitted: " + ", ".join(sorted(BENCHMARKS)))
+    parser.add_argument("-n", "--iterations", type=int, default=20000)
+    parser.add_argument("-d", "--duration", type=float, default=2.0,
+                        help="run time in seconds of the timed benchmarks")
+    parser.add_argument("-l", "--latency", type=float, default=0.0,
+                        help="simulated bus latency in seconds of the reads benchmark")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON for regression tracking")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark: " + name)
+    results = {}
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        results[name] = BENCHMARKS[name](args)
+        if not args.json:
+            for key, value in results[name].items():
+                print("%s.%s: %0.2f" % (name, key, value))
+    if args.json:
+        print(json.dumps({
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "iterations": args.iterations,
+            "results": results,
+        }, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
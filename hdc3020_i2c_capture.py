@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Capture of raw HDC3020 I2C transactions to a file and replay without hardware.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import errno
+import mmap
+import os
+import struct
+import time
+from hdc3020_i2c_conversion import load_numpy
+from hdc3020_i2c_library import I2C_M_RD, fill_read_message
+
+# File layout: a 16 byte header followed by fixed size little endian records.
+# header: magic (10s), version (H), record size (H), reserved (2x)
+# record: monotonic timestamp (d), command (H), i2c address (B), kind (B),
+#         number of data bytes (B), data (6s), error (H), reserved (3x)
+# data holds the bytes read by the sensor for reads and the bytes written
+# after the command for writes, a write of less than 2 bytes has NO_COMMAND
+# and its bytes as data. error is the errno of a failed transaction, 0 if it
+# succeeded. Version 1 had reserved zero bytes in place of error, its files
+# are read as captures without failed transactions.
+CAPTURE_MAGIC = b"HDC3020CAP"
+CAPTURE_VERSION = 2
+CAPTURE_READ_VERSIONS = (1, 2)
+CAPTURE_HEADER = struct.Struct("<10sHH2x")
+CAPTURE_RECORD = struct.Struct("<dHBBB6sH3x")
+CAPTURE_KIND_WRITE = 1
+CAPTURE_KIND_READ = 2
+CAPTURE_KIND_WRITE_READ = 3
+NO_COMMAND = 0xFFFF
+_CAPTURE_FIELDS = [("timestamp", "<f8"), ("command", "<u2"), ("address", "u1"), ("kind", "u1"),
+                   ("length", "u1"), ("data", "u1", 6), ("error", "<u2"), ("reserved", "V3")]
+
+
+def __getattr__(name):
+    """CAPTURE_DTYPE, the numpy dtype of a record, created on first access"""
+    if name == "CAPTURE_DTYPE":
+        return _capture_dtype()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def _capture_dtype():
+    """numpy dtype of a record, raises ImportError without numpy"""
+    numpy = load_numpy()
+    if numpy is None:
+        raise ImportError("numpy is not installed")
+    return numpy.dtype(_CAPTURE_FIELDS)
+
+
+def split_write(written):
+    """(command, data) of the bytes of a write message, NO_COMMAND for less than 2 bytes"""
+    if len(written) < 2:
+        return NO_COMMAND, written
+    return (written[0] << 8) | written[1], written[2:]
+
+
+def split_transaction(i2c_msgs):
+    """group the messages of one i2c_rdwr call into (kind, write message, read message)"""
+    groups = []
+    pending_write = None
+    for msg in i2c_msgs:
+        if msg.flags & I2C_M_RD:
+            if pending_write is None:
+                groups.append((CAPTURE_KIND_READ, None, msg))
+            else:
+                groups.append((CAPTURE_KIND_WRITE_READ, pending_write, msg))
+                pending_write = None
+        else:
+            if pending_write is not None:
+                groups.append((CAPTURE_KIND_WRITE, pending_write, None))
+            pending_write = msg
+    if pending_write is not None:
+        groups.append((CAPTURE_KIND_WRITE, pending_write, None))
+    return groups
+
+
+def _check_header(header):
+    """return the version of a capture file header, raise ValueError if it is not supported"""
+    if len(header) != CAPTURE_HEADER.size:
+        raise ValueError("not a HDC3020 capture file")
+    magic, version, record_size = CAPTURE_HEADER.unpack(header)
+    if (magic != CAPTURE_MAGIC or version not in CAPTURE_READ_VERSIONS or
+            record_size != CAPTURE_RECORD.size):
+        raise ValueError("not a HDC3020 capture file")
+    return version
+
+
+class CaptureWriter():
+    """Appends transaction records to a capture file.
+
+    A partial record at the end of an existing file, left by a crash, is cut
+    off before appending, it would shift all later records. A version 1 file
+    is marked as version 2 first.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        try:
+            with open(path, "r+b") as capture_file:
+                size = os.fstat(capture_file.fileno()).st_size
+                if size:
+                    if _check_header(capture_file.read(CAPTURE_HEADER.size)) != CAPTURE_VERSION:
+                        capture_file.seek(0)
+                        capture_file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION,
+                                                               CAPTURE_RECORD.size))
+                    capture_file.truncate(CAPTURE_HEADER.size + (size - CAPTURE_HEADER.size) //
+                                          CAPTURE_RECORD.size * CAPTURE_RECORD.size)
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, CAPTURE_RECORD.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, timestamp, address, kind, command, data, error=0):
+        """append one record, error is the errno of a failed transaction"""
+        self._file.write(CAPTURE_RECORD.pack(timestamp, command, address, kind, len(data),
+                                             bytes(data), error))
+        self.records += 1
+
+    def flush(self):
+        """write buffered records to the file"""
+        self._file.flush()
+
+    def close(self):
+        """flush and close the file"""
+        if not self._file.closed:
+            self._file.close()
+
+
+class CapturingBus():
+    """Wraps a bus object and records every transaction to a CaptureWriter.
+
+    Usable wherever the library takes a bus, e.g.
+    HDC3020(0x44, bus=CapturingBus(SMBus(1), writer)) or as bus_factory of
+    an SMBusPool. The timestamp is taken right after i2c_rdwr returned. A
+    failed transaction is recorded with its errno and without read data,
+    then its exception is raised again.
+    """
+
+    def __init__(self, bus, writer, clock=time.monotonic):
+        self.bus = bus
+        self.writer = writer
+        self.clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """execute the transaction on the wrapped bus and record it"""
+        error = 0
+        try:
+            self.bus.i2c_rdwr(*i2c_msgs)
+        except OSError as exception:
+            error = exception.errno or errno.EIO
+            raise
+        finally:
+            timestamp = self.clock()
+            for kind, write_msg, read_msg in split_transaction(i2c_msgs):
+                command = NO_COMMAND
+                data = b""
+                if write_msg is not None:
+                    command, data = split_write(bytes(write_msg))
+                if read_msg is not None:
+                    data = b"" if error else bytes(read_msg)
+                address = (read_msg if write_msg is None else write_msg).addr
+                self.writer.record(timestamp, address, kind, command, data, error)
+
+    def close(self):
+        """close the wrapped bus, the writer is left open"""
+        self.bus.close()
+
+
+class ReplayBus():
+    """Bus object answering transactions from a capture file in recorded order.
+
+    Used in place of an SMBus, the full HDC3020 decode path runs on the
+    recorded responses. With strict every transaction must match the address,
+    kind and command of the next record, otherwise ValueError is raised. A
+    transaction recorded as failed raises OSError with the recorded errno.
+    At the end of the capture EOFError is raised, or the replay starts over
+    with loop.
+    """
+
+    def __init__(self, path, strict=True, loop=False):
+        self.path = path
+        self.strict = strict
+        self.loop = loop
+        self.position = 0
+        with open(path, "rb") as capture_file:
+            self._map = mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_header(self._map[:CAPTURE_HEADER.size])
+        self.records = (len(self._map) - CAPTURE_HEADER.size) // CAPTURE_RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next_record(self):
+        """return the next record as tuple"""
+        if self.position >= self.records:
+            if not self.loop or self.records == 0:
+                raise EOFError("end of capture reached")
+            self.position = 0
+        record = CAPTURE_RECORD.unpack_from(
+            self._map, CAPTURE_HEADER.size + self.position * CAPTURE_RECORD.size)
+        self.position += 1
+        return record
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """answer the read messages with the next recorded responses"""
+        failed = 0
+        for kind, write_msg, read_msg in split_transaction(i2c_msgs):
+            _, command, address, record_kind, length, data, error = self._next_record()
+            if self.strict:
+                expected_command = NO_COMMAND
+                if write_msg is not None:
+                    expected_command = split_write(bytes(write_msg))[0]
+                msg = read_msg if write_msg is None else write_msg
+                if address != msg.addr or record_kind != kind or command != expected_command:
+                    raise ValueError("transaction does not match capture record %d"
+                                     % (self.position - 1))
+            if error:
+                failed = failed or error
+            elif read_msg is not None:
+                fill_read_message(read_msg, data[:length])
+        if failed:
+            raise OSError(failed, os.strerror(failed))
+
+    def close(self):
+        """unmap the capture file"""
+        if not self._map.closed:
+            self._map.close()
+
+
+def iter_records(path):
+    """iterate over (timestamp, command, address, kind, data) of all records
+
+    Failed transactions are skipped, load_records has them with their errno.
+    """
+    with open(path, "rb") as capture_file:
+        if os.fstat(capture_file.fileno()).st_size <= CAPTURE_HEADER.size:
+            return
+        with mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ) as capture_map:
+            _check_header(capture_map[:CAPTURE_HEADER.size])
+            end = CAPTURE_HEADER.size + ((len(capture_map) - CAPTURE_HEADER.size) //
+                                         CAPTURE_RECORD.size) * CAPTURE_RECORD.size
+            view = memoryview(capture_map)[CAPTURE_HEADER.size:end]
+            try:
+                for timestamp, command, address, kind, length, data, error in \
+                        CAPTURE_RECORD.iter_unpack(view):
+                    if not error:
+                        yield timestamp, command, address, kind, data[:length]
+            finally:
+                view.release()
+
+
+def load_records(path):
+    """memory map all records as numpy structured array (requires numpy)"""
+    dtype = _capture_dtype()
+    with open(path, "rb") as capture_file:
+        _check_header(capture_file.read(CAPTURE_HEADER.size))
+    records = (os.path.getsize(path) - CAPTURE_HEADER.size) // CAPTURE_RECORD.size
+    return load_numpy().memmap(path, dtype=dtype, mode="r", offset=CAPTURE_HEADER.size,
+                               shape=(records,))
+
+
+def load_measurement_frames(path):
+    """return timestamps, addresses and raw 6 byte frames of all measurement reads
+
+    With numpy the frames are a (n, 6) uint8 array, ready for
+    hdc3020_i2c_conversion.convert_frames, otherwise lists and one bytes object.
+    """
+    numpy = load_numpy()
+    if numpy is not None:
+        records = load_records(path)
+        selected = records[(records["length"] == 6) & (records["error"] == 0)]
+        return selected["timestamp"], selected["address"], numpy.ascontiguousarray(selected["data"])
+    timestamps = []
+    addresses = []
+    frames = bytearray()
+    for timestamp, _, address, _, data in iter_records(path):
+        if len(data) == 6:
+            timestamps.append(timestamp)
+            addresses.append(address)
+            frames += data
+    return timestamps, addresses, bytes(frames)
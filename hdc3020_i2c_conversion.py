@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion of raw HDC3020 values, for single values and batches of values.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import math
+from array import array
+
+_LOG_HUMIDITY_TABLE = None
+# numpy module, False if it is not installed, None until the first batch conversion
+_NUMPY = None
+
+
+def raw_to_temperature(raw_temperature):
+    """convert a raw 16 bit temperature value to °C"""
+    return -45 + (175 * raw_temperature / (65536 - 1))
+
+
+def raw_to_humidity(raw_humidity):
+    """convert a raw 16 bit humidity value to %RH"""
+    return 100 * (float)(raw_humidity) / (65536 - 1)
+
+
+def temperature_to_raw(temperature):
+    """raw 16 bit value of a temperature in °C, limited to the measurement range"""
+    return min(max(int(round((temperature + 45) * 65535 / 175)), 0), 65535)
+
+
+def humidity_to_raw(humidity):
+    """raw 16 bit value of a relative humidity in %RH, limited to 0 - 100 %RH"""
+    return min(max(int(round(humidity * 65535 / 100)), 0), 65535)
+
+
+def _magnus_above_zero(temperature, log_humidity):
+    """dewpoint over water"""
+    return 243.12 * ((17.62 * temperature) / (243.12 + temperature) + log_humidity)/((17.62 * 243.12) / (243.12 + temperature) - log_humidity)
+
+
+def _magnus_below_zero(temperature, log_humidity):
+    """dewpoint over ice"""
+    return 272.62 * ((((22.46*temperature) / (272.62 + temperature)) + log_humidity) / (((22.46 * 272.62) / (272.62 + temperature)) - log_humidity))
+
+
+def calc_dewpoint(temperature, humidity):
+    """calculate the dewpoint in °C with the Magnus formula"""
+    if temperature > 0:
+        return _magnus_above_zero(temperature, math.log(humidity / 100))
+    return _magnus_below_zero(temperature, math.log(humidity / 100))
+
+
+def _log_humidity_table():
+    """math.log(humidity / 100) for every raw humidity value, built on first use"""
+    global _LOG_HUMIDITY_TABLE  # pylint: disable=W0603
+    if _LOG_HUMIDITY_TABLE is None:
+        table = array("d", [float("-inf")])
+        table.extend(math.log(raw_to_humidity(raw) / 100) for raw in range(1, 65536))
+        _LOG_HUMIDITY_TABLE = table
+    return _LOG_HUMIDITY_TABLE
+
+
+def load_numpy():
+    """import numpy on first use, so the scalar conversions load fast; None if not installed"""
+    global _NUMPY  # pylint: disable=W0603
+    if _NUMPY is None:
+        # pylint: disable=C0415,E0401
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        # pylint: enable=C0415,E0401
+        _NUMPY = numpy
+    return _NUMPY or None
+
+
+def __getattr__(name):
+    """numpy, or None if it is not installed, imported on first access"""
+    if name == "numpy":
+        return load_numpy()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def _use_numpy(use_numpy):
+    """resolve the use_numpy argument of the batch functions, return numpy or None"""
+    if use_numpy is not None and not use_numpy:
+        return None
+    numpy = load_numpy()
+    if use_numpy and numpy is None:
+        raise ImportError("numpy is not installed")
+    return numpy
+
+
+def split_frames(frames, use_numpy=None):
+    """return raw temperatures and humidities of a buffer of consecutive 6 byte frames
+
+    The crc bytes are not checked here, see find_crc8_errors of the library.
+    """
+    data = memoryview(frames).cast("B")
+    if len(data) % 6:
+        raise ValueError("buffer length is not a multiple of 6")
+    numpy = _use_numpy(use_numpy)
+    if numpy is not None:
+        columns = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 6).astype(numpy.uint16)
+        return (columns[:, 0] << 8) | columns[:, 1], (columns[:, 3] << 8) | columns[:, 4]
+    raw_temperatures = array("H", [(msb << 8) | lsb for msb, lsb in zip(data[0::6], data[1::6])])
+    raw_humidities = array("H", [(msb << 8) | lsb for msb, lsb in zip(data[3::6], data[4::6])])
+    return raw_temperatures, raw_humidities
+
+
+def convert_raw_temperatures(raw_temperatures, use_numpy=None):
+    """convert a sequence of raw temperature values to °C"""
+    numpy = _use_numpy(use_numpy)
+    if numpy is not None:
+        return -45 + (175 * numpy.asarray(raw_temperatures, dtype=numpy.int64) / (65536 - 1))
+    return array("d", [-45 + (175 * raw / (65536 - 1)) for raw in raw_temperatures])
+
+
+def convert_raw_humidities(raw_humidities, use_numpy=None):
+    """convert a sequence of raw humidity values to %RH"""
+    numpy = _use_numpy(use_numpy)
+    if numpy is not None:
+        return 100 * numpy.asarray(raw_humidities, dtype=numpy.float64) / (65536 - 1)
+    return array("d", [100 * (float)(raw) / (65536 - 1) for raw in raw_humidities])
+
+
+def calc_dewpoints_raw(raw_temperatures, raw_humidities, use_numpy=None):
+    """dewpoints in °C of sequences of raw values, identical to calc_dewpoint per sample
+
+    The logarithm is looked up per raw humidity value, so the results match
+    the scalar math.log path exactly. 0 %RH gives nan instead of an error.
+    """
+    log_table = _log_humidity_table()
+    numpy = _use_numpy(use_numpy)
+    if numpy is not None:
+        temperatures = convert_raw_temperatures(raw_temperatures, True)
+        log_humidities = numpy.frombuffer(log_table, dtype=numpy.float64)[
+            numpy.asarray(raw_humidities, dtype=numpy.intp)]
+        with numpy.errstate(invalid="ignore"):
+            return numpy.where(temperatures > 0,
+                               _magnus_above_zero(temperatures, log_humidities),
+                               _magnus_below_zero(temperatures, log_humidities))
+    dewpoints = array("d")
+    for raw_temperature, raw_humidity in zip(raw_temperatures, raw_humidities):
+        temperature = -45 + (175 * raw_temperature / (65536 - 1))
+        log_humidity = log_table[raw_humidity]
+        if raw_humidity == 0:
+            dewpoints.append(float("nan"))
+        elif temperature > 0:
+            dewpoints.append(_magnus_above_zero(temperature, log_humidity))
+        else:
+            dewpoints.append(_magnus_below_zero(temperature, log_humidity))
+    return dewpoints
+
+
+def convert_raw(raw_temperatures, raw_humidities, use_numpy=None):
+    """return temperatures, humidities and dewpoints of sequences of raw values"""
+    return (convert_raw_temperatures(raw_temperatures, use_numpy),
+            convert_raw_humidities(raw_humidities, use_numpy),
+            calc_dewpoints_raw(raw_temperatures, raw_humidities, use_numpy))
+
+
+def convert_frames(frames, use_numpy=None):
+    """return temperatures, humidities and dewpoints of a buffer of 6 byte frames"""
+    raw_temperatures, raw_humidities = split_frames(frames, use_numpy)
+    return convert_raw(raw_temperatures, raw_humidities, use_numpy)
@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+"""
+Multiprocess HDC3020 acquisition daemon with one process per I2C bus and shared memory sample rings.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import argparse
+import collections
+import multiprocessing
+import multiprocessing.connection
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from hdc3020_i2c_conversion import load_numpy, raw_to_temperature, raw_to_humidity
+from hdc3020_i2c_library import HDC3020, PERIODIC_MEASUREMENT_RATES
+
+# Shared memory layout: a 64 byte header followed by 2 x capacity records, every
+# record is written at its slot and at slot + capacity like in SampleRingBuffer.
+# header: magic (8s), version (H), record size (H), capacity (I), write count (Q),
+#         worker heartbeat, time.monotonic() (d), read errors (Q), reserved (24x)
+# record: wall clock timestamp (d), temperature (f), humidity (f), bus number (B),
+#         i2c address (B), reserved (6x)
+RING_MAGIC = b"HDC3020R"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<8sHHIQdQ24x")
+SAMPLE_RECORD = struct.Struct("<dffBB6x")
+_COUNTER = struct.Struct("<Q")
+_HEARTBEAT = struct.Struct("<d")
+_WRITE_COUNT_OFFSET = 16
+_HEARTBEAT_OFFSET = 24
+_ERRORS_OFFSET = 32
+
+_SAMPLE_FIELDS = [("timestamp", "<f8"), ("temperature", "<f4"), ("humidity", "<f4"),
+                  ("bus_number", "u1"), ("address", "u1"), ("reserved", "V6")]
+
+
+def __getattr__(name):
+    """SAMPLE_DTYPE, the numpy dtype of a record, created on first access"""
+    if name == "SAMPLE_DTYPE":
+        return _sample_dtype()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def _sample_dtype():
+    """numpy dtype of a record, raises ImportError without numpy"""
+    numpy = load_numpy()
+    if numpy is None:
+        raise ImportError("numpy is not installed")
+    return numpy.dtype(_SAMPLE_FIELDS)
+
+# addresses, rate and mode of the sensors of one bus, interval overrides the
+# polling period given by measurement_per_seconds (0 = read as fast as possible)
+BusWorker = collections.namedtuple(
+    "BusWorker", ["bus_number", "addresses", "measurement_per_seconds", "mode", "interval"],
+    defaults=((0x44,), 1, 0, None))
+
+
+def _attach(name):
+    """attach to an existing shared memory block without handing it to the resource tracker"""
+    try:
+        return SharedMemory(name, track=False)  # pylint: disable=E1123
+    except TypeError:
+        # before Python 3.13 attaching registers the block, which would be
+        # unlinked when this process exits
+        shared_memory = SharedMemory(name)
+        resource_tracker.unregister(shared_memory._name, "shared_memory")  # pylint: disable=W0212
+        return shared_memory
+
+
+def _check_header(buffer):
+    """return the capacity of the ring, raise ValueError if the header is not supported"""
+    magic, version, record_size, capacity, _, _, _ = RING_HEADER.unpack_from(buffer)
+    if magic != RING_MAGIC or version != RING_VERSION or record_size != SAMPLE_RECORD.size:
+        raise ValueError("not a HDC3020 sample ring")
+    return capacity
+
+
+class SharedSampleRing():
+    """Shared memory ring of decoded samples with a single writer.
+
+    With a capacity a new shared memory block is created, which this object
+    owns and removes with unlink(), otherwise the existing ring name is
+    attached for writing by a child process of the owner, e.g. a restarted
+    bus worker which continues at the stored write count. Only one process
+    may append at a time.
+    """
+
+    def __init__(self, name, capacity=None):
+        self.name = name
+        if capacity is not None:
+            if capacity < 1:
+                raise ValueError("capacity must be at least 1")
+            self._shared_memory = SharedMemory(
+                name, create=True, size=RING_HEADER.size + 2 * capacity * SAMPLE_RECORD.size)
+            RING_HEADER.pack_into(self._shared_memory.buf, 0, RING_MAGIC, RING_VERSION,
+                                  SAMPLE_RECORD.size, capacity, 0, time.monotonic(), 0)
+        else:
+            # children share the resource tracker of the owner
+            self._shared_memory = SharedMemory(name)
+        self._buffer = self._shared_memory.buf
+        self.capacity = _check_header(self._buffer)
+        self._mirror = self.capacity * SAMPLE_RECORD.size
+        self._write_count = _COUNTER.unpack_from(self._buffer, _WRITE_COUNT_OFFSET)[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def write_count(self):
+        """number of samples written since the ring was created"""
+        return self._write_count
+
+    def append(self, timestamp, bus_number, address, temperature, humidity):
+        """store one sample, overwriting the oldest one when full"""
+        offset = RING_HEADER.size + (self._write_count % self.capacity) * SAMPLE_RECORD.size
+        SAMPLE_RECORD.pack_into(self._buffer, offset, timestamp, temperature, humidity,
+                                bus_number, address)
+        SAMPLE_RECORD.pack_into(self._buffer, offset + self._mirror, timestamp, temperature,
+                                humidity, bus_number, address)
+        # readers see the sample once the count is published
+        self._write_count += 1
+        _COUNTER.pack_into(self._buffer, _WRITE_COUNT_OFFSET, self._write_count)
+
+    def add_error(self):
+        """count a failed read"""
+        errors = _COUNTER.unpack_from(self._buffer, _ERRORS_OFFSET)[0]
+        _COUNTER.pack_into(self._buffer, _ERRORS_OFFSET, errors + 1)
+
+    def beat(self):
+        """store the current time as heartbeat of the writer"""
+        _HEARTBEAT.pack_into(self._buffer, _HEARTBEAT_OFFSET, time.monotonic())
+
+    def close(self):
+        """detach from the shared memory, the ring stays available to others"""
+        self._buffer = None
+        self._shared_memory.close()
+
+    def unlink(self):
+        """remove the shared memory block, attached processes keep their mapping"""
+        # a SampleReader of this process may have dropped the block from the tracker
+        resource_tracker.register(self._shared_memory._name,  # pylint: disable=W0212
+                                  "shared_memory")
+        self._shared_memory.unlink()
+
+
+class SampleReader():
+    """Consumer of a SharedSampleRing attached by name, from any process.
+
+    read() returns the samples written since the last call as tuples
+    (timestamp, temperature, humidity, bus_number, address) without pickling
+    or locking; overruns counts samples which were overwritten before they
+    were read. With numpy, latest() returns a structured array view of the
+    shared memory, which is live like SampleRingBuffer.latest and has to be
+    released before close().
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._shared_memory = _attach(name)
+        self._buffer = self._shared_memory.buf
+        self.capacity = _check_header(self._buffer)
+        self.read_count = self.write_count
+        self.overruns = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def write_count(self):
+        """number of samples written to the ring"""
+        return _COUNTER.unpack_from(self._buffer, _WRITE_COUNT_OFFSET)[0]
+
+    @property
+    def errors(self):
+        """number of failed reads of the bus worker"""
+        return _COUNTER.unpack_from(self._buffer, _ERRORS_OFFSET)[0]
+
+    @property
+    def heartbeat(self):
+        """time.monotonic() of the last loop of the bus worker"""
+        return _HEARTBEAT.unpack_from(self._buffer, _HEARTBEAT_OFFSET)[0]
+
+    @property
+    def lag(self):
+        """number of written samples not read yet"""
+        return self.write_count - self.read_count
+
+    def read(self, max_samples=None):
+        """return the unread samples as list of tuples without waiting"""
+        lag = self.write_count - self.read_count
+        if lag > self.capacity:
+            self.overruns += lag - self.capacity
+            self.read_count += lag - self.capacity
+            lag = self.capacity
+        if max_samples is not None:
+            lag = min(lag, max_samples)
+        start = RING_HEADER.size + (self.read_count % self.capacity) * SAMPLE_RECORD.size
+        with self._buffer[start:start + lag * SAMPLE_RECORD.size] as view:
+            samples = [sample[:5] for sample in SAMPLE_RECORD.iter_unpack(view)]
+        # the writer may have overwritten the oldest samples while they were unpacked
+        overwritten = min(self.write_count - self.capacity + 1 - self.read_count, lag)
+        if overwritten > 0:
+            del samples[:overwritten]
+            self.overruns += overwritten
+        self.read_count += lag
+        return samples
+
+    def latest(self, count):
+        """structured numpy view of the latest samples (requires numpy)"""
+        dtype = _sample_dtype()
+        write_count = self.write_count
+        count = min(count, write_count, self.capacity)
+        end = write_count % self.capacity + self.capacity
+        return load_numpy().ndarray((count,), dtype=dtype, buffer=self._buffer,
+                                    offset=RING_HEADER.size + (end - count) * SAMPLE_RECORD.size)
+
+    def close(self):
+        """detach from the shared memory"""
+        self._buffer = None
+        self._shared_memory.close()
+
+
+def run_bus_worker(worker, ring_name, stop, simulate=False, timestamp=time.time):
+    """acquisition loop of one bus process, reads all sensors of worker into the ring
+
+    Runs until stop (a multiprocessing.Event) is set. With simulate the
+    sensors are read from a SimulatedSMBus.
+    """
+    bus = None
+    if simulate:
+        # pylint: disable=C0415
+        from hdc3020_i2c_simulator import SimulatedSMBus
+        # pylint: enable=C0415
+        bus = SimulatedSMBus(worker.bus_number)
+    period = worker.interval
+    if period is None:
+        period = 1.0 / PERIODIC_MEASUREMENT_RATES[worker.measurement_per_seconds]
+    ring = SharedSampleRing(ring_name)
+    sensors = [HDC3020(address, bus=bus, bus_number=worker.bus_number)
+               for address in worker.addresses]
+    try:
+        for sensor in sensors:
+            sensor.start_periodic_measurement(worker.measurement_per_seconds, worker.mode)
+        # the first periodic measurement is ready one period after the start
+        deadline = time.monotonic() + period
+        while not stop.is_set():
+            ring.beat()
+            if period:
+                delay = deadline - time.monotonic()
+                if delay > 0 and stop.wait(delay):
+                    break
+                deadline = max(deadline + period, time.monotonic())
+            for sensor in sensors:
+                try:
+                    raw_temperature, raw_humidity = sensor.get_periodic_measurement_raw()
+                except (Warning, OSError):
+                    ring.add_error()
+                    continue
+                ring.append(timestamp(), worker.bus_number, sensor.i2c_address,
+                            raw_to_temperature(raw_temperature), raw_to_humidity(raw_humidity))
+    finally:
+        for sensor in sensors:
+            try:
+                sensor.end_periodic_measurement()
+            except (Warning, OSError):
+                pass
+            sensor.close()
+        ring.close()
+
+
+class _WorkerSlot():
+    """bus worker with its process and restart accounting"""
+
+    def __init__(self, worker, ring):
+        self.worker = worker
+        self.ring = ring
+        self.process = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+        self.restarts = 0
+
+
+class SensorFarm():
+    """Supervisor running one acquisition process per I2C bus.
+
+    Every BusWorker gets a SharedSampleRing named ring_name(bus_number) with
+    capacity samples and its own process, so decoding and conversion of the
+    buses run on separate cores. Consumers attach with SampleReader by name.
+    A supervisor thread restarts crashed workers after restart_delay seconds,
+    doubling the delay up to max_restart_delay while a worker keeps crashing;
+    with a watchdog a worker without heartbeat for that many seconds is
+    terminated and restarted as well. stop() ends the workers and removes the
+    rings.
+    """
+
+    def __init__(self, workers, prefix="hdc3020", capacity=65536, restart_delay=0.5,
+                 max_restart_delay=30.0, watchdog=None, simulate=False, context=None):
+        if len({worker.bus_number for worker in workers}) != len(workers):
+            raise ValueError("only one worker per bus")
+        self.workers = list(workers)
+        self.prefix = prefix
+        self.capacity = capacity
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.watchdog = watchdog
+        self.simulate = simulate
+        self.context = context or multiprocessing.get_context()
+        self._slots = []
+        self._stop = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def ring_name(self, bus_number):
+        """name of the shared memory ring of a bus"""
+        return "%s-bus%d" % (self.prefix, bus_number)
+
+    @property
+    def restarts(self):
+        """dict bus number: number of worker restarts"""
+        return {slot.worker.bus_number: slot.restarts for slot in self._slots}
+
+    def start(self):
+        """create the rings and start the bus workers and the supervisor thread"""
+        if self._thread is not None:
+            raise RuntimeError("farm is already running")
+        self._stop = self.context.Event()
+        self._stopped.clear()
+        self._slots = []
+        try:
+            for worker in self.workers:
+                ring = SharedSampleRing(self.ring_name(worker.bus_number), self.capacity)
+                self._slots.append(_WorkerSlot(worker, ring))
+        except BaseException:
+            self._remove_rings()
+            raise
+        for slot in self._slots:
+            self._spawn(slot)
+        self._thread = threading.Thread(target=self._supervise, name="hdc3020-supervisor",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """stop the workers, terminate the ones not ending within timeout, remove the rings"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._stop.set()
+        for slot in self._slots:
+            if slot.process is not None:
+                slot.process.join(timeout)
+                if slot.process.is_alive():
+                    slot.process.terminate()
+                    slot.process.join()
+                slot.process = None
+        self._remove_rings()
+
+    def run_for(self, seconds):
+        """run the farm for a fixed time"""
+        self.start()
+        try:
+            self._stopped.wait(seconds)
+        finally:
+            self.stop()
+
+    def _remove_rings(self):
+        """close and unlink the rings"""
+        for slot in self._slots:
+            slot.ring.close()
+            slot.ring.unlink()
+
+    def _spawn(self, slot):
+        """start the process of a worker"""
+        slot.process = self.context.Process(
+            target=run_bus_worker, name="hdc3020-bus%d" % slot.worker.bus_number,
+            args=(slot.worker, slot.ring.name, self._stop, self.simulate), daemon=True)
+        # the first heartbeat is expected one watchdog period after the start
+        slot.ring.beat()
+        slot.started = time.monotonic()
+        slot.process.start()
+
+    def _supervise(self):
+        """wait for crashed or hanging workers and restart them"""
+        while not self._stopped.is_set():
+            sentinels = [slot.process.sentinel for slot in self._slots if slot.process is not None]
+            multiprocessing.connection.wait(sentinels, 0.1)
+            if self._stopped.is_set():
+                break
+            now = time.monotonic()
+            for slot in self._slots:
+                if slot.process is not None and not slot.process.is_alive():
+                    slot.process.join()
+                    slot.process = None
+                    if now - slot.started > self.max_restart_delay:
+                        slot.failures = 0
+                    slot.restart_at = now + min(self.restart_delay * 2 ** slot.failures,
+                                                self.max_restart_delay)
+                    slot.failures += 1
+                elif slot.process is not None and self.watchdog is not None:
+                    heartbeat = _HEARTBEAT.unpack_from(slot.ring._buffer,  # pylint: disable=W0212
+                                                       _HEARTBEAT_OFFSET)[0]
+                    if now - heartbeat > self.watchdog:
+                        slot.process.terminate()
+                if slot.process is None and now >= slot.restart_at:
+                    slot.restarts += 1
+                    self._spawn(slot)
+
+
+def _parse_bus(value):
+    """BUS[:ADDRESS,...] of the command line"""
+    bus_number, _, addresses = value.partition(":")
+    addresses = tuple(int(address, 0) for address in addresses.split(",") if address)
+    return int(bus_number), addresses or (0x44,)
+
+
+def main(argv=None):
+    """run the daemon, or follow a ring of a running daemon with --read"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-b", "--bus", type=_parse_bus, action="append", metavar="BUS[:ADDRESS,...]",
+                        help="bus number and sensor addresses, may be repeated (default 1:0x44)")
+    parser.add_argument("-p", "--periodic", type=int, default=1, metavar="MEASUREMENT_PER_SECONDS",
+                        help="periodic measurement rate index 0 - 4")
+    parser.add_argument("-m", "--mode", type=int, default=0,
+                        help="0 = low noise ... 3 = lowest power")
+    parser.add_argument("--prefix", default="hdc3020", help="name prefix of the rings")
+    parser.add_argument("--capacity", type=int, default=65536, help="samples per ring")
+    parser.add_argument("--watchdog", type=float, default=None,
+                        help="restart workers without heartbeat for WATCHDOG seconds")
+    parser.add_argument("--simulate", action="store_true",
+                        help="read from simulated buses instead of /dev/i2c-BUS")
+    parser.add_argument("--read", metavar="RING", help="print the samples of a ring by name")
+    args = parser.parse_args(argv)
+    if args.read:
+        with SampleReader(args.read) as reader:
+            print("timestamp,bus,address,temperature,humidity")
+            try:
+                while True:
+                    for timestamp, temperature, humidity, bus_number, address in reader.read():
+                        print("%0.3f,%d,0x%02x,%0.2f,%0.2f"
+                              % (timestamp, bus_number, address, temperature, humidity))
+                    time.sleep(0.1)
+            except KeyboardInterrupt:
+                pass
+        return 0
+    workers = [BusWorker(bus_number, addresses, args.periodic, args.mode)
+               for bus_number, addresses in args.bus or [(1, (0x44,))]]
+    farm = SensorFarm(workers, args.prefix, args.capacity, watchdog=args.watchdog,
+                      simulate=args.simulate)
+    with farm:
+        for worker in workers:
+            print(farm.ring_name(worker.bus_number), file=sys.stderr)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
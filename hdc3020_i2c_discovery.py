@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Discovery of HDC3020 sensors on all I2C buses with a per board cache.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import argparse
+import glob
+import json
+import os
+import re
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from hdc3020_i2c_backend import load_backend
+from hdc3020_i2c_library import HDC3020, HDC3020_ADDRESSES
+
+DEFAULT_CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME") or
+                                  os.path.expanduser(os.path.join("~", ".cache")),
+                                  "hdc3020", "discovery.json")
+# files holding a unique id of the board, the first readable one is used
+BOARD_ID_FILES = ("/sys/firmware/devicetree/base/serial-number",
+                  "/proc/device-tree/serial-number",
+                  "/etc/machine-id")
+
+
+def list_buses(pattern="/dev/i2c-*"):
+    """return the numbers of all i2c buses with a device file"""
+    numbers = []
+    for path in glob.glob(pattern):
+        match = re.search(r"(\d+)$", path)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def board_id():
+    """id of this board: device tree serial number, cpu serial, machine id or host name"""
+    for path in BOARD_ID_FILES:
+        try:
+            with open(path, "rb") as board_file:
+                value = board_file.read().strip(b"\x00\n ").decode("ascii", "replace")
+        except OSError:
+            continue
+        if value:
+            return value
+    try:
+        with open("/proc/cpuinfo", encoding="ascii", errors="replace") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("Serial"):
+                    return line.partition(":")[2].strip()
+    except OSError:
+        pass
+    return socket.gethostname()
+
+
+def probe_bus(bus_number, addresses=HDC3020_ADDRESSES, bus=None):
+    """return [(address, identification)] of the HDC3020 sensors answering on one bus
+
+    Every address is confirmed with read_identification, addresses not
+    answering or answering with a wrong crc are skipped. Without a bus
+    object /dev/i2c-<bus_number> is opened for the probe, a missing bus has
+    no sensors.
+    """
+    owned = bus is None
+    if owned:
+        try:
+            bus = load_backend().bus_class(bus_number)
+        except OSError:
+            return []
+    found = []
+    try:
+        for address in addresses:
+            sensor = HDC3020(address, bus=bus, bus_number=bus_number)
+            try:
+                found.append((address, sensor.read_identification()))
+            except (Warning, OSError):
+                pass
+    finally:
+        if owned:
+            bus.close()
+    return found
+
+
+def _load_cache(path):
+    """return the cache file contents, an empty dict if it is missing or broken"""
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_cache(path, cache):
+    """write the cache file atomically"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = "%s.%d.tmp" % (path, os.getpid())
+    with open(temporary, "w", encoding="utf-8") as cache_file:
+        json.dump(cache, cache_file, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def scan(buses=None, addresses=HDC3020_ADDRESSES, bus_factory=None, max_workers=None):
+    """probe all buses in parallel, return a dict bus number: [(address, identification)]
+
+    buses defaults to list_buses(). bus_factory(bus_number) returns the bus
+    object of a bus, e.g. a SimulatedSMBus, by default the device file is
+    opened.
+    """
+    if buses is None:
+        buses = list_buses()
+    if not buses:
+        return {}
+
+    def probe(bus_number):
+        bus = bus_factory(bus_number) if bus_factory is not None else None
+        return probe_bus(bus_number, addresses, bus)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(buses),
+                            thread_name_prefix="hdc3020-probe") as executor:
+        return dict(zip(buses, executor.map(probe, buses)))
+
+
+def discover(buses=None, addresses=HDC3020_ADDRESSES, cache_path=DEFAULT_CACHE_PATH,
+             refresh=False, board=None, bus_factory=None, max_workers=None, **options):
+    """return HDC3020 objects of all sensors found on the buses
+
+    The result of a scan is stored in the JSON file cache_path under the
+    board id (board_id() by default), later calls on the same board create
+    the sensors from the cache without touching the bus, unless refresh is
+    set or buses and addresses were not part of the cached scan. Use refresh
+    after rewiring, cache_path None disables the cache. options are passed to
+    HDC3020, the sensors use the pooled bus or bus_factory(bus_number). The
+    identification found by the scan is preset, read_identification() of the
+    returned sensors does not touch the bus either.
+    """
+    board = board or board_id()
+    cache = _load_cache(cache_path) if cache_path else {}
+    entry = cache.get(board)
+    if (refresh or not isinstance(entry, dict) or
+            not set(addresses) <= set(entry.get("addresses", ())) or
+            (buses is not None and
+             not {str(bus_number) for bus_number in buses} <= set(entry.get("buses", {})))):
+        scanned = {str(bus_number): [{"address": address, "identification": identification}
+                                     for address, identification in found]
+                   for bus_number, found in scan(buses, addresses, bus_factory,
+                                                 max_workers).items()}
+        # a scan of some buses keeps the cached results of the other ones
+        if (buses is not None and isinstance(entry, dict) and
+                entry.get("addresses") == list(addresses)):
+            scanned = dict(entry.get("buses", {}), **scanned)
+        entry = {"addresses": list(addresses), "buses": scanned}
+        if cache_path:
+            cache[board] = entry
+            _save_cache(cache_path, cache)
+    sensors = []
+    for bus_number, found in sorted(entry["buses"].items(), key=lambda item: int(item[0])):
+        bus_number = int(bus_number)
+        if buses is not None and bus_number not in buses:
+            continue
+        bus = bus_factory(bus_number) if bus_factory is not None else None
+        for device in found:
+            if device["address"] in addresses:
+                sensor = HDC3020(device["address"], bus=bus, bus_number=bus_number, **options)
+                # pylint: disable=W0212
+                sensor._identification = tuple(device["identification"])
+                # pylint: enable=W0212
+                sensors.append(sensor)
+    return sensors
+
+
+def main(argv=None):
+    """print the sensors found on this board"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-b", "--bus", type=int, action="append",
+                        help="bus number to probe, may be repeated (default all /dev/i2c-*)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="cache file")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the cache")
+    parser.add_argument("--refresh", action="store_true", help="probe again and update the cache")
+    parser.add_argument("--simulate", action="store_true",
+                        help="probe simulated buses instead of /dev/i2c-BUS")
+    args = parser.parse_args(argv)
+    bus_factory = None
+    buses = args.bus
+    if args.simulate:
+        # pylint: disable=C0415
+        from hdc3020_i2c_simulator import SimulatedSMBus
+        # pylint: enable=C0415
+        simulated = {}
+        bus_factory = lambda bus_number: simulated.setdefault(bus_number,
+                                                              SimulatedSMBus(bus_number))
+        buses = buses or [1]
+    sensors = discover(buses, cache_path=None if args.no_cache else args.cache,
+                       refresh=args.refresh, bus_factory=bus_factory)
+    print("bus,address,identification")
+    for sensor in sensors:
+        print("%d,0x%02x,%s" % (sensor.bus_number, sensor.i2c_address,
+                                "".join("%02x" % byte for byte in sensor.read_identification())))
+        sensor.close()
+    return 0 if sensors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
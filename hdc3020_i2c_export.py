@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Batched column-oriented export of HDC3020 measurements to CSV or Parquet files.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import abc
+import argparse
+import itertools
+import sys
+import time
+from array import array
+from hdc3020_i2c_conversion import convert_raw
+from hdc3020_i2c_library import HDC3020
+from hdc3020_i2c_recovery import ResilientHDC3020, RetryPolicy
+
+COLUMNS = ("timestamp", "address", "temperature", "humidity", "dewpoint")
+
+
+class ColumnarSink(abc.ABC):
+    """Collects raw samples in column arrays and writes them in blocks.
+
+    A block is written when flush_size rows are collected or flush_interval
+    seconds passed since the last write (checked when a row is appended),
+    and on flush() and close(). Raw values are converted per block, with
+    numpy if it is installed. Subclasses implement _write_block.
+    """
+
+    def __init__(self, flush_size=1000, flush_interval=None, clock=time.monotonic):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.rows = 0
+        self.blocks = 0
+        self._timestamps = array("d")
+        self._addresses = array("B")
+        self._raw_temperatures = array("H")
+        self._raw_humidities = array("H")
+        self._last_flush = clock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def append(self, timestamp, address, raw_temperature, raw_humidity):
+        """add one sample, writing a block when flush_size or flush_interval is reached"""
+        self._timestamps.append(timestamp)
+        self._addresses.append(address)
+        self._raw_temperatures.append(raw_temperature)
+        self._raw_humidities.append(raw_humidity)
+        if len(self._timestamps) >= self.flush_size or (
+                self.flush_interval is not None and
+                self.clock() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """convert and write the collected rows"""
+        self._last_flush = self.clock()
+        if not self._timestamps:
+            return
+        temperatures, humidities, dewpoints = convert_raw(self._raw_temperatures,
+                                                          self._raw_humidities)
+        self._write_block(self._timestamps, self._addresses, temperatures, humidities, dewpoints)
+        self.rows += len(self._timestamps)
+        self.blocks += 1
+        for column in (self._timestamps, self._addresses, self._raw_temperatures,
+                       self._raw_humidities):
+            del column[:]
+
+    def close(self):
+        """write the remaining rows"""
+        self.flush()
+
+    @abc.abstractmethod
+    def _write_block(self, timestamps, addresses, temperatures, humidities, dewpoints):
+        """write one block of converted columns"""
+
+
+class CsvSink(ColumnarSink):
+    """Writes blocks of rows to a text file, one write call per block.
+
+    file is a path or an open text file (e.g. sys.stdout), which is not
+    closed by close().
+    """
+
+    def __init__(self, file, delimiter=",", header=True, **options):
+        super().__init__(**options)
+        if isinstance(file, str):
+            self._file = open(file, "w", encoding="utf-8")  # pylint: disable=R1732
+            self._close_file = True
+        else:
+            self._file = file
+            self._close_file = False
+        self._row_format = delimiter.join(("%.3f", "0x%02x", "%.2f", "%.2f", "%.2f")) + "\n"
+        if header:
+            self._file.write(delimiter.join(COLUMNS) + "\n")
+
+    def _write_block(self, timestamps, addresses, temperatures, humidities, dewpoints):
+        columns = [column.tolist() for column in (timestamps, addresses, temperatures,
+                                                  humidities, dewpoints)]
+        # one format operation and one write for the whole block
+        values = tuple(itertools.chain.from_iterable(zip(*columns)))
+        self._file.write((self._row_format * len(timestamps)) % values)
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        if self._close_file:
+            self._file.close()
+
+
+class ParquetSink(ColumnarSink):
+    """Writes every block as one row group of a Parquet file.
+
+    pyarrow is only imported when this class is used.
+    """
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        # pylint: disable=E0401,C0415
+        import pyarrow
+        import pyarrow.parquet
+        # pylint: enable=E0401,C0415
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([("timestamp", pyarrow.float64()),
+                                       ("address", pyarrow.uint8()),
+                                       ("temperature", pyarrow.float64()),
+                                       ("humidity", pyarrow.float64()),
+                                       ("dewpoint", pyarrow.float64())])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _write_block(self, timestamps, addresses, temperatures, humidities, dewpoints):
+        table = self._pyarrow.Table.from_arrays(
+            [self._pyarrow.array(column, type=field.type) for column, field in
+             zip((timestamps, addresses, temperatures, humidities, dewpoints), self._schema)],
+            schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        super().close()
+        self._writer.close()
+
+
+def open_sink(output, **options):
+    """CsvSink or ParquetSink depending on the file name, "-" is CSV to stdout"""
+    if output == "-":
+        return CsvSink(sys.stdout, **options)
+    if output.endswith(".parquet"):
+        return ParquetSink(output, **options)
+    return CsvSink(output, **options)
+
+
+def acquire(sensors, sink, count, interval, mode=0, measurement_per_seconds=None,
+            clock=time.monotonic, sleep=time.sleep, timestamp=time.time):
+    """read count samples of every sensor into sink, one round every interval seconds
+
+    Single shot measurements with mode are taken, or periodic measurements
+    if measurement_per_seconds is given. Rows are stamped with timestamp(),
+    the wall clock by default. Failed reads are reported on stderr and
+    skipped, the number of failed reads is returned.
+    """
+    errors = 0
+    if measurement_per_seconds is not None:
+        for sensor in sensors:
+            sensor.start_periodic_measurement(measurement_per_seconds, mode)
+    try:
+        deadline = clock()
+        for _ in range(count):
+            if measurement_per_seconds is not None:
+                # the first periodic measurement is ready one interval after the start
+                deadline += interval
+            sleep(max(deadline - clock(), 0))
+            for sensor in sensors:
+                try:
+                    if measurement_per_seconds is None:
+                        raw_temperature, raw_humidity = sensor.get_single_shot_raw(mode)
+                    else:
+                        raw_temperature, raw_humidity = sensor.get_periodic_measurement_raw()
+                except (Warning, OSError) as exception:
+                    errors += 1
+                    print("Exception: " + str(exception), file=sys.stderr)
+                    continue
+                sink.append(timestamp(), sensor.i2c_address, raw_temperature, raw_humidity)
+            if measurement_per_seconds is None:
+                deadline += interval
+    finally:
+        if measurement_per_seconds is not None:
+            for sensor in sensors:
+                sensor.end_periodic_measurement()
+        sink.flush()
+    return errors
+
+
+def main(argv=None):
+    """command line acquisition into a CSV or Parquet file"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-a", "--address", type=lambda value: int(value, 0), action="append",
+                        help="I2C address of a sensor, may be repeated (default 0x44)")
+    parser.add_argument("-b", "--bus", type=int, default=1, help="I2C bus number")
+    parser.add_argument("-n", "--count", type=int, default=30, help="samples per sensor")
+    parser.add_argument("-i", "--interval", type=float, default=1.0,
+                        help="seconds between samples")
+    parser.add_argument("-m", "--mode", type=int, default=0,
+                        help="0 = low noise ... 3 = lowest power")
+    parser.add_argument("-p", "--periodic", type=int, metavar="MEASUREMENT_PER_SECONDS",
+                        help="periodic measurement rate index 0 - 4 instead of single shots")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file, .parquet requires pyarrow, - for stdout (default)")
+    parser.add_argument("-r", "--retries", type=int, default=2,
+                        help="retries of a failed read, with backoff and soft reset")
+    parser.add_argument("--flush-size", type=int, default=1000, help="rows per written block")
+    parser.add_argument("--flush-interval", type=float, default=None,
+                        help="write a block at least every FLUSH_INTERVAL seconds")
+    parser.add_argument("--simulate", action="store_true",
+                        help="read from a simulated bus instead of /dev/i2c-BUS")
+    args = parser.parse_args(argv)
+    try:
+        sink = open_sink(args.output, flush_size=args.flush_size,
+                         flush_interval=args.flush_interval)
+    except ImportError:
+        parser.error("writing Parquet files requires pyarrow")
+    bus = None
+    if args.simulate:
+        # pylint: disable=C0415
+        from hdc3020_i2c_simulator import SimulatedSMBus
+        # pylint: enable=C0415
+        bus = SimulatedSMBus(args.bus)
+    sensors = [ResilientHDC3020(HDC3020(address, bus=bus, bus_number=args.bus),
+                                RetryPolicy(attempts=args.retries + 1))
+               for address in args.address or [0x44]]
+    with sink:
+        errors = acquire(sensors, sink, args.count, args.interval, args.mode, args.periodic)
+    for sensor in sensors:
+        sensor.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Change-only filtering of HDC3020 samples: deadbands, heartbeat and swinging door.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import time
+from hdc3020_i2c_conversion import raw_to_temperature, raw_to_humidity
+
+# raw counts per °C and per %RH
+TEMPERATURE_COUNTS = 65535 / 175
+HUMIDITY_COUNTS = 65535 / 100
+
+
+class _Channel():
+    """swinging door state of one raw channel"""
+
+    def __init__(self):
+        self.band = 0
+        self.archive_time = 0.0
+        self.archive_value = 0
+        self.slope_low = 0.0
+        self.slope_high = 0.0
+
+    def reset(self, timestamp, value, band):
+        """start a new door at an archived point"""
+        self.band = band
+        self.archive_time = timestamp
+        self.archive_value = value
+        self.slope_low = float("-inf")
+        self.slope_high = float("inf")
+
+    def fits(self, timestamp, value):
+        """True if the point is inside the door, the door is narrowed by the point then"""
+        elapsed = timestamp - self.archive_time
+        if elapsed <= 0:
+            return abs(value - self.archive_value) <= self.band
+        slope = (value - self.archive_value) / elapsed
+        if not self.slope_low <= slope <= self.slope_high:
+            return False
+        slope_low = slope - self.band / elapsed
+        slope_high = slope + self.band / elapsed
+        if slope_low > self.slope_low:
+            self.slope_low = slope_low
+        if slope_high < self.slope_high:
+            self.slope_high = slope_high
+        return True
+
+
+class ChangeFilter():
+    """Drops samples that do not change by more than a deadband.
+
+    Works on raw 16 bit counts, so nothing is converted for dropped samples.
+    temperature_deadband (°C) and humidity_deadband (%RH) are absolute bands,
+    relative_deadband is a fraction of the last published value. A sample is
+    published when one of the channels leaves its band, or when nothing was
+    published for max_silence seconds (heartbeat).
+
+    With swinging_door the bands are the compression deviation of the
+    swinging door algorithm instead: a sample is only published when the line
+    from the last published sample can no longer represent the samples
+    since within the band, so slow ramps are reduced to their end points.
+    Published samples are then delayed by one sample, flush() returns the
+    held back last sample at the end of an acquisition.
+
+    process() returns a tuple of the (timestamp, raw temperature, raw
+    humidity) samples to publish, usually empty.
+    """
+
+    def __init__(self, temperature_deadband=0.0, humidity_deadband=0.0, relative_deadband=0.0,
+                 max_silence=None, swinging_door=False):
+        self.temperature_deadband = int(temperature_deadband * TEMPERATURE_COUNTS)
+        self.humidity_deadband = int(humidity_deadband * HUMIDITY_COUNTS)
+        self.relative_deadband = relative_deadband
+        self.max_silence = max_silence
+        self.swinging_door = swinging_door
+        self.samples_in = 0
+        self.samples_out = 0
+        self.heartbeats = 0
+        self._temperature = _Channel()
+        self._humidity = _Channel()
+        self._last_published = None
+        self._held = None
+
+    @property
+    def compression_ratio(self):
+        """received per published samples"""
+        return self.samples_in / max(self.samples_out, 1)
+
+    def reset(self):
+        """forget the last published sample, the next sample is published again"""
+        self._last_published = None
+        self._held = None
+
+    def _publish(self, sample):
+        """make sample the reference of the following ones"""
+        timestamp, raw_temperature, raw_humidity = sample
+        temperature_band = self.temperature_deadband
+        humidity_band = self.humidity_deadband
+        if self.relative_deadband:
+            # the only float conversion, done once per published sample
+            temperature_band = max(temperature_band, int(
+                self.relative_deadband * abs(raw_to_temperature(raw_temperature)) *
+                TEMPERATURE_COUNTS))
+            humidity_band = max(humidity_band, int(
+                self.relative_deadband * raw_to_humidity(raw_humidity) * HUMIDITY_COUNTS))
+        self._temperature.reset(timestamp, raw_temperature, temperature_band)
+        self._humidity.reset(timestamp, raw_humidity, humidity_band)
+        self._last_published = timestamp
+        self.samples_out += 1
+
+    def process(self, timestamp, raw_temperature, raw_humidity):
+        """feed one sample, return the samples to publish"""
+        self.samples_in += 1
+        sample = (timestamp, raw_temperature, raw_humidity)
+        if self._last_published is None:
+            self._publish(sample)
+            return (sample,)
+        if self.swinging_door:
+            return self._process_swinging_door(sample)
+        temperature = self._temperature
+        humidity = self._humidity
+        if (abs(raw_temperature - temperature.archive_value) > temperature.band
+                or abs(raw_humidity - humidity.archive_value) > humidity.band):
+            self._publish(sample)
+            return (sample,)
+        if self.max_silence is not None and timestamp - self._last_published >= self.max_silence:
+            self.heartbeats += 1
+            self._publish(sample)
+            return (sample,)
+        return ()
+
+    def _process_swinging_door(self, sample):
+        """swinging door step, publishes the held sample when the door closes"""
+        timestamp, raw_temperature, raw_humidity = sample
+        published = ()
+        temperature_fits = self._temperature.fits(timestamp, raw_temperature)
+        humidity_fits = self._humidity.fits(timestamp, raw_humidity)
+        if not (temperature_fits and humidity_fits):
+            held = sample if self._held is None else self._held
+            self._publish(held)
+            published = (held,)
+            if held is not sample:
+                self._temperature.fits(timestamp, raw_temperature)
+                self._humidity.fits(timestamp, raw_humidity)
+        if (self.max_silence is not None and self._last_published != timestamp and
+                timestamp - self._last_published >= self.max_silence):
+            self.heartbeats += 1
+            self._publish(sample)
+            published += (sample,)
+        self._held = None if published and published[-1] is sample else sample
+        return published
+
+    def flush(self):
+        """return the sample held back by the swinging door, if any"""
+        held, self._held = self._held, None
+        if held is None:
+            return ()
+        self._publish(held)
+        return (held,)
+
+    def read_periodic(self, sensor, clock=time.monotonic):
+        """read the periodic measurement of sensor, return the published (timestamp, °C, %RH)"""
+        raw_temperature, raw_humidity = sensor.get_periodic_measurement_raw()
+        return [(timestamp, raw_to_temperature(temperature), raw_to_humidity(humidity))
+                for timestamp, temperature, humidity
+                in self.process(clock(), raw_temperature, raw_humidity)]
+
+    def read_single_shot(self, sensor, mode, clock=time.monotonic):
+        """take a single shot measurement of sensor, return the published (timestamp, °C, %RH)"""
+        raw_temperature, raw_humidity = sensor.get_single_shot_raw(mode)
+        return [(timestamp, raw_to_temperature(temperature), raw_to_humidity(humidity))
+                for timestamp, temperature, humidity
+                in self.process(clock(), raw_temperature, raw_humidity)]
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Non-blocking heater duty cycles of HDC3020 sensors for condensation recovery.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import threading
+import time
+
+# states of a sensor
+HEATER_IDLE = "idle"
+HEATER_PENDING = "pending"
+HEATER_HEATING = "heating"
+HEATER_RECOVERING = "recovering"
+HEATER_COOLDOWN = "cooldown"
+
+
+class _HeaterState():
+    """heat cycle of one sensor"""
+
+    def __init__(self, rail):
+        self.rail = rail
+        self.state = HEATER_IDLE
+        # end of the current state
+        self.until = 0.0
+        # samples from mask_start to mask_end are affected by the heater
+        self.mask_start = None
+        self.mask_end = None
+        self.current_set = False
+        # a heater command of this sensor is on the bus, outside of the lock
+        self.switching = False
+
+
+class HeaterManager():
+    """Runs timed heater cycles of several sensors without blocking their acquisition.
+
+    A cycle is requested when a sample shows a relative humidity of at least
+    humidity_threshold %RH or a temperature within dewpoint_margin °C of its
+    dewpoint. The heater is switched on for heat_time seconds, samples taken
+    while heating and for recovery_time seconds afterwards are affected, and
+    the sensor is not heated again within cooldown seconds after that.
+
+    Sensors sharing a power rail (rails maps a sensor to any rail key, its
+    bus_key by default) heat at most max_active_per_rail at a time, in order
+    of their requests. heater_current (msb, lsb) is written with
+    change_heater_current before the first cycle of a sensor.
+
+    The manager never sleeps: update() switches the heater of a sensor when
+    due and observe() checks a sample, both are called from the thread
+    reading that sensor, e.g. by PollingScheduler. The heater commands are
+    sent outside of the lock of the manager, so the bus I/O of one sensor
+    never holds up the sensors on other buses. With mask the scheduler
+    drops affected samples, otherwise they are published and can be tagged
+    with affected().
+    """
+
+    def __init__(self, humidity_threshold=95.0, dewpoint_margin=1.0, heat_time=10.0,
+                 recovery_time=30.0, cooldown=300.0, rails=None, max_active_per_rail=1,
+                 heater_current=None, mask=True, release_attempts=3, clock=time.monotonic):
+        self.humidity_threshold = humidity_threshold
+        self.dewpoint_margin = dewpoint_margin
+        self.heat_time = heat_time
+        self.recovery_time = recovery_time
+        self.cooldown = cooldown
+        self.rails = rails or {}
+        self.max_active_per_rail = max_active_per_rail
+        self.heater_current = heater_current
+        self.mask = mask
+        self.release_attempts = release_attempts
+        self.clock = clock
+        self.cycles = 0
+        self.errors = 0
+        self.max_active = 0
+        self._states = {}
+        self._queues = collections.defaultdict(collections.deque)
+        self._active = collections.Counter()
+        # rail: released sensors whose heater could not be switched off yet
+        self._released = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _state(self, sensor):
+        """state of a sensor, created on first use"""
+        state = self._states.get(sensor)
+        if state is None:
+            state = self._states[sensor] = _HeaterState(self.rails.get(sensor, sensor.bus_key))
+        return state
+
+    def state(self, sensor):
+        """current state of a sensor, one of the HEATER_* constants"""
+        with self._lock:
+            return self._state(sensor).state
+
+    def request(self, sensor):
+        """queue a heat cycle of an idle sensor, return True if it was queued"""
+        with self._lock:
+            state = self._state(sensor)
+            if state.state != HEATER_IDLE:
+                return False
+            state.state = HEATER_PENDING
+            self._queues[state.rail].append(sensor)
+            return True
+
+    def update(self, sensor, timestamp=None):
+        """switch the heater of sensor on or off when due, never blocks
+
+        Failed heater commands are counted in errors and retried at the next
+        update.
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        switch_on = switch_off = set_current = False
+        with self._lock:
+            state = self._state(sensor)
+            released = self._released.pop(state.rail, None) if self._released else None
+            if state.switching:
+                pass
+            elif state.state == HEATER_PENDING:
+                queue = self._queues[state.rail]
+                if queue[0] is sensor and self._active[state.rail] < self.max_active_per_rail:
+                    # the slot of the rail is taken before the heater is switched on
+                    queue.popleft()
+                    self._active[state.rail] += 1
+                    state.switching = switch_on = True
+                    set_current = self.heater_current is not None and not state.current_set
+            elif state.state == HEATER_HEATING and timestamp >= state.until:
+                state.switching = switch_off = True
+            elif state.state == HEATER_RECOVERING and timestamp >= state.until:
+                state.state = HEATER_COOLDOWN
+                state.until = timestamp + self.cooldown
+            elif state.state == HEATER_COOLDOWN and timestamp >= state.until:
+                state.state = HEATER_IDLE
+        if released:
+            self._switch_off_released(released)
+        if switch_on:
+            self._switch_on(sensor, state, timestamp, set_current)
+        elif switch_off:
+            self._switch_off(sensor, state, timestamp + self.recovery_time)
+
+    def _switch_off_released(self, sensors):
+        """switch off the heaters release() failed to switch off, outside of the lock"""
+        for sensor in sensors:
+            state = self._states[sensor]
+            with self._lock:
+                # heated again by its own updates in the meantime
+                if state.switching or state.state == HEATER_HEATING:
+                    continue
+            try:
+                sensor.heater_off()
+            except (Warning, OSError):
+                with self._lock:
+                    self.errors += 1
+                    self._released[state.rail].append(sensor)
+
+    def _switch_on(self, sensor, state, timestamp, set_current):
+        """switch the heater on outside of the lock, the rail slot is already taken"""
+        try:
+            if set_current:
+                sensor.change_heater_current(*self.heater_current)
+                with self._lock:
+                    state.current_set = True
+            sensor.heater_on()
+        except (Warning, OSError):
+            with self._lock:
+                self.errors += 1
+                # give the slot back, the sensor stays first in the queue
+                self._queues[state.rail].appendleft(sensor)
+                self._active[state.rail] -= 1
+                state.switching = False
+            return
+        with self._lock:
+            self.max_active = max(self.max_active, self._active[state.rail])
+            self.cycles += 1
+            state.state = HEATER_HEATING
+            state.until = timestamp + self.heat_time
+            state.mask_start = timestamp
+            state.mask_end = None
+            state.switching = False
+
+    def _switch_off(self, sensor, state, recovered):
+        """switch the heater off outside of the lock, samples until recovered are affected
+
+        Return True if the heater was switched off.
+        """
+        try:
+            sensor.heater_off()
+        except (Warning, OSError):
+            with self._lock:
+                self.errors += 1
+                state.switching = False
+            return False
+        with self._lock:
+            self._active[state.rail] -= 1
+            state.state = HEATER_RECOVERING
+            state.until = state.mask_end = recovered
+            state.switching = False
+        return True
+
+    def affected(self, sensor, timestamp):
+        """True if a sample of sensor taken at timestamp is affected by a heat cycle"""
+        with self._lock:
+            state = self._states.get(sensor)
+            if state is None or state.mask_start is None or timestamp < state.mask_start:
+                return False
+            return state.mask_end is None or timestamp < state.mask_end
+
+    def observe(self, sensor, timestamp, temperature, humidity):
+        """check a sample, request a heat cycle if needed, return True if it is affected"""
+        if self.affected(sensor, timestamp):
+            return True
+        # the dewpoint is undefined at 0 %RH
+        if humidity >= self.humidity_threshold or (
+                humidity > 0 and
+                temperature - sensor.get_dewpoint(temperature, humidity) <= self.dewpoint_margin):
+            if self.request(sensor):
+                self.update(sensor, timestamp)
+        return False
+
+    def release(self, sensor):
+        """switch a heating sensor off at once and drop a pending request
+
+        The heater is switched off with up to release_attempts tries. If all
+        fail, the slot of the rail is freed anyway and update() of any sensor
+        on the rail retries switching it off.
+        """
+        with self._lock:
+            state = self._states.get(sensor)
+            if state is None or state.switching:
+                return
+            if state.state == HEATER_PENDING:
+                self._queues[state.rail].remove(sensor)
+                state.state = HEATER_IDLE
+                return
+            if state.state != HEATER_HEATING:
+                return
+            state.switching = True
+        recovered = self.clock() + self.recovery_time
+        for attempt in range(self.release_attempts):
+            if attempt:
+                with self._lock:
+                    if state.switching or state.state != HEATER_HEATING:
+                        return
+                    state.switching = True
+            if self._switch_off(sensor, state, recovered):
+                return
+        with self._lock:
+            if state.switching or state.state != HEATER_HEATING:
+                return
+            self._active[state.rail] -= 1
+            state.state = HEATER_RECOVERING
+            state.until = state.mask_end = recovered
+            self._released[state.rail].append(sensor)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of HDC3020 bus transactions with pluggable sinks.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import collections
+import json
+import logging
+import time
+import hdc3020_i2c_library
+from hdc3020_i2c_capture import (split_transaction, split_write, CAPTURE_KIND_WRITE,
+                                 CAPTURE_KIND_READ, CAPTURE_KIND_WRITE_READ, NO_COMMAND)
+from hdc3020_i2c_library import HDC3020CRCError
+from hdc3020_i2c_recovery import LatencyHistogram
+
+# names of the HDC3020_COMMAND_* codes without the prefix
+COMMAND_NAMES = {command: name[len("HDC3020_COMMAND_"):]
+                 for name, command in sorted(vars(hdc3020_i2c_library).items())
+                 if name.startswith("HDC3020_COMMAND_")}
+COMMAND_NAMES[NO_COMMAND] = "READ"
+# kind of the event of the crc check and conversion of an answer in the library
+KIND_DECODE = 4
+KIND_NAMES = {CAPTURE_KIND_WRITE: "write", CAPTURE_KIND_READ: "read",
+              CAPTURE_KIND_WRITE_READ: "write_read", KIND_DECODE: "decode"}
+
+# wait: seconds from the end of the last write-only transaction to the address until a
+# read without command, the conversion time given to a triggered measurement, else 0.0
+BusEvent = collections.namedtuple(
+    "BusEvent", ["timestamp", "address", "command", "kind", "write_bytes", "read_bytes",
+                 "duration", "crc_errors", "error", "wait"])
+
+
+class InstrumentedBus():
+    """Wraps a bus object and reports every transaction to sinks.
+
+    A sink is any callable taking a BusEvent, e.g. a plain function, a
+    HistogramSink or a LogSink. Every write/read pair of an i2c_rdwr call
+    gives one event with its command code (NO_COMMAND for a read without
+    command), byte counts, the error class name of a failed transfer and
+    for a read without command the wait since the last write. The duration
+    of a combined transfer is split evenly between its pairs.
+
+    As tracer of a sensor (instrument() sets it) it also gets the crc check
+    and conversion of every answer from the library, reported as a
+    KIND_DECODE event with its duration and crc_errors 1 if the check
+    failed.
+
+    Usable wherever the library takes a bus, like CapturingBus, or on a
+    pooled sensor with instrument(). Without it the library runs its
+    uninstrumented code, so disabled instrumentation costs nothing. An
+    exception of a sink is logged and counted in sink_errors, it never
+    replaces the result or the error of the transaction.
+    """
+
+    def __init__(self, bus, sinks=(), clock=time.perf_counter, timestamp=time.time):
+        self.bus = bus
+        self.sinks = list(sinks)
+        self.clock = clock
+        self.timestamp = timestamp
+        self.sink_errors = 0
+        # address: clock() at the end of the last write-only transaction
+        self._last_write = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """execute the transaction on the wrapped bus and report it"""
+        error = None
+        start = self.clock()
+        try:
+            self.bus.i2c_rdwr(*i2c_msgs)
+        except OSError as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            end = self.clock()
+            self._report(i2c_msgs, start, end, error)
+
+    def trace_decode(self, sensor, command, decode, i2c_response):
+        """time decode(i2c_response) of the library and report it"""
+        error = None
+        crc_errors = 0
+        start = self.clock()
+        try:
+            return decode(i2c_response)
+        except HDC3020CRCError:
+            error = "HDC3020CRCError"
+            crc_errors = 1
+            raise
+        finally:
+            duration = self.clock() - start
+            self._emit(BusEvent(self.timestamp(), sensor.i2c_address,
+                                NO_COMMAND if command is None else command, KIND_DECODE, 0,
+                                len(i2c_response), duration, crc_errors, error, 0.0))
+
+    def _report(self, i2c_msgs, start, end, error):
+        """pass one event per write/read pair to the sinks"""
+        timestamp = self.timestamp()
+        groups = split_transaction(i2c_msgs)
+        duration = (end - start) / len(groups)
+        for kind, write_msg, read_msg in groups:
+            command = NO_COMMAND
+            write_bytes = read_bytes = 0
+            wait = 0.0
+            address = (read_msg if write_msg is None else write_msg).addr
+            if write_msg is not None:
+                written = bytes(write_msg)
+                command = split_write(written)[0]
+                write_bytes = len(written)
+                if read_msg is None and error is None:
+                    self._last_write[address] = end
+            if read_msg is not None:
+                read_bytes = read_msg.len
+                if write_msg is None and address in self._last_write:
+                    wait = start - self._last_write[address]
+            self._emit(BusEvent(timestamp, address, command, kind, write_bytes, read_bytes,
+                                duration, 0, error, wait))
+
+    def _emit(self, event):
+        """pass event to every sink, an exception of a sink is logged and counted"""
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception:  # pylint: disable=W0703
+                self.sink_errors += 1
+                logging.getLogger("hdc3020").exception("instrumentation sink %r failed", sink)
+
+    def close(self):
+        """close the wrapped bus"""
+        self.bus.close()
+
+
+def instrument(sensor, *sinks):
+    """report the transactions of sensor to sinks, opening its bus if needed"""
+    # pylint: disable=W0212
+    sensor.open()
+    if isinstance(sensor._bus, InstrumentedBus):
+        sensor._bus.sinks.extend(sinks)
+    else:
+        sensor._bus = InstrumentedBus(sensor._bus, sinks)
+    sensor.tracer = sensor._bus
+    return sensor._bus
+    # pylint: enable=W0212
+
+
+def uninstrument(sensor):
+    """restore the uninstrumented bus of sensor"""
+    # pylint: disable=W0212
+    if isinstance(sensor._bus, InstrumentedBus):
+        sensor._bus = sensor._bus.bus
+    sensor.tracer = None
+    # pylint: enable=W0212
+
+
+class CommandStatistics():
+    """Transactions, bytes, errors, latencies and waits of one command."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.crc_errors = 0
+        self.write_bytes = 0
+        self.read_bytes = 0
+        self.latency = LatencyHistogram()
+        self.waits = 0
+        self.wait_total = 0.0
+
+    def as_dict(self):
+        """statistics as dict with the mean and p99 latency and the mean wait in µs"""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "crc_errors": self.crc_errors,
+            "write_bytes": self.write_bytes,
+            "read_bytes": self.read_bytes,
+            "mean_us": 1e6 * self.latency.total / self.count if self.count else None,
+            "p99_us": self.latency.percentile(0.99),
+            "mean_wait_us": 1e6 * self.wait_total / self.waits if self.waits else None,
+        }
+
+
+class HistogramSink():
+    """Sink keeping CommandStatistics per command code and decode in memory."""
+
+    def __init__(self):
+        # (command, event is KIND_DECODE): statistics
+        self.commands = collections.defaultdict(CommandStatistics)
+
+    def __call__(self, event):
+        statistics = self.commands[event.command, event.kind == KIND_DECODE]
+        statistics.count += 1
+        statistics.write_bytes += event.write_bytes
+        statistics.read_bytes += event.read_bytes
+        statistics.crc_errors += event.crc_errors
+        if event.error is not None:
+            statistics.errors += 1
+        statistics.latency.add(event.duration)
+        if event.wait:
+            statistics.waits += 1
+            statistics.wait_total += event.wait
+
+    def report(self):
+        """dict command name: statistics dict, the decode of a command as name.decode"""
+        return {COMMAND_NAMES.get(command, "0x%04X" % command) + (".decode" if decode else ""):
+                statistics.as_dict()
+                for (command, decode), statistics in sorted(self.commands.items())}
+
+
+class LogSink():
+    """Sink writing one structured log record per event.
+
+    The message is a JSON object, the event is also attached to the record
+    as attribute hdc3020_event for handlers that format it themselves.
+    Nothing is formatted while level is disabled for the logger.
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logging.getLogger("hdc3020") if logger is None else logger
+        self.level = level
+
+    def __call__(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        fields = event._asdict()
+        fields["command"] = COMMAND_NAMES.get(event.command, "0x%04X" % event.command)
+        fields["kind"] = KIND_NAMES[event.kind]
+        self.logger.log(self.level, "%s", json.dumps(fields, sort_keys=True),
+                        extra={"hdc3020_event": event})
@@ -23,10 +23,14 @@ the information contained in this document.
 """
 
 
-# pylint: disable=E0401
-from smbus2 import SMBus, i2c_msg
-import math
-# pylint: enable=E0401
+import collections
+import ctypes
+import errno
+import threading
+import time
+import weakref
+from hdc3020_i2c_backend import I2C_M_RD, load_backend
+from hdc3020_i2c_conversion import raw_to_temperature, raw_to_humidity, calc_dewpoint
 
 CRC8_ONEWIRE_POLY = 0x31
 CRC8_ONEWIRE_START = 0xFF
@@ -83,6 +87,108 @@ HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0 = 0x2737
 HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1 = 0x2721
 HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2 = 0x272A
 HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3 = 0x27FF
+# measurements per second for the measurement_per_seconds index of start_periodic_measurement
+PERIODIC_MEASUREMENT_RATES = (0.5, 1, 2, 4, 10)
+# single shot commands and conversion times in seconds for mode 0 (low noise) to 3
+SINGLE_SHOT_COMMANDS = (HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_0,
+                        HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_1,
+                        HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_2,
+                        HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_3)
+SINGLE_SHOT_CONVERSION_TIMES = (0.0125, 0.0075, 0.005, 0.0037)
+# start periodic measurement commands indexed by [measurement_per_seconds][mode]
+START_PERIODIC_COMMANDS = (
+    (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_0,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_1,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_2,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_3),
+    (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_1,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_2,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_3),
+    (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_0,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_1,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_2,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_3),
+    (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_0,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_1,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_2,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_3),
+    (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2,
+     HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3),
+)
+# immutable bytes sent for every command, built once at import
+COMMAND_BYTES = {
+    command: bytes(((command >> 8), (command & 0xFF)))
+    for name, command in dict(globals()).items() if name.startswith("HDC3020_COMMAND_")
+}
+# reads of read_snapshot as (command, receiving_bytes)
+SNAPSHOT_READS = ((HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT, 6),
+                  (HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T, 3),
+                  (HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T, 3),
+                  (HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH, 3),
+                  (HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH, 3),
+                  (HDC3020_COMMAND_READ_STATUS_REGISTER, 3))
+# i2c addresses selectable with the ADDR and ADDR1 pins
+HDC3020_ADDRESSES = (0x44, 0x45, 0x46, 0x47)
+# errno values of an adapter which can't combine that many messages in one transfer
+I2C_UNSUPPORTED_ERRNOS = (errno.EINVAL, errno.EOPNOTSUPP)
+# bits of the status register
+STATUS_ALERT = 1 << 15
+STATUS_HEATER = 1 << 13
+STATUS_RH_TRACKING_ALERT = 1 << 11
+STATUS_T_TRACKING_ALERT = 1 << 10
+STATUS_RH_HIGH_ALERT = 1 << 9
+STATUS_RH_LOW_ALERT = 1 << 8
+STATUS_T_HIGH_ALERT = 1 << 7
+STATUS_T_LOW_ALERT = 1 << 6
+STATUS_RESET_DETECTED = 1 << 4
+STATUS_WRITE_CHECKSUM_ERROR = 1 << 0
+# configuration registers: write command -> command reading the register back
+CONFIG_READ_COMMANDS = {
+    HDC3020_COMMAND_CHANGE_SET_LOW_ALERT: HDC3020_COMMAND_READ_SET_LOW_ALERT,
+    HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT: HDC3020_COMMAND_READ_CLEAR_LOW_ALERT,
+    HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT: HDC3020_COMMAND_READ_SET_HIGH_ALERT,
+    HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT: HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT,
+    HDC3020_COMMAND_OFFSET_VALUE: HDC3020_COMMAND_OFFSET_VALUE,
+    HDC3020_COMMAND_HEATER_CONFIGURE: HDC3020_COMMAND_HEATER_CONFIGURE,
+}
+# errno values of a NACK, depending on the I2C adapter driver
+I2C_NACK_ERRNOS = (errno.EREMOTEIO, errno.ENXIO, errno.EIO)
+
+
+class HDC3020Error(Warning):
+    """base class of the errors of this library, a Warning as raised by earlier versions"""
+
+
+class HDC3020CRCError(HDC3020Error):
+    """received data does not match its crc"""
+
+
+class HDC3020BusError(OSError, HDC3020Error):
+    """i2c transfer failed, errno as reported by the adapter driver"""
+
+
+class HDC3020NackError(HDC3020BusError):
+    """the sensor did not acknowledge a transfer"""
+
+
+def _bus_error(exception):
+    """typed exception of an OSError raised by i2c_rdwr"""
+    if isinstance(exception, HDC3020BusError):
+        return exception
+    if exception.errno in I2C_NACK_ERRNOS:
+        return HDC3020NackError(exception.errno, exception.strerror)
+    return HDC3020BusError(exception.errno, exception.strerror)
+
+
+def _check_mode(mode):
+    """return mode if it is a valid noise/power mode 0 - 3, raise ValueError otherwise"""
+    if mode not in range(len(SINGLE_SHOT_COMMANDS)):
+        raise ValueError("invalid mode: %r" % (mode,))
+    return mode
+
 
 def get_status_string(status_code):
     """Return string from status_code."""
@@ -97,415 +203,642 @@ def get_status_string(status_code):
     return "Unknown error"
 
 
+def _build_crc8_table():
+    """crc of every single byte starting from a zero register"""
+    table = bytearray(256)
+    for byte in range(256):
+        crc_val = byte
+        for _ in range(8):
+            if crc_val & 0x80:
+                crc_val = ((crc_val << 1) ^ CRC8_ONEWIRE_POLY) & 0xFF
+            else:
+                crc_val = (crc_val << 1) & 0xFF
+        table[byte] = crc_val
+    return bytes(table)
+
+
+CRC8_TABLE = _build_crc8_table()
+
+
 def calc_crc8(buf, start, end):
     ''' calculate crc8 checksum  '''
     crc_val = CRC8_ONEWIRE_START
     for j in range(start, end):
-        cur_val = buf[j]
-        for _ in range(8):
-            if ((crc_val ^ cur_val) & 0x80) != 0:
-                crc_val = (crc_val << 1) ^ CRC8_ONEWIRE_POLY
-            else:
-                crc_val = crc_val << 1
-            cur_val = cur_val << 1
-    crc_val &= 0xFF
+        crc_val = CRC8_TABLE[crc_val ^ buf[j]]
     return crc_val
 
 
-class HDC3020():
-    """Implements communication with HDC3020 over i2c with a specific address."""
+def find_crc8_errors(buf):
+    """return the indices of all 3 byte words (msb, lsb, crc) in buf with a wrong crc
+
+    buf can be any bytes, bytearray or memoryview holding consecutive words,
+    e.g. a sequence of raw 6 byte measurement frames.
+    """
+    data = memoryview(buf).cast("B")
+    if len(data) % 3:
+        raise ValueError("buffer length is not a multiple of 3")
+    table = CRC8_TABLE
+    return [index for index, (msb, lsb, crc) in enumerate(zip(data[0::3], data[1::3], data[2::3]))
+            if table[table[CRC8_ONEWIRE_START ^ msb] ^ lsb] != crc]
+
+
+def verify_crc8_words(buf):
+    """return True if every 3 byte word (msb, lsb, crc) in buf has a valid crc"""
+    return not find_crc8_errors(buf)
+
 
-    def __init__(self, i2c_address):
-        self.i2c_address = i2c_address
+def message_view(msg):
+    """memoryview of the bytes in the buffer of an i2c message, valid as long as msg"""
+    array_type = ctypes.POINTER(ctypes.c_ubyte * msg.len)
+    return memoryview(ctypes.cast(msg.buf, array_type).contents).cast("B")
+
+
+def fill_read_message(msg, data):
+    """copy response bytes into the buffer of an i2c read message, used by simulated buses"""
+    ctypes.memmove(msg.buf, bytes(data[:msg.len]), min(msg.len, len(data)))
+
+
+Snapshot = collections.namedtuple(
+    "Snapshot", ["temperature", "humidity", "min_temperature", "max_temperature",
+                 "min_humidity", "max_humidity", "status", "heater"])
+
+
+# time of a transfer: midpoint of the i2c_rdwr call on the time.monotonic() clock,
+# the same instant on the wall clock (time.time()) and the duration of the call
+SampleTime = collections.namedtuple("SampleTime", ["monotonic", "wall", "duration"])
+
+
+def _sample_time(start, end, wall):
+    """SampleTime of a transfer from the monotonic start and end and the wall clock at the end"""
+    duration = end - start
+    return SampleTime(start + duration / 2, wall - duration / 2, duration)
+
+
+def decode_temp_hum(i2c_response):
+    """check the crc of a 6 byte measurement frame and return temperature and humidity"""
+    if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)) & (i2c_response[5] ==
+                                                             calc_crc8(i2c_response, 3, 5)):
+        return (raw_to_temperature((i2c_response[0] << 8) | i2c_response[1]),
+                raw_to_humidity((i2c_response[3] << 8) | i2c_response[4]))
+    else:
+        raise HDC3020CRCError(get_status_string(2))
+
+
+def decode_raw_temp_hum(i2c_response):
+    """check the crc of a 6 byte measurement frame and return the raw 16 bit temperature and humidity"""
+    if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)) & (i2c_response[5] ==
+                                                             calc_crc8(i2c_response, 3, 5)):
+        return (i2c_response[0] << 8) | i2c_response[1], (i2c_response[3] << 8) | i2c_response[4]
+    raise HDC3020CRCError(get_status_string(2))
+
+
+def decode_bytes(i2c_response):
+    """check the crc of a 3 byte register frame and return its two data bytes"""
+    if i2c_response[2] == calc_crc8(i2c_response, 0, 2):
+        return i2c_response[0], i2c_response[1]
+    raise HDC3020CRCError(get_status_string(2))
+
+
+def decode_word(i2c_response):
+    """check the crc of a 3 byte register frame and return its 16 bit value"""
+    if i2c_response[2] == calc_crc8(i2c_response, 0, 2):
+        return (i2c_response[0] << 8) | i2c_response[1]
+    raise HDC3020CRCError(get_status_string(2))
+
+
+class SMBusPool():
+    """Process-wide pool of open SMBus handles, shared per bus number.
+
+    Every bus number is opened once and reference counted, so all HDC3020
+    instances on the same bus share one file descriptor. Each bus has a lock
+    which serializes the transactions of the instances sharing it. Buses are
+    opened with bus_factory(bus_number), by default with the bus class of
+    the backend selected in hdc3020_i2c_backend.
+    """
+
+    def __init__(self, bus_factory=None):
+        self.bus_factory = bus_factory
+        self._lock = threading.Lock()
+        self._buses = {}
+        self._injected_locks = weakref.WeakKeyDictionary()
+
+    def acquire(self, bus_number):
+        """return the shared bus and its lock, opening the bus if necessary"""
+        with self._lock:
+            entry = self._buses.get(bus_number)
+            if entry is None:
+                bus_factory = self.bus_factory or load_backend().bus_class
+                entry = [bus_factory(bus_number), threading.RLock(), 0]
+                self._buses[bus_number] = entry
+            entry[2] += 1
+            return entry[0], entry[1]
+
+    def release(self, bus_number):
+        """drop one reference to a bus, the bus is closed with the last one"""
+        with self._lock:
+            entry = self._buses.get(bus_number)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self._buses[bus_number]
+                entry[0].close()
+
+    def lock_for(self, bus):
+        """return the lock used for an injected bus object"""
+        with self._lock:
+            for entry in self._buses.values():
+                if entry[0] is bus:
+                    return entry[1]
+            try:
+                lock = self._injected_locks.get(bus)
+                if lock is None:
+                    lock = threading.RLock()
+                    self._injected_locks[bus] = lock
+            except TypeError:
+                lock = threading.RLock()
+            return lock
+
+    def close_all(self):
+        """close all pooled buses regardless of their reference count"""
+        with self._lock:
+            entries = list(self._buses.values())
+            self._buses.clear()
+        for entry in entries:
+            entry[0].close()
+
+
+BUS_POOL = SMBusPool()
+
+
+def __getattr__(name):
+    """SMBus and i2c_msg of the selected backend, bound on first access"""
+    if name == "SMBus":
+        return load_backend().bus_class
+    if name == "i2c_msg":
+        return load_backend().i2c_msg
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+class HDC3020():
+    """Implements communication with HDC3020 over i2c with a specific address.
+
+    Without a bus argument the sensor shares a pooled SMBus handle for
+    bus_number, which stays open until close() is called. An injected bus
+    object (anything with i2c_rdwr) is used as is and never closed here.
+
+    The identification and the configuration registers (offset, heater
+    current, alert thresholds) are kept in a shadow cache: they are read
+    from the sensor once, the change_* methods update the cache and reset()
+    drops it. config_ttl limits the age of cached configuration values in
+    seconds (None = no limit, 0 = no caching), invalidate_cache() and
+    refresh_cache() drop or reload it, e.g. after other programs changed
+    the sensor.
+    """
+
+    def __init__(self, i2c_address, bus=None, bus_number=1, pool=None, config_ttl=None,
+                 clock=time.monotonic):
+        self._i2c_address = i2c_address
+        self._messages = {}
+        self._read_messages = {}
+        self._snapshot_messages = None
+        self.bus_number = bus_number
+        self._pool = BUS_POOL if pool is None else pool
+        self._owns_bus = bus is None
+        self._bus = bus
+        self._bus_lock = None if bus is None else self._pool.lock_for(bus)
+        self.combined_transfers = True
+        # (measurement_per_seconds, mode) while the periodic measurement runs
+        self.periodic_setting = None
+        self.config_ttl = config_ttl
+        self.clock = clock
+        self._identification = None
+        self._config_cache = {}
+        # (start, end, wall clock at end) of the last measurement read
+        self._transfer_time = None
+        # object with trace_decode(sensor, command, decode, i2c_response), see instrumentation,
+        # command is None for a read without command
+        self.tracer = None
+
+    @property
+    def i2c_address(self):
+        """i2c address of the sensor"""
+        return self._i2c_address
+
+    @property
+    def bus_key(self):
+        """identifies the bus of the sensor: the injected bus object, else pool and bus number"""
+        if self._owns_bus:
+            return self._pool, self.bus_number
+        return self._bus
+
+    @i2c_address.setter
+    def i2c_address(self, i2c_address):
+        self._i2c_address = i2c_address
+        self._messages = {}
+        self._read_messages = {}
+        self._snapshot_messages = None
+        self.invalidate_cache()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """acquire the pooled bus handle, done automatically on the first transaction"""
+        if self._bus is None:
+            self._bus, self._bus_lock = self._pool.acquire(self.bus_number)
+        return self
+
+    def close(self):
+        """give the pooled bus handle back to the pool"""
+        if self._owns_bus and self._bus is not None:
+            self._bus = None
+            self._bus_lock = None
+            self._pool.release(self.bus_number)
 
     def get_single_shot_temp_hum(self, Mode): #Mode : 0 = low noise, 1 , 2 , 3 = lowest power
         """Let the sensor take a measurement and return the temperature and humidity values."""
-        if Mode == 0:
-            i2c_response = self.wire_write_read(
-                [(HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_0 >> 8),
-                 (HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_0 & 0xFF)], 6)
-        elif Mode == 1:
-            i2c_response = self.wire_write_read(
-                [(HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_1 >> 8),
-                 (HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_1 & 0xFF)], 6)
-        elif Mode == 2:
-            i2c_response = self.wire_write_read(
-                [(HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_2 >> 8),
-                 (HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_2 & 0xFF)], 6)
-        else:
-            i2c_response = self.wire_write_read(
-                [(HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_3 >> 8),
-                 (HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_3 & 0xFF)], 6)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)) & (i2c_response[5] 
-                                                                 == calc_crc8(i2c_response, 3, 5)):
-            temperature = -45 + (175 * ((i2c_response[0]) * 256 + i2c_response[1])/(65536 - 1))
-            humidity = 100 * ((float)(i2c_response[3]) * 256 + i2c_response[4]) / (65536 - 1)
-            return temperature, humidity
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_measurement(SINGLE_SHOT_COMMANDS[_check_mode(Mode)], decode_temp_hum)[1]
+
+    def get_single_shot_raw(self, mode):
+        """take a single shot measurement and return the raw 16 bit temperature and humidity"""
+        return self._read_measurement(SINGLE_SHOT_COMMANDS[_check_mode(mode)],
+                                      decode_raw_temp_hum)[1]
+
+    def trigger_single_shot(self, mode):
+        """start a single shot measurement, the result is read with collect_single_shot"""
+        self._command(SINGLE_SHOT_COMMANDS[_check_mode(mode)])
+
+    def collect_single_shot(self):
+        """return temperature and humidity of a triggered measurement, None while not ready
+
+        The sensor does not acknowledge the read until the conversion is done,
+        so a NACK means "try again later" here.
+        """
+        try:
+            return self._read(6, decode_temp_hum)
+        except OSError as exception:
+            if exception.errno in I2C_NACK_ERRNOS:
+                return None
+            raise
 
     def get_periodic_measurement_temp_hum(self):
         """Get the last measurement from the periodic measurement for temperature and humidity"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT >> 8),
-             (HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT & 0xFF)], 6)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)) & (i2c_response[5] ==
-                                                                 calc_crc8(i2c_response, 3, 5)):
-            temperature = -45 + (175 * ((i2c_response[0]) * 256 + i2c_response[1])/(65536 - 1))
-            humidity = 100 * ((float)(i2c_response[3]) * 256 + i2c_response[4]) / (65536 - 1)
-            return temperature, humidity
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_measurement(HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT,
+                                      decode_temp_hum)[1]
+
+    def get_periodic_measurement_raw(self):
+        """Get the last periodic measurement as raw 16 bit temperature and humidity values"""
+        return self._read_measurement(HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT,
+                                      decode_raw_temp_hum)[1]
+
+    def get_periodic_measurement_timestamped(self):
+        """Get the last periodic measurement as (SampleTime, temperature, humidity)"""
+        sample_time, (temperature, humidity) = self._read_measurement(
+            HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT, decode_temp_hum)
+        return sample_time, temperature, humidity
+
+    @property
+    def last_sample_time(self):
+        """SampleTime of the last measurement read, taken around its i2c_rdwr call
+
+        Another thread reading the same sensor may replace it at any time, use
+        get_periodic_measurement_timestamped to get the time of one read.
+        """
+        if self._transfer_time is None:
+            return None
+        return _sample_time(*self._transfer_time)
+
+    def read_snapshot(self):
+        """Read measurement, min/max values and status register in one bus session
+
+        All reads are sent as one combined i2c transfer. Adapters which can't
+        combine that many messages get the reads one after the other, still
+        without another sensor using the bus in between.
+        """
+        if self._snapshot_messages is None:
+            messages = []
+            for command, receiving_bytes in SNAPSHOT_READS:
+                messages.extend(self._messages_for(command, receiving_bytes))
+            self._snapshot_messages = tuple(messages)
+        messages = self._snapshot_messages
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            if self.combined_transfers:
+                try:
+                    self._bus.i2c_rdwr(*messages)
+                except OSError as exception:
+                    if exception.errno not in I2C_UNSUPPORTED_ERRNOS:
+                        raise _bus_error(exception) from exception
+                    self.combined_transfers = False
+            if not self.combined_transfers:
+                for index in range(0, len(messages), 2):
+                    try:
+                        self._bus.i2c_rdwr(messages[index], messages[index + 1])
+                    except OSError as exception:
+                        raise _bus_error(exception) from exception
+            i2c_response = b"".join([bytes(messages[index]) for index in range(1, len(messages), 2)])
+        if find_crc8_errors(i2c_response):
+            raise HDC3020CRCError(get_status_string(2))
+        words = [(i2c_response[index] << 8) | i2c_response[index + 1]
+                 for index in range(0, len(i2c_response), 3)]
+        return Snapshot(raw_to_temperature(words[0]), raw_to_humidity(words[1]),
+                        raw_to_temperature(words[2]), raw_to_temperature(words[3]),
+                        raw_to_humidity(words[4]), raw_to_humidity(words[5]),
+                        words[6], 1 if words[6] & STATUS_HEATER else 0)
 
     def get_dewpoint(self, temperature, humidity):
         """Get the calculated dewpoint"""
-        if(temperature > 0):
-            dewpoint = 243.12 * ((17.62 * temperature) / (243.12 + temperature) + math.log(humidity / 100))/((17.62 * 243.12) / (243.12 + temperature) - math.log(humidity / 100))
-        else:
-            dewpoint = 272.62 * ((((22.46*temperature) / (272.62 + temperature)) + math.log(humidity / 100)) / (((22.46 * 272.62) / (272.62 + temperature)) - math.log(humidity / 100)))
-        return dewpoint
+        return calc_dewpoint(temperature, humidity)
 
     def get_periodic_measurement_min_temp(self):
         """get the minimum temperature from the periodic measurement"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T >> 8),
-             (HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            temperature = -45 + (175 * ((i2c_response[0]) * 256 + i2c_response[1])/(65536 - 1))
-            return temperature
-        else:
-            raise Warning(get_status_string(2))
+        return raw_to_temperature(self._read_word(HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T))
 
     def get_periodic_measurement_max_temp(self):
         """get the maximum temperature from the periodic measurement"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T >> 8),
-             (HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            temperature = -45 + (175 * ((i2c_response[0]) * 256 + i2c_response[1])/(65536 - 1))
-            return temperature
-        else:
-            raise Warning(get_status_string(2))
+        return raw_to_temperature(self._read_word(HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T))
 
     def get_periodic_measurement_min_hum(self):
         """get the minimum humidity from the periodic measurement"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH >> 8),
-             (HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            humidity = 100 * ((float)(i2c_response[0]) * 256 + i2c_response[1]) / (65536 - 1)
-            return humidity
-        else:
-            raise Warning(get_status_string(2))
+        return raw_to_humidity(self._read_word(HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH))
 
     def get_periodic_measurement_max_hum(self):
         """get the maximum humidity from the periodic measurement"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH >> 8),
-             (HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            humidity = 100 * ((float)(i2c_response[0]) * 256 + i2c_response[1]) / (65536 - 1)
-            return humidity
-        else:
-            raise Warning(get_status_string(2))
+        return raw_to_humidity(self._read_word(HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH))
 
     def change_default_device_power_on(self, send_bytes1, send_bytes2):
         """change the default power on status, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_DEFAULT_POWER_ON >> 8),
-             (HDC3020_COMMAND_CHANGE_DEFAULT_POWER_ON & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_CHANGE_DEFAULT_POWER_ON, send_bytes1, send_bytes2)
 
     def change_set_low_alert(self, send_bytes1, send_bytes2):
         """change the low alert limits, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_SET_LOW_ALERT >> 8),
-             (HDC3020_COMMAND_CHANGE_SET_LOW_ALERT & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_CHANGE_SET_LOW_ALERT, send_bytes1, send_bytes2)
 
     def change_clear_low_alert(self, send_bytes1, send_bytes2):
         """change the low clear limits, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT >> 8),
-             (HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT, send_bytes1, send_bytes2)
 
     def change_set_high_alert(self, send_bytes1, send_bytes2):
         """change the high alert limits, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT >> 8),
-             (HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT, send_bytes1, send_bytes2)
 
     def change_clear_high_alert(self, send_bytes1, send_bytes2):
         """change the high clear limits, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT >> 8),
-             (HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT, send_bytes1, send_bytes2)
 
     def read_set_low_alert(self):
         """read set low alert limit, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_SET_LOW_ALERT >> 8),
-             (HDC3020_COMMAND_READ_SET_LOW_ALERT & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_READ_SET_LOW_ALERT)
 
     def read_clear_low_alert(self):
         """read clear low alert limit, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_CLEAR_LOW_ALERT >> 8),
-             (HDC3020_COMMAND_READ_CLEAR_LOW_ALERT & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_READ_CLEAR_LOW_ALERT)
 
     def read_set_high_alert(self):
         """read set high alert limit, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_SET_HIGH_ALERT >> 8),
-             (HDC3020_COMMAND_READ_SET_HIGH_ALERT & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_READ_SET_HIGH_ALERT)
 
     def read_clear_high_alert(self):
         """read clear high alert limit, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT >> 8),
-             (HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT)
 
     def deactivate_environmental_tracking(self):
         """deacticate the environmental trackingread"""
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_SET_LOW_ALERT >> 8), 
-             (HDC3020_COMMAND_CHANGE_SET_LOW_ALERT & 0xFF), 
-             0xFF, 0xFF, 0xAC])
-        self.wire_write(
-            [(HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT >> 8),
-             (HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT & 0xFF),
-             0x00, 0x00, 0x81])
+        self._write_word(HDC3020_COMMAND_CHANGE_SET_LOW_ALERT, 0xFF, 0xFF)
+        self._write_word(HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT, 0x00, 0x00)
 
     def transfer_thresholds_into_non_volatile_memory(self):
         """transfer_thresholds_into_non_volatile_memory"""
-        self.wire_write(
-            [(HDC3020_COMMAND_INTO_NON_VOLATILE_MEMORY >> 8), 
-             (HDC3020_COMMAND_INTO_NON_VOLATILE_MEMORY & 0xFF)])
+        self._command(HDC3020_COMMAND_INTO_NON_VOLATILE_MEMORY)
+        self._config_cache = {}
 
     def change_offset_value(self, send_bytes1, send_bytes2):
         """change offset value, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_OFFSET_VALUE >> 8),
-             (HDC3020_COMMAND_OFFSET_VALUE & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_OFFSET_VALUE, send_bytes1, send_bytes2)
 
     def read_offset_value(self):
         """read offset value, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_OFFSET_VALUE >> 8),
-             (HDC3020_COMMAND_OFFSET_VALUE & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_OFFSET_VALUE)
 
     def change_heater_current(self, send_bytes1, send_bytes2):
         """change heater current, more info in the datasheet"""
-        send_byte1 = send_byte1 & 255
-        send_byte2 = send_byte2 & 255
-        self.wire_write(
-            [(HDC3020_COMMAND_HEATER_CONFIGURE >> 8),
-             (HDC3020_COMMAND_HEATER_CONFIGURE & 0xFF),
-             send_bytes1, send_bytes2,
-             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        self._write_word(HDC3020_COMMAND_HEATER_CONFIGURE, send_bytes1, send_bytes2)
 
     def read_heater_current(self):
         """read heater current, more info in the datasheet"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_HEATER_CONFIGURE >> 8),
-             (HDC3020_COMMAND_HEATER_CONFIGURE & 0xFF)], 3)
-        if (i2c_response[2] == calc_crc8(i2c_response, 0, 2)):
-            return i2c_response[0], i2c_response[1]
-        else:
-            raise Warning(get_status_string(2))
+        return self._read_config(HDC3020_COMMAND_HEATER_CONFIGURE)
 
     def start_periodic_measurement(self, measurement_per_seconds, mode): #measurementPerSeconds: 0 = 0.5 mps, 1 = 1mps, 2 = 2mps, 3 = 4mps, 4 = 10mps;  Mode : 0 = low noise, 1 , 2 , 3 = lowest power
         """starts the periodic measurement"""
-        if measurement_per_seconds == 0:
-            if mode == 0:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_0 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_0 & 0xFF)])
-            elif mode == 1:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_1 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_1 & 0xFF)])
-            elif mode == 2:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_2 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_2 & 0xFF)])
-            else:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_3 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_3 & 0xFF)])
-        if measurement_per_seconds == 1:
-            if mode == 0:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0 & 0xFF)])
-            elif mode == 1:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_1 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_1 & 0xFF)])
-            elif mode == 2:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_2 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_2 & 0xFF)])
-            else:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_3 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_3 & 0xFF)])
-        if measurement_per_seconds == 2:
-            if mode == 0:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_0 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_0 & 0xFF)])
-            elif mode == 1:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_1 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_1 & 0xFF)])
-            elif mode == 2:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_2 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_2 & 0xFF)])
-            else:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_3 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_3 & 0xFF)])
-        if measurement_per_seconds == 3:
-            if mode == 0:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_0 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_0 & 0xFF)])
-            elif mode == 1:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_1 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_1 & 0xFF)])
-            elif mode == 2:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_2 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_2 & 0xFF)])
-            else:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_3 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_3 & 0xFF)])
-        if measurement_per_seconds == 4:
-            if mode == 0:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0 & 0xFF)])
-            elif mode == 1:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1 & 0xFF)])
-            elif mode == 2:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2 & 0xFF)])
-            else:
-                self.wire_write(
-                    [(HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3 >> 8),
-                     (HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3 & 0xFF)])
+        if measurement_per_seconds not in range(len(PERIODIC_MEASUREMENT_RATES)):
+            raise ValueError("invalid measurement_per_seconds: %r" % (measurement_per_seconds,))
+        self._command(START_PERIODIC_COMMANDS[measurement_per_seconds][_check_mode(mode)])
+        self.periodic_setting = (measurement_per_seconds, mode)
 
     def end_periodic_measurement(self):
         """ends the periodic measurement"""
-        self.wire_write([(HDC3020_COMMAND_END_PERIODIC_MEASUREMENT >> 8),
-                          (HDC3020_COMMAND_END_PERIODIC_MEASUREMENT & 0xFF)])
+        self._command(HDC3020_COMMAND_END_PERIODIC_MEASUREMENT)
+        self.periodic_setting = None
 
     def heater_on(self):
         """turns the heater on """
-        self.wire_write([(HDC3020_COMMAND_HEATER_ON >> 8),
-                          (HDC3020_COMMAND_HEATER_ON & 0xFF)])
+        self._command(HDC3020_COMMAND_HEATER_ON)
 
     def heater_off(self):
         """turns the heater off"""
-        self.wire_write([(HDC3020_COMMAND_HEATER_OFF >> 8),
-                          (HDC3020_COMMAND_HEATER_OFF & 0xFF)])
+        self._command(HDC3020_COMMAND_HEATER_OFF)
 
     def read_identification(self):
-        """reads the identification number"""
-        i2c_response1 = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MANUFACTOR_ID_0 >> 8),
-             (HDC3020_COMMAND_READ_MANUFACTOR_ID_0 & 0xFF)], 3)
-        i2c_response2 = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MANUFACTOR_ID_1 >> 8),
-             (HDC3020_COMMAND_READ_MANUFACTOR_ID_1 & 0xFF)], 3)
-        i2c_response3 = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_MANUFACTOR_ID_1 >> 8),
-             (HDC3020_COMMAND_READ_MANUFACTOR_ID_1 & 0xFF)], 3)
-        if i2c_response1[2] == calc_crc8(i2c_response1, 0, 2) and i2c_response2[2] == calc_crc8(i2c_response2, 0, 2) and i2c_response3[2] == calc_crc8(i2c_response3, 0, 2):
-            return [i2c_response1[0], i2c_response1[1], i2c_response2[0], i2c_response2[1], i2c_response3[0], i2c_response3[1]]
-        else:
-            raise Warning(get_status_string(2))
+        """reads the identification number, from the cache after the first read"""
+        if self._identification is None:
+            self._identification = (self._read_bytes(HDC3020_COMMAND_READ_MANUFACTOR_ID_0) +
+                                    self._read_bytes(HDC3020_COMMAND_READ_MANUFACTOR_ID_1) +
+                                    self._read_bytes(HDC3020_COMMAND_READ_MANUFACTOR_ID_2))
+        return list(self._identification)
 
     def reset(self):
-        """resets the sensor"""
-        self.wire_write([(HDC3020_COMMAND_SOFT_RESET >> 8),
-                         (HDC3020_COMMAND_SOFT_RESET & 0xFF)])
+        """resets the sensor, which ends a periodic measurement and reloads the configuration"""
+        self._config_cache = {}
+        self._command(HDC3020_COMMAND_SOFT_RESET)
+        self.periodic_setting = None
+
+    def invalidate_cache(self):
+        """drop the cached identification and configuration registers"""
+        self._identification = None
+        self._config_cache = {}
+
+    def refresh_cache(self):
+        """read the identification and all configuration registers from the sensor again"""
+        self.invalidate_cache()
+        self.read_identification()
+        for command in CONFIG_READ_COMMANDS.values():
+            self._read_config(command)
 
     def constant_heater_on_off(self):
         """get the informatio if the heater is on or off"""
-        i2c_response = self.wire_write_read(
-            [(HDC3020_COMMAND_READ_STATUS_REGISTER >> 8),
-             (HDC3020_COMMAND_READ_STATUS_REGISTER & 0xFF)], 3)
-        if i2c_response[2] == calc_crc8(i2c_response, 0, 2):
-            i2c_response[0] = (i2c_response[0] << 2) & 255
-            return i2c_response[0] >> 7
-        else:
-            raise Warning(get_status_string(2))
+        return 1 if self.read_status_register() & STATUS_HEATER else 0
+
+    def read_status_register(self):
+        """read the 16 bit status register, see the STATUS_* bits"""
+        return self._read_word(HDC3020_COMMAND_READ_STATUS_REGISTER)
 
     def clear_statusregister(self):
         """clear the status register"""
-        self.wire_write([(HDC3020_COMMAND_CLEAR_STATUS_REGISTER >> 8),
-                         (HDC3020_COMMAND_CLEAR_STATUS_REGISTER & 0xFF)])
+        self._command(HDC3020_COMMAND_CLEAR_STATUS_REGISTER)
+
+    def _prebuilt(self, command, receiving_bytes=0):
+        """prebuilt (write, read, receiving_bytes, view of the read buffer) of a command"""
+        # single shot commands are sent without (trigger_single_shot) and with a read
+        messages = self._messages.get((command, receiving_bytes))
+        if messages is None:
+            read_command = view = None
+            i2c_msg = load_backend().i2c_msg
+            if receiving_bytes:
+                read_command = i2c_msg.read(self._i2c_address, receiving_bytes)
+                view = message_view(read_command)
+            messages = (i2c_msg.write(self._i2c_address, COMMAND_BYTES[command]), read_command,
+                        receiving_bytes, view)
+            self._messages[command, receiving_bytes] = messages
+        return messages
+
+    def _messages_for(self, command, receiving_bytes=0):
+        """prebuilt (write, read) messages of a command, created on first use"""
+        messages = self._prebuilt(command, receiving_bytes)
+        return messages[0], messages[1]
+
+    def _transfer(self, command, receiving_bytes, decode=bytes, timed=False):
+        """send a command and return the decoded answer, using prebuilt messages
+
+        decode gets a view of the read buffer while the bus is still locked,
+        so the answer is never copied. The default returns it as bytes. With
+        timed, (start, end, wall clock at end) of the i2c_rdwr call are taken
+        under the same lock and (times, answer) is returned, the three clock
+        reads are only spent on measurements.
+        """
+        write_command, read_command, _, view = self._prebuilt(command, receiving_bytes)
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            start = time.monotonic() if timed else None
+            try:
+                self._bus.i2c_rdwr(write_command, read_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
+            times = (start, time.monotonic(), time.time()) if timed else None
+            if self.tracer is None:
+                answer = decode(view)
+            else:
+                answer = self.tracer.trace_decode(self, command, decode, view)
+            if not timed:
+                return answer
+            self._transfer_time = times
+            return times, answer
+
+    def _read_measurement(self, command, decode):
+        """read a measurement, return (SampleTime, decoded answer) of this very read"""
+        times, answer = self._transfer(command, 6, decode, timed=True)
+        return _sample_time(*times), answer
+
+    def _command(self, command):
+        """send a command without data, using a prebuilt message"""
+        write_command = self._messages_for(command)[0]
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            try:
+                self._bus.i2c_rdwr(write_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
+
+    def _read(self, receiving_bytes, decode=bytes):
+        """read without sending a command and return the decoded answer, using a prebuilt message"""
+        messages = self._read_messages.get(receiving_bytes)
+        if messages is None:
+            read_command = load_backend().i2c_msg.read(self._i2c_address, receiving_bytes)
+            messages = (read_command, message_view(read_command))
+            self._read_messages[receiving_bytes] = messages
+        read_command, view = messages
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            try:
+                self._bus.i2c_rdwr(read_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
+            if self.tracer is None:
+                return decode(view)
+            return self.tracer.trace_decode(self, None, decode, view)
+
+    def _read_bytes(self, command):
+        """read a register and return its two data bytes after the crc check"""
+        return self._transfer(command, 3, decode_bytes)
+
+    def _read_word(self, command):
+        """read a register and return its 16 bit value after the crc check"""
+        return self._transfer(command, 3, decode_word)
+
+    def _read_config(self, command):
+        """read a configuration register through the cache"""
+        cached = self._config_cache.get(command)
+        if cached is not None and (self.config_ttl is None or
+                                   self.clock() - cached[1] < self.config_ttl):
+            return cached[0]
+        value = self._read_bytes(command)
+        self._config_cache[command] = (value, self.clock())
+        return value
+
+    def _write_word(self, command, send_bytes1, send_bytes2):
+        """write a command with one data word and its crc, updating the configuration cache"""
+        send_bytes1 = send_bytes1 & 255
+        send_bytes2 = send_bytes2 & 255
+        read_command = CONFIG_READ_COMMANDS.get(command)
+        # unknown until the write succeeded
+        self._config_cache.pop(read_command, None)
+        self.wire_write(
+            [(command >> 8), (command & 0xFF),
+             send_bytes1, send_bytes2,
+             calc_crc8([send_bytes1, send_bytes2], 0, 2)])
+        if read_command is not None:
+            self._config_cache[read_command] = ((send_bytes1, send_bytes2), self.clock())
 
     def wire_write_read(self,  buf, receiving_bytes):
         """write a command to the sensor to get different answers like temperature values,..."""
-        write_command = i2c_msg.write(self.i2c_address, buf)
-        read_command = i2c_msg.read(self.i2c_address, receiving_bytes)
-        with SMBus(1) as hdc3020_communication:
-            hdc3020_communication.i2c_rdwr(write_command, read_command)
+        i2c_msg = load_backend().i2c_msg
+        write_command = i2c_msg.write(self._i2c_address, buf)
+        read_command = i2c_msg.read(self._i2c_address, receiving_bytes)
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            try:
+                self._bus.i2c_rdwr(write_command, read_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
+        return list(read_command)
+
+    def wire_read(self, receiving_bytes):
+        """read from the sensor without sending a command, e.g. a triggered single shot result"""
+        read_command = load_backend().i2c_msg.read(self._i2c_address, receiving_bytes)
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            try:
+                self._bus.i2c_rdwr(read_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
         return list(read_command)
 
     def wire_write(self, buf):
         """write to the sensor"""
-        write_command = i2c_msg.write(self.i2c_address, buf)
-        with SMBus(1) as hdc3020_communication:
-            hdc3020_communication.i2c_rdwr(write_command)
+        write_command = load_backend().i2c_msg.write(self._i2c_address, buf)
+        if self._bus is None:
+            self.open()
+        with self._bus_lock:
+            try:
+                self._bus.i2c_rdwr(write_command)
+            except OSError as exception:
+                raise _bus_error(exception) from exception
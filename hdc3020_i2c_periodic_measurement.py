@@ -22,7 +22,8 @@ We assume no liability for the information contained in this document.
 
 
 
-import time
+import sys
+from hdc3020_i2c_export import CsvSink, acquire
 from hdc3020_i2c_library import HDC3020
 
 
@@ -41,25 +42,6 @@ try:
 except Warning as exception:
     print("Exception: " + str(exception))
 
-HDC_3020.start_periodic_measurement(1,0)
-# print csv header
-print("temperature", CSV_DELIMETER,
-      "relative humidity", CSV_DELIMETER,
-      "dewpoint")
-
-for i in range(30):
-
-    try:
-        temperature,humidity = HDC_3020.get_periodic_measurement_temp_hum()
-        dewpoint = HDC_3020.get_dewpoint(temperature,humidity)
-
-        print('%0.2f °C' % temperature, CSV_DELIMETER,
-              '%0.2f %%RH' % humidity, CSV_DELIMETER,
-              '%0.2f °C' % dewpoint)
-
-    except Warning as exception:
-        print("Exception: " + str(exception))
-
-    finally:
-        time.sleep(1)
-HDC_3020.end_periodic_measurement()
+# print csv header and 30 measurements at 1 measurement per second, written in blocks of 10 rows
+with CsvSink(sys.stdout, delimiter=CSV_DELIMETER, flush_size=10) as sink:
+    acquire([HDC_3020], sink, 30, 1, mode=0, measurement_per_seconds=1)
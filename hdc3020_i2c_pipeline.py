@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Pipelined single shot measurements of several HDC3020 sensors.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import errno
+import time
+from hdc3020_i2c_library import HDC3020NackError, SINGLE_SHOT_CONVERSION_TIMES, get_status_string
+
+# Definition
+SINGLE_SHOT_RETRY_INTERVAL = 0.001
+
+
+def read_single_shot_pipelined(sensors, mode, timeout=0.1, return_exceptions=False,
+                               clock=time.monotonic, sleep=time.sleep):
+    """take a single shot measurement on all sensors with overlapping conversions
+
+    The measurement is triggered on every sensor first, then each result is
+    collected once the conversion time of its mode has passed. A sensor which
+    is not ready yet (NACK) is retried every SINGLE_SHOT_RETRY_INTERVAL
+    seconds until timeout. mode is one mode 0 - 3 for all sensors or a list
+    with one mode per sensor.
+
+    Returns a list with (temperature, humidity) per sensor in sensor order.
+    With return_exceptions errors are returned in place of the result,
+    otherwise the first error is raised after all sensors were handled.
+    """
+    modes = [mode] * len(sensors) if isinstance(mode, int) else list(mode)
+    if len(modes) != len(sensors):
+        raise ValueError("one mode per sensor required")
+    results = [None] * len(sensors)
+    pending = []
+    for index, sensor in enumerate(sensors):
+        try:
+            sensor.trigger_single_shot(modes[index])
+        except (Warning, OSError) as exception:
+            results[index] = exception
+            continue
+        pending.append((clock() + SINGLE_SHOT_CONVERSION_TIMES[modes[index]], index))
+    pending.sort()
+    deadline = clock() + timeout
+    while pending:
+        ready_time, index = pending.pop(0)
+        delay = ready_time - clock()
+        if delay > 0:
+            sleep(delay)
+        try:
+            result = sensors[index].collect_single_shot()
+        except (Warning, OSError) as exception:
+            result = exception
+        if result is None:
+            if clock() > deadline:
+                results[index] = HDC3020NackError(errno.EREMOTEIO, get_status_string(1))
+            else:
+                pending.append((clock() + SINGLE_SHOT_RETRY_INTERVAL, index))
+                pending.sort()
+            continue
+        results[index] = result
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    return results
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus metrics endpoint for HDC3020 sensors with cached scrape responses.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import argparse
+import logging
+import math
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from hdc3020_i2c_conversion import calc_dewpoint
+from hdc3020_i2c_library import HDC3020, HDC3020CRCError, HDC3020NackError
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# name, type and help of the exported metrics
+METRICS = (
+    ("hdc3020_temperature_celsius", "gauge", "Temperature."),
+    ("hdc3020_relative_humidity_percent", "gauge", "Relative humidity."),
+    ("hdc3020_dewpoint_celsius", "gauge", "Dewpoint calculated from temperature and humidity."),
+    ("hdc3020_heater_on", "gauge", "1 if the heater is on."),
+    ("hdc3020_last_sample_timestamp_seconds", "gauge", "Unix time of the last sample."),
+    ("hdc3020_read_errors_total", "counter", "Failed reads by error type."),
+    ("hdc3020_acquisition_seconds", "summary", "Duration of the reads of one sample."),
+)
+# "other" counts unexpected exceptions, e.g. of a broken bus driver
+ERROR_TYPES = ("nack", "crc", "bus", "other")
+
+
+def _format_value(value):
+    """value in the exposition format"""
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+class _SensorState():
+    """latest values and counters of one sensor"""
+
+    def __init__(self, sensor):
+        self.sensor = sensor
+        self.labels = '{sensor="0x%02x",bus="%d"}' % (sensor.i2c_address, sensor.bus_number)
+        self.values = None
+        self.errors = dict.fromkeys(ERROR_TYPES, 0)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+
+class MetricsExporter():
+    """Reads sensors from a background thread and keeps the metrics text of the latest samples.
+
+    Every interval seconds each sensor takes a single shot measurement in
+    mode and its heater state is read. After every round the exposition
+    text is formatted once and stored as bytes, so serving a scrape neither
+    touches the bus nor formats anything, however many scrapers there are.
+    A read failing with an unexpected exception is logged and counted as
+    error type "other", the acquisition goes on.
+    """
+
+    def __init__(self, sensors, interval=1.0, mode=0, clock=time.monotonic, timestamp=time.time):
+        self.sensors = [_SensorState(sensor) for sensor in sensors]
+        self.interval = interval
+        self.mode = mode
+        self.clock = clock
+        self.timestamp = timestamp
+        self.rounds = 0
+        self.exposition = self._format()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """start the acquisition thread"""
+        if self._thread is not None:
+            raise RuntimeError("exporter is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hdc3020-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop the acquisition thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """acquisition loop, one round every interval seconds"""
+        deadline = self.clock()
+        while True:
+            self.acquire()
+            deadline += self.interval
+            if self._stop.wait(max(deadline - self.clock(), 0)):
+                break
+
+    def acquire(self):
+        """read all sensors once and update the exposition text"""
+        for state in self.sensors:
+            start = self.clock()
+            try:
+                temperature, humidity = state.sensor.get_single_shot_temp_hum(self.mode)
+                heater = state.sensor.constant_heater_on_off()
+                # the dewpoint is undefined at 0 %RH
+                dewpoint = calc_dewpoint(temperature, humidity) if humidity > 0 else math.nan
+            except HDC3020NackError:
+                state.errors["nack"] += 1
+            except HDC3020CRCError:
+                state.errors["crc"] += 1
+            except (Warning, OSError):
+                state.errors["bus"] += 1
+            except Exception:  # pylint: disable=W0703
+                state.errors["other"] += 1
+                logging.getLogger("hdc3020").exception("reading sensor %s failed", state.labels)
+            else:
+                state.values = (temperature, humidity, dewpoint, heater, self.timestamp())
+            state.latency_sum += self.clock() - start
+            state.latency_count += 1
+        self.rounds += 1
+        # a single reference assignment, scrapes see the old or the new text
+        self.exposition = self._format()
+
+    def _format(self):
+        """exposition text of all sensors as bytes"""
+        lines = []
+        for index, (name, metric_type, description) in enumerate(METRICS):
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            for state in self.sensors:
+                # the gauges are the entries of _SensorState.values in the same order
+                if index < 5:
+                    if state.values is not None:
+                        lines.append(name + state.labels + " " +
+                                     _format_value(state.values[index]))
+                elif metric_type == "counter":
+                    for error_type in ERROR_TYPES:
+                        lines.append('%s%s,type="%s"} %d' % (name, state.labels[:-1], error_type,
+                                                             state.errors[error_type]))
+                else:
+                    lines.append(name + "_sum" + state.labels + " " +
+                                 _format_value(state.latency_sum))
+                    lines.append(name + "_count" + state.labels + " %d" % state.latency_count)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """serves the cached exposition text of server.exporter on /metrics"""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=C0103
+        """answer a scrape"""
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.exporter.exposition
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """no access log"""
+
+
+class MetricsServer():
+    """HTTP server of a MetricsExporter on host:port, port 0 picks a free port."""
+
+    def __init__(self, exporter, host="", port=9103):
+        self.exporter = exporter
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.exporter = exporter
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """start the acquisition and serving threads"""
+        self.exporter.start()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="hdc3020-http",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop serving and the acquisition"""
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+        self.exporter.stop()
+
+
+def main(argv=None):
+    """serve the metrics of the sensors given on the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-a", "--address", type=lambda value: int(value, 0), action="append",
+                        help="I2C address of a sensor, may be repeated (default 0x44)")
+    parser.add_argument("-b", "--bus", type=int, default=1, help="I2C bus number")
+    parser.add_argument("-i", "--interval", type=float, default=1.0,
+                        help="seconds between samples")
+    parser.add_argument("-m", "--mode", type=int, default=0,
+                        help="0 = low noise ... 3 = lowest power")
+    parser.add_argument("--host", default="", help="address to listen on (default all)")
+    parser.add_argument("-p", "--port", type=int, default=9103)
+    parser.add_argument("--simulate", action="store_true",
+                        help="read from a simulated bus instead of /dev/i2c-BUS")
+    args = parser.parse_args(argv)
+    bus = None
+    if args.simulate:
+        # pylint: disable=C0415
+        from hdc3020_i2c_simulator import SimulatedSMBus
+        # pylint: enable=C0415
+        bus = SimulatedSMBus(args.bus)
+    sensors = [HDC3020(address, bus=bus, bus_number=args.bus)
+               for address in args.address or [0x44]]
+    exporter = MetricsExporter(sensors, args.interval, args.mode)
+    with MetricsServer(exporter, args.host, args.port):
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    for sensor in sensors:
+        sensor.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
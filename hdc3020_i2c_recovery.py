@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Retries, backoff and recovery of HDC3020 sensors with error accounting.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import random
+import time
+from hdc3020_i2c_library import (HDC3020Error, HDC3020CRCError, HDC3020NackError,
+                                 PERIODIC_MEASUREMENT_RATES)
+
+# upper bounds in µs of the latency histogram buckets, the last bucket is open
+LATENCY_BUCKETS_US = tuple(1 << exponent for exponent in range(5, 21))
+
+
+class RetryPolicy():
+    """Bounded retries with jittered exponential backoff.
+
+    A failed call is tried attempts times in total. Before retry n the delay
+    is base_delay * 2 ** (n - 1), at most max_delay, reduced by a random
+    fraction of up to jitter so that sensors sharing a bus don't retry in
+    lockstep. After reset_after failed attempts in a row the sensor is soft
+    reset and a running periodic measurement is started again, with
+    reset_after below attempts a failing call is tried once more after that.
+    """
+
+    def __init__(self, attempts=3, base_delay=0.002, max_delay=0.05, jitter=0.5, reset_after=2,
+                 reset_time=0.002, seed=None):
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1")
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.reset_after = reset_after
+        self.reset_time = reset_time
+        self.random = random.Random(seed)
+
+    def delay(self, retry):
+        """backoff in seconds before retry number retry (1 = first retry)"""
+        delay = min(self.base_delay * (1 << (retry - 1)), self.max_delay)
+        return delay * (1.0 - self.jitter * self.random.random())
+
+
+class LatencyHistogram():
+    """Histogram of call latencies with power of two buckets from 32 µs to 1 s."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        self.total = 0.0
+
+    def add(self, seconds):
+        """account one latency"""
+        self.total += seconds
+        # bucket of 2 ** (k - 1) < latency <= 2 ** k µs, k starting at 5
+        index = (int(seconds * 1e6) - 1).bit_length() - 5
+        if index < 0:
+            index = 0
+        elif index > len(LATENCY_BUCKETS_US):
+            index = len(LATENCY_BUCKETS_US)
+        self.counts[index] += 1
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def percentile(self, fraction):
+        """upper bound in µs of the bucket holding the percentile, None if empty or open"""
+        count = len(self)
+        if count == 0:
+            return None
+        rank = fraction * count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return LATENCY_BUCKETS_US[index] if index < len(LATENCY_BUCKETS_US) else None
+        return None
+
+
+class ErrorCounters():
+    """Errors and recoveries of one sensor."""
+
+    def __init__(self):
+        self.calls = 0
+        self.nacks = 0
+        self.crc_errors = 0
+        self.bus_errors = 0
+        self.retries = 0
+        self.resets = 0
+        self.rearms = 0
+        self.failures = 0
+
+    def as_dict(self):
+        """counters as dict"""
+        return dict(vars(self))
+
+
+class ResilientHDC3020():
+    """Wraps an HDC3020 and retries its methods on errors of the library.
+
+    All public methods of the sensor can be called on the wrapper. A call
+    raising HDC3020Error (NACK, crc or bus error) is retried as described by
+    the RetryPolicy, other exceptions pass through. The last error is raised
+    when all attempts failed. Successful calls only cost the accounting of
+    their latency.
+    """
+
+    def __init__(self, sensor, policy=None, clock=time.perf_counter, sleep=time.sleep):
+        self.sensor = sensor
+        self.policy = RetryPolicy() if policy is None else policy
+        self.clock = clock
+        self.sleep = sleep
+        self.errors = ErrorCounters()
+        self.latency = LatencyHistogram()
+        self.consecutive_failures = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.sensor, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.call(attribute, *args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = attribute.__doc__
+        # cached, later lookups don't pass __getattr__ again
+        setattr(self, name, call)
+        return call
+
+    def call(self, function, *args, **kwargs):
+        """call function with retries, backoff and recovery"""
+        errors = self.errors
+        errors.calls += 1
+        start = self.clock()
+        retry = 0
+        while True:
+            try:
+                result = function(*args, **kwargs)
+            except HDC3020Error as exception:
+                self._account(exception)
+                error = exception
+            else:
+                self.consecutive_failures = 0
+                self.latency.add(self.clock() - start)
+                return result
+            retry += 1
+            recovered = self.consecutive_failures >= self.policy.reset_after
+            if recovered:
+                self.recover()
+            if retry >= self.policy.attempts:
+                errors.failures += 1
+                raise error
+            errors.retries += 1
+            if not recovered:
+                self.sleep(self.policy.delay(retry))
+
+    def _account(self, exception):
+        """count one failed attempt by error type"""
+        self.consecutive_failures += 1
+        if isinstance(exception, HDC3020NackError):
+            self.errors.nacks += 1
+        elif isinstance(exception, HDC3020CRCError):
+            self.errors.crc_errors += 1
+        else:
+            self.errors.bus_errors += 1
+
+    def recover(self):
+        """soft reset the sensor and start its periodic measurement again
+
+        After a restart of the periodic measurement it waits one period, until
+        the first measurement is ready. Errors of the recovery are counted but
+        not raised, the following attempt shows if the sensor is back.
+        """
+        self.consecutive_failures = 0
+        periodic_setting = self.sensor.periodic_setting
+        try:
+            self.sensor.reset()
+            self.errors.resets += 1
+            self.sleep(self.policy.reset_time)
+            if periodic_setting is not None:
+                self.sensor.start_periodic_measurement(*periodic_setting)
+                self.errors.rearms += 1
+                self.sleep(1.0 / PERIODIC_MEASUREMENT_RATES[periodic_setting[0]])
+        except HDC3020Error as exception:
+            self._account(exception)
+            # keep the setting for the next recovery
+            self.sensor.periodic_setting = periodic_setting
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Polling scheduler for many HDC3020 sensors on several I2C buses.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hdc3020_i2c_conversion import raw_to_temperature, raw_to_humidity
+from hdc3020_i2c_library import PERIODIC_MEASUREMENT_RATES, _check_mode
+
+
+class SensorStatistics():
+    """Sample, deadline and jitter accounting of one scheduled sensor."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.samples = 0
+        self.errors = 0
+        self.heater_errors = 0
+        self.callback_errors = 0
+        self.masked = 0
+        self.missed_deadlines = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+        self.first_sample = None
+        self.last_sample = None
+
+    def add_sample(self, timestamp, lateness):
+        """account one successful read taken lateness seconds after its deadline"""
+        if self.first_sample is None:
+            self.first_sample = timestamp
+        self.last_sample = timestamp
+        self.samples += 1
+        self.jitter_sum += lateness
+        if lateness > self.jitter_max:
+            self.jitter_max = lateness
+
+    @property
+    def achieved_rate(self):
+        """measured samples per second between the first and the last sample"""
+        if self.samples < 2 or self.last_sample == self.first_sample:
+            return 0.0
+        return (self.samples - 1) / (self.last_sample - self.first_sample)
+
+    @property
+    def mean_jitter(self):
+        """mean delay in seconds between deadline and read"""
+        if self.samples == 0:
+            return 0.0
+        return self.jitter_sum / self.samples
+
+
+class _ScheduledSensor():
+    """sensor with its polling period and statistics"""
+
+    def __init__(self, sensor, measurement_per_seconds, mode, change_filter, aggregator):
+        self.sensor = sensor
+        self.measurement_per_seconds = measurement_per_seconds
+        self.mode = mode
+        self.change_filter = change_filter
+        self.aggregator = aggregator
+        self.period = 1.0 / PERIODIC_MEASUREMENT_RATES[measurement_per_seconds]
+        self.statistics = SensorStatistics(PERIODIC_MEASUREMENT_RATES[measurement_per_seconds])
+
+
+class PollingScheduler():
+    """Polls HDC3020 sensors in periodic measurement mode, grouped by bus.
+
+    The sensors of one bus (the same bus_key) are read one after the other by
+    a dedicated worker thread, different buses run in parallel. Each sensor is read at the rate
+    it was started with, callback(sensor, timestamp, temperature, humidity) is
+    called from the worker thread for every sample, or for the samples
+    published by the change_filter given to add_sensor. A read later than
+    deadline_tolerance periods after its deadline counts as missed deadline,
+    periods skipped to catch up count as missed as well.
+
+    A heater (hdc3020_i2c_heater.HeaterManager) runs heat cycles of the
+    sensors between their reads, samples affected by the heater are dropped
+    and counted as masked if the manager masks them. An exception of the
+    heater is counted in heater_errors and the sample is read anyway, an
+    exception of the callback is logged and counted in callback_errors.
+    """
+
+    def __init__(self, callback=None, deadline_tolerance=0.5, clock=time.monotonic,
+                 heater=None):
+        self.callback = callback
+        self.deadline_tolerance = deadline_tolerance
+        self.clock = clock
+        self.heater = heater
+        self._buses = {}
+        self._stop = threading.Event()
+        self._executor = None
+        self._futures = []
+
+    def add_sensor(self, sensor, measurement_per_seconds, mode=0, change_filter=None,
+                   aggregator=None):
+        """schedule a sensor, measurement_per_seconds and mode as for start_periodic_measurement
+
+        change_filter is an optional hdc3020_i2c_filter.ChangeFilter of this sensor,
+        aggregator an optional hdc3020_i2c_aggregation.SensorAggregator fed with
+        every sample, also the ones dropped by the filter.
+        """
+        if self._executor is not None:
+            raise RuntimeError("sensors can't be added to a running scheduler")
+        if not 0 <= measurement_per_seconds < len(PERIODIC_MEASUREMENT_RATES):
+            raise ValueError("invalid measurement_per_seconds: %r" % (measurement_per_seconds,))
+        _check_mode(mode)
+        entry = _ScheduledSensor(sensor, measurement_per_seconds, mode, change_filter, aggregator)
+        self._buses.setdefault(sensor.bus_key, []).append(entry)
+        return entry.statistics
+
+    def statistics(self):
+        """return a dict sensor: SensorStatistics"""
+        return {entry.sensor: entry.statistics
+                for entries in self._buses.values() for entry in entries}
+
+    def start(self, start_periodic=True):
+        """start one worker per bus, optionally starting the periodic measurement first"""
+        if self._executor is not None:
+            raise RuntimeError("scheduler is already running")
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self._buses), 1),
+                                            thread_name_prefix="hdc3020-bus")
+        self._futures = [self._executor.submit(self._run_bus, entries, start_periodic)
+                         for entries in self._buses.values()]
+
+    def stop(self, end_periodic=True):
+        """stop the workers and wait for them, errors of a worker are raised here
+
+        The periodic measurement of every sensor is ended even if some of
+        them fail. The first worker error is raised after that, else the first
+        error of ending a measurement.
+        """
+        if self._executor is None:
+            return
+        self._stop.set()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        futures, self._futures = self._futures, []
+        errors = []
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+        if end_periodic:
+            for entries in self._buses.values():
+                for entry in entries:
+                    try:
+                        entry.sensor.end_periodic_measurement()
+                    except Exception as exception:  # pylint: disable=W0703
+                        errors.append(exception)
+        if errors:
+            raise errors[0]
+
+    def run_for(self, seconds, start_periodic=True, end_periodic=True):
+        """run the scheduler for a fixed time"""
+        self.start(start_periodic)
+        try:
+            self._stop.wait(seconds)
+        finally:
+            self.stop(end_periodic)
+
+    def _run_bus(self, entries, start_periodic):
+        """worker loop polling all sensors of one bus in deadline order"""
+        if start_periodic:
+            for entry in entries:
+                entry.sensor.start_periodic_measurement(entry.measurement_per_seconds, entry.mode)
+        now = self.clock()
+        # the first read is one period after the start, when the first measurement is
+        # ready, sensors of the bus are spread over the period to avoid queueing
+        queue = [(now + entry.period * (1 + index / len(entries)), index, entry)
+                 for index, entry in enumerate(entries)]
+        heapq.heapify(queue)
+        while not self._stop.is_set():
+            deadline, index, entry = queue[0]
+            delay = deadline - self.clock()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            self._read(entry, deadline)
+            now = self.clock()
+            next_deadline = deadline + entry.period
+            if next_deadline < now:
+                skipped = int((now - next_deadline) / entry.period) + 1
+                entry.statistics.missed_deadlines += skipped
+                next_deadline += skipped * entry.period
+            heapq.heapreplace(queue, (next_deadline, index, entry))
+        for entry in entries:
+            if self.heater is not None:
+                try:
+                    self.heater.release(entry.sensor)
+                except Exception:  # pylint: disable=W0703
+                    entry.statistics.heater_errors += 1
+            if entry.change_filter is not None:
+                self._publish(entry, entry.change_filter.flush())
+
+    def _read(self, entry, deadline):
+        """read one sample and account it"""
+        statistics = entry.statistics
+        if self.heater is not None:
+            try:
+                self.heater.update(entry.sensor, self.clock())
+            except Exception:  # pylint: disable=W0703
+                statistics.heater_errors += 1
+        try:
+            raw_temperature, raw_humidity = entry.sensor.get_periodic_measurement_raw()
+        except (Warning, OSError):
+            statistics.errors += 1
+            return
+        timestamp = self.clock()
+        lateness = max(timestamp - deadline, 0.0)
+        statistics.add_sample(timestamp, lateness)
+        if lateness > self.deadline_tolerance * entry.period:
+            statistics.missed_deadlines += 1
+        if self.heater is not None and self._heater_affected(entry, timestamp, raw_temperature,
+                                                             raw_humidity):
+            statistics.masked += 1
+            return
+        if entry.aggregator is not None:
+            entry.aggregator.add(timestamp, raw_temperature, raw_humidity)
+        if entry.change_filter is None:
+            self._publish(entry, ((timestamp, raw_temperature, raw_humidity),))
+        else:
+            self._publish(entry, entry.change_filter.process(timestamp, raw_temperature,
+                                                             raw_humidity))
+
+    def _heater_affected(self, entry, timestamp, raw_temperature, raw_humidity):
+        """pass a sample to the heater, True if it is to be dropped"""
+        try:
+            affected = self.heater.observe(entry.sensor, timestamp,
+                                           raw_to_temperature(raw_temperature),
+                                           raw_to_humidity(raw_humidity))
+        except Exception:  # pylint: disable=W0703
+            entry.statistics.heater_errors += 1
+            return False
+        return affected and self.heater.mask
+
+    def _publish(self, entry, samples):
+        """convert samples and pass them to the callback"""
+        if self.callback is None:
+            return
+        for timestamp, raw_temperature, raw_humidity in samples:
+            try:
+                self.callback(entry.sensor, timestamp, raw_to_temperature(raw_temperature),
+                              raw_to_humidity(raw_humidity))
+            except Exception:  # pylint: disable=W0703
+                entry.statistics.callback_errors += 1
+                logging.getLogger("hdc3020").exception("scheduler callback failed")
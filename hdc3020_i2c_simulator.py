@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+Software model of the HDC3020 and a simulated I2C bus to run the library without hardware.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import bisect
+import errno
+import math
+import os
+import random
+import time
+from hdc3020_i2c_conversion import temperature_to_raw, humidity_to_raw
+from hdc3020_i2c_library import (
+    HDC3020_ADDRESSES, I2C_M_RD, PERIODIC_MEASUREMENT_RATES, calc_crc8, fill_read_message,
+    STATUS_ALERT, STATUS_HEATER, STATUS_RH_TRACKING_ALERT, STATUS_T_TRACKING_ALERT,
+    STATUS_RH_HIGH_ALERT, STATUS_RH_LOW_ALERT, STATUS_T_HIGH_ALERT, STATUS_T_LOW_ALERT,
+    STATUS_RESET_DETECTED, STATUS_WRITE_CHECKSUM_ERROR,
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_0, HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_1,
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_2, HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_3,
+    HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT, HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T,
+    HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T, HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH,
+    HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH, HDC3020_COMMAND_CLEAR_STATUS_REGISTER,
+    HDC3020_COMMAND_READ_STATUS_REGISTER, HDC3020_COMMAND_END_PERIODIC_MEASUREMENT,
+    HDC3020_COMMAND_SOFT_RESET, HDC3020_COMMAND_HEATER_CONFIGURE, HDC3020_COMMAND_HEATER_ON,
+    HDC3020_COMMAND_HEATER_OFF, HDC3020_COMMAND_READ_MANUFACTOR_ID,
+    HDC3020_COMMAND_READ_MANUFACTOR_ID_0, HDC3020_COMMAND_READ_MANUFACTOR_ID_1,
+    HDC3020_COMMAND_READ_MANUFACTOR_ID_2, HDC3020_COMMAND_CHANGE_SET_LOW_ALERT,
+    HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT, HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT,
+    HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT, HDC3020_COMMAND_READ_SET_LOW_ALERT,
+    HDC3020_COMMAND_READ_CLEAR_LOW_ALERT, HDC3020_COMMAND_READ_SET_HIGH_ALERT,
+    HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT, HDC3020_COMMAND_INTO_NON_VOLATILE_MEMORY,
+    HDC3020_COMMAND_OFFSET_VALUE, HDC3020_COMMAND_CHANGE_DEFAULT_POWER_ON,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_0,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_1,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_2,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_3,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_1,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_2,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_3,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_0,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_1,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_2,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_3,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_0,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_1,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_2,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_3,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2,
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3)
+
+# Definition
+MANUFACTURER_ID_TI = 0x3000
+
+SINGLE_SHOT_MODES = {
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_0: 0,
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_1: 1,
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_2: 2,
+    HDC3020_COMMAND_READ_SINGLE_SHOT_MODE_3: 3,
+}
+PERIODIC_MODES = {
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_0: (0, 0),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_1: (0, 1),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_2: (0, 2),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_0_5_MODE_3: (0, 3),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_0: (1, 0),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_1: (1, 1),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_2: (1, 2),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_1_MODE_3: (1, 3),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_0: (2, 0),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_1: (2, 1),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_2: (2, 2),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_2_MODE_3: (2, 3),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_0: (3, 0),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_1: (3, 1),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_2: (3, 2),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_4_MODE_3: (3, 3),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_0: (4, 0),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_1: (4, 1),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_2: (4, 2),
+    HDC3020_COMMAND_START_PERIODIC_MEASUREMENT_10_MODE_3: (4, 3),
+}
+# registers which are written with a data word and read back with the same command
+DATA_REGISTERS = {
+    HDC3020_COMMAND_CHANGE_SET_LOW_ALERT: "set_low_alert",
+    HDC3020_COMMAND_CHANGE_CLEAR_LOW_ALERT: "clear_low_alert",
+    HDC3020_COMMAND_CHANGE_SET_HIGH_ALERT: "set_high_alert",
+    HDC3020_COMMAND_CHANGE_CLEAR_HIGH_ALERT: "clear_high_alert",
+    HDC3020_COMMAND_OFFSET_VALUE: "offset_value",
+    HDC3020_COMMAND_HEATER_CONFIGURE: "heater_current",
+    HDC3020_COMMAND_CHANGE_DEFAULT_POWER_ON: "default_power_on",
+}
+READ_REGISTERS = {
+    HDC3020_COMMAND_READ_SET_LOW_ALERT: "set_low_alert",
+    HDC3020_COMMAND_READ_CLEAR_LOW_ALERT: "clear_low_alert",
+    HDC3020_COMMAND_READ_SET_HIGH_ALERT: "set_high_alert",
+    HDC3020_COMMAND_READ_CLEAR_HIGH_ALERT: "clear_high_alert",
+    HDC3020_COMMAND_OFFSET_VALUE: "offset_value",
+    HDC3020_COMMAND_HEATER_CONFIGURE: "heater_current",
+}
+DEFAULT_REGISTERS = {
+    "set_low_alert": 0x3866,
+    "clear_low_alert": 0x3A68,
+    "set_high_alert": 0xCD33,
+    "clear_high_alert": 0xC92D,
+    "offset_value": 0x0000,
+    "heater_current": 0x0000,
+    "default_power_on": 0x0000,
+}
+
+
+def nack():
+    """the OSError raised by the i2c driver for a not acknowledged transfer"""
+    return OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+
+
+def crc_word(word):
+    """word as the 3 bytes msb, lsb, crc sent by the sensor"""
+    data = [word >> 8, word & 0xFF]
+    return bytes([data[0], data[1], calc_crc8(data, 0, 2)])
+
+
+class SimulatedHDC3020():
+    """Software model of one HDC3020 speaking the command set of the library.
+
+    Measurements are set with set_measurement (or set_raw_measurement), every
+    call counts as a new conversion for the periodic minimum/maximum registers
+    and the alert thresholds. on_alert_change(active) is called whenever the
+    ALERT output changes. Single shot results NACK until conversion_time
+    seconds after the trigger. Faults are injected randomly with nack_rate and
+    crc_error_rate, or deterministically with inject_nacks/inject_crc_errors.
+    replay() makes the measurements follow a recorded trace instead.
+    """
+
+    def __init__(self, temperature=23.0, humidity=50.0, serial_number=(0x1234, 0x5678, 0x9ABC),
+                 conversion_time=0.0, nack_rate=0.0, crc_error_rate=0.0, seed=None,
+                 clock=time.monotonic):
+        self.serial_number = serial_number
+        self.conversion_time = conversion_time
+        self.nack_rate = nack_rate
+        self.crc_error_rate = crc_error_rate
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.pending_nacks = 0
+        self.pending_crc_errors = 0
+        self.transactions = 0
+        self.commands = {}
+        self.on_alert_change = None
+        self._trace_times = None
+        self._trace_values = None
+        self._trace_start = 0.0
+        self._trace_index = None
+        self._periodic_start = 0.0
+        self.raw_temperature = temperature_to_raw(temperature)
+        self.raw_humidity = humidity_to_raw(humidity)
+        self._power_on()
+        self.set_raw_measurement(self.raw_temperature, self.raw_humidity)
+
+    def _power_on(self):
+        """state after power on or soft reset"""
+        self.registers = dict(DEFAULT_REGISTERS)
+        self.periodic = None
+        self.heater = False
+        self.status = STATUS_RESET_DETECTED
+        self.high_alert = False
+        self.low_alert = False
+        self.minimum = None
+        self.maximum = None
+        self.single_shot_ready = None
+        self._response = None
+
+    def set_measurement(self, temperature, humidity):
+        """set the temperature in °C and humidity in %RH of the next conversions"""
+        self.set_raw_measurement(temperature_to_raw(temperature), humidity_to_raw(humidity))
+
+    def set_raw_measurement(self, raw_temperature, raw_humidity):
+        """set the raw values of the next conversions and update min/max and alerts"""
+        self.raw_temperature = raw_temperature
+        self.raw_humidity = raw_humidity
+        if self.periodic is not None:
+            if self.minimum is None:
+                self.minimum = [raw_temperature, raw_humidity]
+                self.maximum = [raw_temperature, raw_humidity]
+            self.minimum = [min(self.minimum[0], raw_temperature), min(self.minimum[1], raw_humidity)]
+            self.maximum = [max(self.maximum[0], raw_temperature), max(self.maximum[1], raw_humidity)]
+        self._update_alerts()
+
+    @property
+    def alert_active(self):
+        """state of the ALERT output"""
+        return self.high_alert or self.low_alert
+
+    def _update_alerts(self):
+        """evaluate the alert thresholds with hysteresis, as 7 bit RH and 9 bit T values"""
+        temperature = self.raw_temperature >> 7
+        humidity = self.raw_humidity >> 9
+        was_active = self.alert_active
+
+        def split(name):
+            word = self.registers[name]
+            return word & 0x1FF, word >> 9
+
+        set_high, clear_high = split("set_high_alert"), split("clear_high_alert")
+        set_low, clear_low = split("set_low_alert"), split("clear_low_alert")
+        # a set low threshold above the set high threshold disables tracking of a channel
+        t_enabled = set_low[0] < set_high[0]
+        rh_enabled = set_low[1] < set_high[1]
+        t_high = t_enabled and temperature > set_high[0]
+        rh_high = rh_enabled and humidity > set_high[1]
+        t_low = t_enabled and temperature < set_low[0]
+        rh_low = rh_enabled and humidity < set_low[1]
+        if t_high or rh_high:
+            self.high_alert = True
+        elif self.high_alert and (not t_enabled or temperature < clear_high[0]) and \
+                (not rh_enabled or humidity < clear_high[1]):
+            self.high_alert = False
+        if t_low or rh_low:
+            self.low_alert = True
+        elif self.low_alert and (not t_enabled or temperature > clear_low[0]) and \
+                (not rh_enabled or humidity > clear_low[1]):
+            self.low_alert = False
+        latched = ((STATUS_T_HIGH_ALERT if t_high else 0) | (STATUS_RH_HIGH_ALERT if rh_high else 0) |
+                   (STATUS_T_LOW_ALERT if t_low else 0) | (STATUS_RH_LOW_ALERT if rh_low else 0))
+        self.status |= latched
+        self.status &= ~(STATUS_ALERT | STATUS_T_TRACKING_ALERT | STATUS_RH_TRACKING_ALERT)
+        if self.alert_active:
+            self.status |= STATUS_ALERT
+        if t_high or t_low:
+            self.status |= STATUS_T_TRACKING_ALERT
+        if rh_high or rh_low:
+            self.status |= STATUS_RH_TRACKING_ALERT
+        if self.on_alert_change is not None and self.alert_active != was_active:
+            self.on_alert_change(self.alert_active)
+
+    def inject_nacks(self, count=1):
+        """NACK the next count transactions"""
+        self.pending_nacks += count
+
+    def brown_out(self):
+        """lose the state as after a supply dip, a periodic measurement stops"""
+        self._power_on()
+
+    def inject_crc_errors(self, count=1):
+        """corrupt a crc byte in the next count responses"""
+        self.pending_crc_errors += count
+
+    def replay(self, trace, start=None):
+        """follow a trace of (seconds, temperature, humidity) samples from start (default now)
+
+        Every conversion takes the trace value at its time. In periodic mode
+        the conversions happen at the measurement rate, so a read returns the
+        value of the last conversion and NACKs before the first one, as the
+        sensor does after a start.
+        """
+        self._trace_times = [sample[0] for sample in trace]
+        self._trace_values = [(temperature_to_raw(temperature), humidity_to_raw(humidity))
+                              for _, temperature, humidity in trace]
+        self._trace_start = self.clock() if start is None else start
+        self._trace_index = None
+
+    def _follow_trace(self):
+        """take the trace value of the current conversion, False before the first conversion"""
+        now = self.clock()
+        if self.periodic is not None:
+            period = 1.0 / PERIODIC_MEASUREMENT_RATES[self.periodic[0]]
+            conversions = math.floor((now - self._periodic_start) / period)
+            if conversions < 1:
+                return False
+            now = self._periodic_start + conversions * period
+        index = bisect.bisect_right(self._trace_times, now - self._trace_start) - 1
+        if index != self._trace_index and index >= 0:
+            self._trace_index = index
+            self.set_raw_measurement(*self._trace_values[index])
+        return True
+
+    def begin_transaction(self):
+        """called once per i2c_rdwr addressing this device, raises the injected NACKs"""
+        self.transactions += 1
+        if self.pending_nacks:
+            self.pending_nacks -= 1
+            raise nack()
+        if self.nack_rate and self.random.random() < self.nack_rate:
+            raise nack()
+
+    def _measurement_frame(self):
+        """6 byte response with the current measurement"""
+        return crc_word(self.raw_temperature) + crc_word(self.raw_humidity)
+
+    def write(self, data):
+        """handle the bytes of one write message"""
+        if len(data) < 2:
+            raise nack()
+        command = (data[0] << 8) | data[1]
+        self.commands[command] = self.commands.get(command, 0) + 1
+        self._response = None
+        if len(data) == 5:
+            self._write_register(command, data)
+        elif command in SINGLE_SHOT_MODES:
+            self.single_shot_ready = self.clock() + self.conversion_time
+            if self._trace_times is not None:
+                self._follow_trace()
+        elif command in PERIODIC_MODES:
+            self.periodic = PERIODIC_MODES[command]
+            self._periodic_start = self.clock()
+            self.minimum = self.maximum = None
+            self.set_raw_measurement(self.raw_temperature, self.raw_humidity)
+        elif command == HDC3020_COMMAND_END_PERIODIC_MEASUREMENT:
+            self.periodic = None
+        elif command == HDC3020_COMMAND_READ_PERIODIC_MEASUREMENT:
+            if self.periodic is None:
+                raise nack()
+            if self._trace_times is not None and not self._follow_trace():
+                raise nack()
+            self._response = self._measurement_frame()
+        elif command == HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_T:
+            self._response = crc_word(self.minimum[0] if self.minimum else 0xFFFF)
+        elif command == HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_T:
+            self._response = crc_word(self.maximum[0] if self.maximum else 0x0000)
+        elif command == HDC3020_COMMAND_READ_MINIMUM_MEASUREMENT_RH:
+            self._response = crc_word(self.minimum[1] if self.minimum else 0xFFFF)
+        elif command == HDC3020_COMMAND_READ_MAXIMUM_MEASUREMENT_RH:
+            self._response = crc_word(self.maximum[1] if self.maximum else 0x0000)
+        elif command == HDC3020_COMMAND_READ_STATUS_REGISTER:
+            self._response = crc_word(self.status | (STATUS_HEATER if self.heater else 0))
+        elif command == HDC3020_COMMAND_CLEAR_STATUS_REGISTER:
+            self.status &= ~(STATUS_T_HIGH_ALERT | STATUS_T_LOW_ALERT | STATUS_RH_HIGH_ALERT |
+                             STATUS_RH_LOW_ALERT | STATUS_RESET_DETECTED |
+                             STATUS_WRITE_CHECKSUM_ERROR)
+        elif command == HDC3020_COMMAND_SOFT_RESET:
+            self._power_on()
+            self._update_alerts()
+        elif command == HDC3020_COMMAND_HEATER_ON:
+            self.heater = True
+        elif command == HDC3020_COMMAND_HEATER_OFF:
+            self.heater = False
+        elif command == HDC3020_COMMAND_READ_MANUFACTOR_ID:
+            self._response = crc_word(MANUFACTURER_ID_TI)
+        elif command == HDC3020_COMMAND_READ_MANUFACTOR_ID_0:
+            self._response = crc_word(self.serial_number[0])
+        elif command == HDC3020_COMMAND_READ_MANUFACTOR_ID_1:
+            self._response = crc_word(self.serial_number[1])
+        elif command == HDC3020_COMMAND_READ_MANUFACTOR_ID_2:
+            self._response = crc_word(self.serial_number[2])
+        elif command in READ_REGISTERS:
+            self._response = crc_word(self.registers[READ_REGISTERS[command]])
+        elif command != HDC3020_COMMAND_INTO_NON_VOLATILE_MEMORY:
+            raise nack()
+
+    def _write_register(self, command, data):
+        """handle a command with data word and crc"""
+        if command not in DATA_REGISTERS:
+            raise nack()
+        if calc_crc8(data, 2, 4) != data[4]:
+            self.status |= STATUS_WRITE_CHECKSUM_ERROR
+            return
+        self.status &= ~STATUS_WRITE_CHECKSUM_ERROR
+        self.registers[DATA_REGISTERS[command]] = (data[2] << 8) | data[3]
+        self._update_alerts()
+
+    def read(self, length):
+        """return the bytes of one read message"""
+        response = self._response
+        if response is None and self.single_shot_ready is not None:
+            if self.clock() < self.single_shot_ready:
+                raise nack()
+            self.single_shot_ready = None
+            response = self._measurement_frame()
+        if response is None:
+            raise nack()
+        self._response = None
+        corrupt = False
+        if self.pending_crc_errors:
+            self.pending_crc_errors -= 1
+            corrupt = True
+        elif self.crc_error_rate and self.random.random() < self.crc_error_rate:
+            corrupt = True
+        if corrupt:
+            response = bytearray(response)
+            response[2] ^= 0xFF
+            response = bytes(response)
+        return response[:length]
+
+
+class SimulatedSMBus():
+    """Stand-in for smbus2.SMBus with SimulatedHDC3020 devices.
+
+    devices maps i2c addresses to SimulatedHDC3020 objects; by default every
+    HDC3020 address 0x44 - 0x47 has a device. Transactions to other addresses
+    NACK. Several bus objects can share one devices dict. Like the real bus a
+    file descriptor is opened on construction and closed on close(), so
+    open/close churn costs the same system calls as on the Pi. latency adds a
+    delay in seconds to every i2c_rdwr call.
+    """
+
+    def __init__(self, bus=1, latency=0.0, devices=None):
+        self.bus = bus
+        self.latency = latency
+        self.transactions = 0
+        if devices is None:
+            devices = {address: SimulatedHDC3020() for address in HDC3020_ADDRESSES}
+        self.devices = devices
+        self.fd = os.open(os.devnull, os.O_RDWR)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def set_measurement(self, temperature, humidity):
+        """set the measurement of all devices"""
+        for device in self.devices.values():
+            device.set_measurement(temperature, humidity)
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """execute the messages of one combined transaction"""
+        if self.fd is None:
+            raise OSError(errno.EBADF, "bus is closed")
+        if self.latency:
+            time.sleep(self.latency)
+        self.transactions += 1
+        started = set()
+        for msg in i2c_msgs:
+            device = self.devices.get(msg.addr)
+            if device is None:
+                raise nack()
+            if msg.addr not in started:
+                started.add(msg.addr)
+                device.begin_transaction()
+            if msg.flags & I2C_M_RD:
+                fill_read_message(msg, device.read(msg.len))
+            else:
+                device.write(bytes(msg))
+
+    def close(self):
+        """close the file descriptor"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -21,7 +21,8 @@ We assume no liability for the information contained in this document.
 """
 
 
-import time
+import sys
+from hdc3020_i2c_export import CsvSink, acquire
 from hdc3020_i2c_library import HDC3020
 
 
@@ -38,23 +39,6 @@ try:
 except Warning as exception:
     print("Exception: " + str(exception))
 
-# print csv header
-print("temperature", CSV_DELIMETER,
-      "relative humidity", CSV_DELIMETER,
-      "dewpoint")
-
-for i in range(30):
-
-    try:
-        temperature,humidity = HDC_3020.get_single_shot_temp_hum()
-        dewpoint = HDC_3020.get_dewpoint()
-
-        print('%0.2f °C' % temperature, CSV_DELIMETER,
-              '%0.2f %%RH' % humidity, CSV_DELIMETER,
-              '%0.2f °C' % dewpoint)
-
-    except Warning as exception:
-        print("Exception: " + str(exception))
-
-    finally:
-        time.sleep(0.5)
+# print csv header and 30 measurements, written in blocks of 10 rows
+with CsvSink(sys.stdout, delimiter=CSV_DELIMETER, flush_size=10) as sink:
+    acquire([HDC_3020], sink, 30, 0.5, mode=0)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming acquisition of HDC3020 periodic measurements into a ring buffer.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import threading
+import time
+from array import array
+from hdc3020_i2c_library import PERIODIC_MEASUREMENT_RATES
+
+
+class SampleRingBuffer():
+    """Preallocated ring buffer of (timestamp, raw temperature, raw humidity) samples.
+
+    Samples are stored in three array columns which are allocated once. Every
+    sample is written twice, at its slot and at slot + capacity, so the latest
+    n samples are always one contiguous slice and latest() can return
+    memoryviews without copying. The views are live: they show newer samples
+    once the writer has wrapped around. error is the exception that ended the
+    writer, if any.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(16 * capacity))
+        self.raw_temperatures = array("H", bytes(4 * capacity))
+        self.raw_humidities = array("H", bytes(4 * capacity))
+        self.write_count = 0
+        self.error = None
+        self.condition = threading.Condition()
+
+    def append(self, timestamp, raw_temperature, raw_humidity):
+        """store one sample, overwriting the oldest one when full"""
+        with self.condition:
+            slot = self.write_count % self.capacity
+            mirror = slot + self.capacity
+            self.timestamps[slot] = self.timestamps[mirror] = timestamp
+            self.raw_temperatures[slot] = self.raw_temperatures[mirror] = raw_temperature
+            self.raw_humidities[slot] = self.raw_humidities[mirror] = raw_humidity
+            self.write_count += 1
+            self.condition.notify_all()
+
+    def __len__(self):
+        return min(self.write_count, self.capacity)
+
+    def latest(self, count):
+        """return memoryviews (timestamps, raw temperatures, raw humidities) of the latest samples"""
+        with self.condition:
+            count = min(count, len(self))
+            end = self.write_count % self.capacity + self.capacity
+            start = end - count
+            return (memoryview(self.timestamps)[start:end],
+                    memoryview(self.raw_temperatures)[start:end],
+                    memoryview(self.raw_humidities)[start:end])
+
+    def get(self, index):
+        """return the sample with the absolute index (0 = first sample ever written)"""
+        slot = index % self.capacity
+        return self.timestamps[slot], self.raw_temperatures[slot], self.raw_humidities[slot]
+
+
+class StreamCursor():
+    """Reading position of one consumer of a SampleRingBuffer.
+
+    overruns counts samples which were overwritten before this consumer read
+    them, backpressure_events counts reads that found the consumer more than
+    high_watermark of the capacity behind the writer.
+    """
+
+    def __init__(self, ring_buffer, high_watermark=0.75, stopped=None):
+        self.ring_buffer = ring_buffer
+        self.high_watermark = int(high_watermark * ring_buffer.capacity)
+        self.read_count = ring_buffer.write_count
+        self.overruns = 0
+        self.backpressure_events = 0
+        self.max_lag = 0
+        self._stopped = stopped
+
+    @property
+    def lag(self):
+        """number of written samples not read yet by this consumer"""
+        return self.ring_buffer.write_count - self.read_count
+
+    def _check_lag(self):
+        """account and skip overwritten samples, called with the buffer lock held"""
+        lag = self.ring_buffer.write_count - self.read_count
+        if lag > self.ring_buffer.capacity:
+            self.overruns += lag - self.ring_buffer.capacity
+            self.read_count += lag - self.ring_buffer.capacity
+            lag = self.ring_buffer.capacity
+        if lag > self.high_watermark:
+            self.backpressure_events += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+        return lag
+
+    def read(self, max_samples=None):
+        """return the unread samples as list of tuples without waiting"""
+        with self.ring_buffer.condition:
+            lag = self._check_lag()
+            if max_samples is not None:
+                lag = min(lag, max_samples)
+            samples = [self.ring_buffer.get(index)
+                       for index in range(self.read_count, self.read_count + lag)]
+            self.read_count += lag
+        return samples
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """wait for the next sample, stop when the stream is stopped and drained
+
+        If the writer ended with an exception, it is raised instead of
+        StopIteration.
+        """
+        condition = self.ring_buffer.condition
+        with condition:
+            while self.ring_buffer.write_count == self.read_count:
+                if self._stopped is not None and self._stopped.is_set():
+                    if self.ring_buffer.error is not None:
+                        raise self.ring_buffer.error
+                    raise StopIteration
+                condition.wait(0.1)
+            self._check_lag()
+            sample = self.ring_buffer.get(self.read_count)
+            self.read_count += 1
+        return sample
+
+
+class PeriodicStreamReader():
+    """Reads periodic measurements of one sensor into a SampleRingBuffer from a thread.
+
+    start() starts the periodic measurement with measurement_per_seconds and
+    mode (as for start_periodic_measurement) and polls it at the same rate,
+    stop() ends both. Consumers iterate over the reader or over their own
+    cursor() and never delay the polling. With a change_filter
+    (hdc3020_i2c_filter.ChangeFilter) only the samples it publishes are
+    stored, an aggregator (hdc3020_i2c_aggregation.SensorAggregator) gets
+    every sample. Read errors of the library are counted in errors, any
+    other exception stops the polling and is raised by stop() and by the
+    cursors once they are drained.
+    """
+
+    def __init__(self, sensor, measurement_per_seconds, mode=0, capacity=4096,
+                 clock=time.monotonic, change_filter=None, aggregator=None):
+        self.sensor = sensor
+        self.measurement_per_seconds = measurement_per_seconds
+        self.mode = mode
+        self.period = 1.0 / PERIODIC_MEASUREMENT_RATES[measurement_per_seconds]
+        self.buffer = SampleRingBuffer(capacity)
+        self.clock = clock
+        self.change_filter = change_filter
+        self.aggregator = aggregator
+        self.errors = 0
+        self._stopped = threading.Event()
+        self._stopped.set()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def cursor(self, high_watermark=0.75):
+        """return a new consumer cursor starting at the next sample"""
+        return StreamCursor(self.buffer, high_watermark, self._stopped)
+
+    def __iter__(self):
+        return self.cursor()
+
+    def latest(self, count):
+        """zero copy views of the latest samples, see SampleRingBuffer.latest"""
+        return self.buffer.latest(count)
+
+    def start(self):
+        """start the periodic measurement and the polling thread"""
+        if self._thread is not None:
+            raise RuntimeError("stream is already running")
+        self.sensor.start_periodic_measurement(self.measurement_per_seconds, self.mode)
+        self.buffer.error = None
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="hdc3020-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop polling and end the periodic measurement, raise the error that ended the polling"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.sensor.end_periodic_measurement()
+        if self.change_filter is not None and self.buffer.error is None:
+            for sample in self.change_filter.flush():
+                self.buffer.append(*sample)
+        with self.buffer.condition:
+            self.buffer.condition.notify_all()
+        if self.buffer.error is not None:
+            raise self.buffer.error
+
+    def _run(self):
+        """polling loop, the first measurement is ready one period after the start"""
+        try:
+            deadline = self.clock() + self.period
+            while not self._stopped.wait(max(deadline - self.clock(), 0)):
+                deadline += self.period
+                try:
+                    raw_temperature, raw_humidity = self.sensor.get_periodic_measurement_raw()
+                except (Warning, OSError):
+                    self.errors += 1
+                    continue
+                timestamp = self.clock()
+                if self.aggregator is not None:
+                    self.aggregator.add(timestamp, raw_temperature, raw_humidity)
+                if self.change_filter is None:
+                    self.buffer.append(timestamp, raw_temperature, raw_humidity)
+                    continue
+                for sample in self.change_filter.process(timestamp, raw_temperature,
+                                                         raw_humidity):
+                    self.buffer.append(*sample)
+        except Exception as exception:  # pylint: disable=W0703
+            self.buffer.error = exception
+        finally:
+            # wake the cursors, they end once drained
+            self._stopped.set()
+            with self.buffer.condition:
+                self.buffer.condition.notify_all()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the table driven crc8 of the HDC3020 library.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import pytest
+from hdc3020_i2c_library import (calc_crc8, decode_raw_temp_hum, find_crc8_errors,
+                                 verify_crc8_words, CRC8_ONEWIRE_POLY, CRC8_ONEWIRE_START,
+                                 HDC3020CRCError)
+
+
+def calc_crc8_bitwise(buf, start, end):
+    """reference crc8 computed bit by bit"""
+    crc_val = CRC8_ONEWIRE_START
+    for j in range(start, end):
+        cur_val = buf[j]
+        for _ in range(8):
+            if ((crc_val ^ cur_val) & 0x80) != 0:
+                crc_val = (crc_val << 1) ^ CRC8_ONEWIRE_POLY
+            else:
+                crc_val = crc_val << 1
+            cur_val = cur_val << 1
+    return crc_val & 0xFF
+
+
+def test_table_matches_bitwise_for_all_words():
+    """all 65536 two byte inputs"""
+    for word in range(65536):
+        buf = (word >> 8, word & 0xFF)
+        assert calc_crc8(buf, 0, 2) == calc_crc8_bitwise(buf, 0, 2), "0x%04x" % word
+
+
+def test_datasheet_example():
+    """0xBEEF gives 0x92"""
+    assert calc_crc8(b"\xBE\xEF", 0, 2) == 0x92
+
+
+def test_find_crc8_errors_matches_calc_crc8():
+    """every word of a buffer with every 7th crc broken"""
+    data = bytearray()
+    broken = []
+    for index, word in enumerate(range(0, 65536, 97)):
+        crc = calc_crc8((word >> 8, word & 0xFF), 0, 2)
+        if index % 7 == 0:
+            crc ^= 0x01
+            broken.append(index)
+        data += bytes((word >> 8, word & 0xFF, crc))
+    assert find_crc8_errors(bytes(data)) == broken
+    assert not verify_crc8_words(bytes(data))
+    assert verify_crc8_words(b"\xBE\xEF\x92" * 4)
+
+
+def test_decode_checks_both_words():
+    """a broken crc in either word of a measurement frame raises"""
+    frame = bytearray(b"\x66\x66\x00\x80\x00\x00")
+    frame[2] = calc_crc8(frame, 0, 2)
+    frame[5] = calc_crc8(frame, 3, 5)
+    assert decode_raw_temp_hum(memoryview(frame)) == (0x6666, 0x8000)
+    for index in (2, 5):
+        broken = bytearray(frame)
+        broken[index] ^= 0xFF
+        with pytest.raises(HDC3020CRCError):
+            decode_raw_temp_hum(broken)
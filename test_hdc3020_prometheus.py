@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the error handling of the HDC3020 metrics exporter.
+
+Copyright 2024 MW technologies
+
+Disclaimer:
+This application example is non-binding and does not claim to be complete with
+regard to configuration and equipment as well as all eventualities. The
+application example is intended to provide assistance with the HDC3020 sensor
+module design-in and is provided "as is".You yourself are responsible for the
+proper operation of the products described. This application example does not
+release you from the obligation to handle the product safely during
+application, installation, operation and maintenance. By using this application
+example, you acknowledge that we cannot be held liable for any damage beyond
+the liability regulations described.
+
+We reserve the right to make changes to this application example at any time
+without notice. In case of discrepancies between the suggestions in this
+application example and other MW technologies publications, such as catalogues, the content
+of the other documentation takes precedence. We assume no liability for
+the information contained in this document.
+"""
+
+
+import time
+from hdc3020_i2c_prometheus import MetricsExporter
+
+
+class FailingSensor():
+    """sensor stub whose first reads raise an unexpected exception"""
+
+    i2c_address = 0x44
+    bus_number = 1
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.reads = 0
+
+    def get_single_shot_temp_hum(self, mode):  # pylint: disable=W0613
+        """fail failures times, then return 23 degC and 50 %RH"""
+        self.reads += 1
+        if self.reads <= self.failures:
+            raise RuntimeError("driver bug")
+        return 23.0, 50.0
+
+    def constant_heater_on_off(self):
+        """heater off"""
+        return 0
+
+
+def test_unexpected_exception_is_counted():
+    """acquire counts the exception as "other" and publishes the next good sample"""
+    exporter = MetricsExporter([FailingSensor(1)])
+    exporter.acquire()
+    assert exporter.sensors[0].errors["other"] == 1
+    assert exporter.sensors[0].values is None
+    assert b'hdc3020_read_errors_total{sensor="0x44",bus="1",type="other"} 1' in \
+        exporter.exposition
+    exporter.acquire()
+    assert exporter.sensors[0].values[:2] == (23.0, 50.0)
+
+
+def test_acquisition_thread_survives_unexpected_exceptions():
+    """the background thread goes on polling after the sensor raised"""
+    sensor = FailingSensor(3)
+    exporter = MetricsExporter([sensor], interval=0.001)
+    exporter.start()
+    try:
+        deadline = time.monotonic() + 5
+        while exporter.sensors[0].values is None and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        exporter.stop()
+    assert exporter.sensors[0].errors["other"] == 3
+    assert exporter.sensors[0].values is not None